@@ -2,6 +2,29 @@ import streamlit as st
 import requests
 import json
 import pandas as pd
+import time
+import os
+
+API_BASE_URL = "http://127.0.0.1:8000"
+POLL_INTERVAL_SECONDS = 1.0
+# Give up polling a background job after this long
+JOB_TIMEOUT_SECONDS = float(os.getenv("UI_JOB_TIMEOUT_SECONDS", 600))
+# Stream results from /process_application/stream as they are produced;
+# set UI_STREAMING=0 to submit a background job and poll it instead
+UI_STREAMING = os.getenv("UI_STREAMING", "1") == "1"
+# Human-readable labels for the graph nodes reported as job progress
+NODE_LABELS = {
+    "read_emirates_id": "Reading Emirates ID (OCR)",
+    "read_resume": "Reading resume",
+    "read_bank_statement": "Reading bank statement",
+    "read_assets": "Reading assets file",
+    "data_extraction": "Extracting data from documents",
+    "data_validation": "Validating data",
+    "ml_eligibility_check": "Running eligibility model",
+    "decision_recommendation": "Making final decision",
+    "rules_decision": "Making final decision",
+    "review_required": "Flagging for manual review",
+}
 
 st.set_page_config(layout="wide")
 st.title("🤖 AI-Powered Social Support Application (Enhanced)")
@@ -35,64 +58,163 @@ with st.form("application_form"):
     
     submit_button = st.form_submit_button("Submit Application for AI Assessment")
 
+# --- Result Rendering ---
+def render_results(results):
+    st.subheader("Assessment Outcome")
+    decision = results.get('decision', {})
+    final_decision = decision.get('final_decision', 'N/A')
+
+    if final_decision == "Approve":
+        st.balloons()
+        st.markdown(f"### <span style='color:green;'>Status: {final_decision}</span>", unsafe_allow_html=True)
+    elif final_decision == "Review Required":
+        st.markdown(f"### <span style='color:orange;'>Status: {final_decision}</span>", unsafe_allow_html=True)
+    else:
+        st.markdown(f"### <span style='color:red;'>Status: {final_decision}</span>", unsafe_allow_html=True)
+
+    st.write("**Reasoning:**", decision.get('decision_reason', 'N/A'))
+
+    st.subheader("Economic Enablement Recommendations")
+    recs = decision.get('enablement_recommendations', [])
+    if recs:
+        for rec in recs:
+            st.markdown(f"- {rec}")
+
+    st.subheader("Data Verification Details")
+    validation = results.get('validation_result', {})
+    if not validation.get('validation_passed'):
+        st.warning("Discrepancies found in your documents:")
+        for note in validation.get('validation_notes', []):
+            st.markdown(f"- {note}")
+    else:
+        st.success("All document information is consistent.")
+
+    with st.expander("Show Full AI Agent State (JSON)"):
+        st.json(results)
+
+# --- Submission Modes ---
+def iter_sse(response):
+    """Yields (event, data) pairs from a text/event-stream response."""
+    event = "message"
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            continue
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            yield event, json.loads(line[len("data:"):])
+            event = "message"
+
+def render_partial_decision(placeholder, decision):
+    """Shows the decision while the LLM is still writing it."""
+    with placeholder.container():
+        st.subheader("Assessment Outcome (generating...)")
+        st.markdown(f"### Status: {decision.get('final_decision', '...')}")
+        st.write("**Reasoning:**", decision.get('decision_reason', '...'))
+        for rec in decision.get('enablement_recommendations', []):
+            st.markdown(f"- {rec}")
+
+def run_streaming(payload, files):
+    """Renders each node's result and the decision as they arrive over SSE."""
+    progress_bar = st.progress(0.0, text="🤖 AI agents are processing your documents...")
+    steps = st.container()
+    decision_placeholder = st.empty()
+    completed_nodes = []
+    with requests.post(f"{API_BASE_URL}/process_application/stream", data=payload, files=files,
+                       stream=True, timeout=(30, 600)) as response:
+        if response.status_code != 200:
+            st.error(f"Error from API: {response.status_code} - {response.text}")
+            return
+        for event, data in iter_sse(response):
+            if event == "node":
+                node = data['node']
+                completed_nodes.append(node)
+                progress_bar.progress(min(len(completed_nodes) / len(NODE_LABELS), 1.0),
+                                      text=f"🤖 Done: {NODE_LABELS.get(node, node)}")
+                update = data.get('update', {})
+                if 'validation_result' in update:
+                    steps.write(f"✅ {NODE_LABELS[node]}: "
+                                f"{'passed' if update['validation_result']['validation_passed'] else 'discrepancies found'}")
+                elif node == "ml_eligibility_check":
+                    ml = update.get('decision', {})
+                    steps.write(f"✅ {NODE_LABELS[node]}: {ml.get('ml_eligibility_prediction')} "
+                                f"({(ml.get('ml_eligibility_probability') or 0):.0%})")
+                elif update and node in NODE_LABELS:
+                    steps.write(f"✅ {NODE_LABELS[node]} ({data.get('elapsed', 0):.1f}s)")
+            elif event == "decision":
+                render_partial_decision(decision_placeholder, data)
+            elif event == "result":
+                progress_bar.empty()
+                decision_placeholder.empty()
+                st.success("Assessment Complete!")
+                render_results(data)
+            elif event == "error":
+                progress_bar.empty()
+                st.error(f"Processing failed: {data.get('detail')}")
+
+def run_job(payload, files):
+    """Submits a background job and polls it for progress."""
+    # Submit the application as a background job; the API answers immediately
+    response = requests.post(f"{API_BASE_URL}/applications", data=payload, files=files, timeout=30)
+    if response.status_code == 429:
+        st.warning("The system is busy right now. Please try again in a few moments.")
+    elif response.status_code != 202:
+        st.error(f"Error from API: {response.status_code} - {response.text}")
+    else:
+        job_id = response.json()['job_id']
+        progress_bar = st.progress(0.0, text="🤖 Application queued...")
+        job = {}
+        deadline = time.monotonic() + JOB_TIMEOUT_SECONDS
+        # Poll for status so the UI stays responsive while the AI agents work
+        while True:
+            job = requests.get(f"{API_BASE_URL}/applications/{job_id}", timeout=10).json()
+            if job['status'] in ('completed', 'failed'):
+                break
+            if time.monotonic() > deadline:
+                break
+            completed_nodes = [p['node'] for p in job.get('progress', [])]
+            if job['status'] == 'queued':
+                text = f"🤖 Application queued (position {job.get('queue_position', '?')})..."
+            elif completed_nodes:
+                text = f"🤖 Done: {NODE_LABELS.get(completed_nodes[-1], completed_nodes[-1])}"
+            else:
+                text = "🤖 AI agents are processing your documents..."
+            progress_bar.progress(min(len(completed_nodes) / len(NODE_LABELS), 1.0), text=text)
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+        progress_bar.empty()
+        if job['status'] == 'completed':
+            st.success("Assessment Complete!")
+            render_results(job['result'])
+        elif job['status'] == 'failed':
+            st.error(f"Processing failed: {job.get('error')}")
+        else:
+            st.error(f"No result after {JOB_TIMEOUT_SECONDS:.0f}s; the application is still being processed "
+                     f"(job {job_id}). Please check again later.")
+
 # --- Processing and Results Section ---
 if submit_button:
     # We only require the main documents for this demo
     if not all([emirates_id, resume, bank_statement, name, address_form]):
         st.error("Please fill in all fields and upload Resume, Bank Statement, and Emirates ID.")
     else:
-        with st.spinner("🤖 AI agents are processing your documents... This may take a moment."):
-            files = {
-                'emirates_id': (emirates_id.name, emirates_id.getvalue(), emirates_id.type),
-                'resume': (resume.name, resume.getvalue(), resume.type),
-                'bank_statement': (bank_statement.name, bank_statement.getvalue(), bank_statement.type),
-            }
-            payload = {
-                'name': name, 'age': age, 'monthly_income': monthly_income,
-                'family_size': family_size, 'employment_years': employment_years,
-                'address_form': address_form
-            }
-            
-            try:
-                api_url = "http://127.0.0.1:8000/process_application/"
-                response = requests.post(api_url, data=payload, files=files)
-                
-                if response.status_code == 200:
-                    st.success("Assessment Complete!")
-                    results = response.json()
-                    
-                    st.subheader("Assessment Outcome")
-                    decision = results.get('decision', {})
-                    final_decision = decision.get('final_decision', 'N/A')
-                    
-                    if final_decision == "Approve":
-                        st.balloons()
-                        st.markdown(f"### <span style='color:green;'>Status: {final_decision}</span>", unsafe_allow_html=True)
-                    elif final_decision == "Review Required":
-                        st.markdown(f"### <span style='color:orange;'>Status: {final_decision}</span>", unsafe_allow_html=True)
-                    else:
-                        st.markdown(f"### <span style='color:red;'>Status: {final_decision}</span>", unsafe_allow_html=True)
-                    
-                    st.write("**Reasoning:**", decision.get('decision_reason', 'N/A'))
-
-                    st.subheader("Economic Enablement Recommendations")
-                    recs = decision.get('enablement_recommendations', [])
-                    if recs:
-                        for rec in recs:
-                            st.markdown(f"- {rec}")
-                    
-                    st.subheader("Data Verification Details")
-                    validation = results.get('validation_result', {})
-                    if not validation.get('validation_passed'):
-                        st.warning("Discrepancies found in your documents:")
-                        for note in validation.get('validation_notes', []):
-                            st.markdown(f"- {note}")
-                    else:
-                        st.success("All document information is consistent.")
-
-                    with st.expander("Show Full AI Agent State (JSON)"):
-                        st.json(results)
-                else:
-                    st.error(f"Error from API: {response.status_code} - {response.text}")
-            except requests.exceptions.RequestException as e:
-                st.error(f"Could not connect to the backend API. Is it running? Error: {e}")
\ No newline at end of file
+        files = {
+            'emirates_id': (emirates_id.name, emirates_id.getvalue(), emirates_id.type),
+            'resume': (resume.name, resume.getvalue(), resume.type),
+            'bank_statement': (bank_statement.name, bank_statement.getvalue(), bank_statement.type),
+        }
+        if assets_excel:
+            files['assets'] = (assets_excel.name, assets_excel.getvalue(), assets_excel.type)
+        payload = {
+            'name': name, 'age': age, 'monthly_income': monthly_income,
+            'family_size': family_size, 'employment_years': employment_years,
+            'address_form': address_form
+        }
+
+        try:
+            if UI_STREAMING:
+                run_streaming(payload, files)
+            else:
+                run_job(payload, files)
+        except requests.exceptions.RequestException as e:
+            st.error(f"Could not connect to the backend API. Is it running? Error: {e}")
@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+
+from core.executors import configure_executors, shutdown_executors
+from core.llm import BATCH, set_llm_priority
+from core.schemas import ApplicationData, GraphState, state_to_dict
+
+APPLICANTS_DIR = "data/applicants"
+
+# Candidate file names per document type, in order of preference
+DOCUMENT_CANDIDATES = {
+    "emirates_id": ["emirates_id.png", "emirates_id.jpg"],
+    "resume": ["resume.pdf", "resume.docx", "resume.txt"],
+    "bank_statement": ["bank_statement.pdf", "bank_statement.xlsx", "bank_statement.txt"],
+    "assets": ["assets.xlsx"],
+}
+REQUIRED_DOCUMENTS = ["emirates_id", "resume", "bank_statement"]
+
+def resolve_documents(applicant_id: str, applicants_dir: str = APPLICANTS_DIR) -> dict:
+    """Finds an applicant's documents under <applicants_dir>/<applicant_id>/."""
+    folder = os.path.join(applicants_dir, str(applicant_id))
+    document_paths = {}
+    for doc_type, candidates in DOCUMENT_CANDIDATES.items():
+        for file_name in candidates:
+            path = os.path.join(folder, file_name)
+            if os.path.exists(path):
+                document_paths[doc_type] = path
+                break
+    missing = [doc_type for doc_type in REQUIRED_DOCUMENTS if doc_type not in document_paths]
+    if missing:
+        raise FileNotFoundError(f"Missing documents for applicant {applicant_id}: {', '.join(missing)}")
+    return document_paths
+
+def iter_applications(csv_path: str, skip_ids: set, limit: int = None):
+    """Streams application rows from the CSV, skipping already completed applicant_ids."""
+    yielded = 0
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row["applicant_id"] in skip_ids:
+                continue
+            if limit is not None and yielded >= limit:
+                return
+            yielded += 1
+            yield row
+
+def build_state(row: dict, applicants_dir: str) -> GraphState:
+    return GraphState(
+        application_data=ApplicationData(
+            name=row["name"], age=int(row["age"]), monthly_income=int(row["monthly_income"]),
+            family_size=int(row["family_size"]), employment_years=int(row["employment_years"]),
+            address_form=row["address_form"]
+        ),
+        document_paths=resolve_documents(row["applicant_id"], applicants_dir)
+    )
+
+def result_record(applicant_id: str, final_state: dict = None, error: str = None, elapsed: float = 0.0) -> dict:
+    """Flattens a graph result into one output record."""
+    record = {
+        "applicant_id": applicant_id,
+        "status": "error" if error else "ok",
+        "error": error,
+        "elapsed_seconds": round(elapsed, 3),
+        "ml_prediction": None,
+        "final_decision": None,
+        "decision_reason": None,
+        "validation_passed": None,
+        "state_json": None,
+    }
+    if final_state is not None:
+        state = state_to_dict(final_state)
+        decision = state.get("decision") or {}
+        validation = state.get("validation_result") or {}
+        record.update({
+            "ml_prediction": decision.get("ml_eligibility_prediction"),
+            "final_decision": decision.get("final_decision"),
+            "decision_reason": decision.get("decision_reason"),
+            "validation_passed": validation.get("validation_passed"),
+            "state_json": json.dumps(state, default=str),
+        })
+    return record
+
+class JSONLResultWriter:
+    """Appends one JSON line per result and flushes it, so a crash loses nothing written."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def completed_ids(self) -> set:
+        completed = set()
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Partially written last line from a crash
+                    if record.get("status") == "ok":
+                        completed.add(str(record["applicant_id"]))
+        return completed
+
+    def open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def write(self, record: dict):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class ParquetResultWriter:
+    """
+    Writes results as a directory of Parquet part files, one per `batch_size`
+    records, so completed work is durable without rewriting earlier parts.
+    Requires pyarrow.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError("Parquet output requires pyarrow: pip install pyarrow") from e
+        self.path = path
+        self.batch_size = batch_size
+        self._buffer = []
+
+    def _parts(self) -> list:
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(f for f in os.listdir(self.path) if f.endswith(".parquet"))
+
+    def completed_ids(self) -> set:
+        import pyarrow.parquet as pq
+        completed = set()
+        for part in self._parts():
+            table = pq.read_table(os.path.join(self.path, part), columns=["applicant_id", "status"])
+            for applicant_id, status in zip(table["applicant_id"].to_pylist(), table["status"].to_pylist()):
+                if status == "ok":
+                    completed.add(str(applicant_id))
+        return completed
+
+    def open(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._next_part = len(self._parts())
+
+    def write(self, record: dict):
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        part_path = os.path.join(self.path, f"part-{self._next_part:05d}.parquet")
+        pq.write_table(pa.Table.from_pylist(self._buffer), part_path + ".tmp")
+        os.replace(part_path + ".tmp", part_path)
+        self._next_part += 1
+        self._buffer = []
+
+    def close(self):
+        self._flush()
+
+async def process_application(graph, row: dict, applicants_dir: str) -> dict:
+    applicant_id = row["applicant_id"]
+    start = time.perf_counter()
+    try:
+        final_state = await graph.ainvoke(build_state(row, applicants_dir))
+        return result_record(applicant_id, final_state, elapsed=time.perf_counter() - start)
+    except Exception as e:
+        return result_record(applicant_id, error=f"{type(e).__name__}: {e}", elapsed=time.perf_counter() - start)
+
+async def run_batch(csv_path: str, writer, concurrency: int = 8, applicants_dir: str = APPLICANTS_DIR, limit: int = None):
+    """
+    Runs the graph over every pending application in the CSV with at most
+    `concurrency` applications in flight. Results are written as they finish.
+    """
+    from core.graph import get_graph
+    graph = get_graph()
+    # Orders this process's LLM calls only: the priority queue is per process,
+    # so bulk work does not yield to a separately running API server
+    set_llm_priority(BATCH)
+
+    completed = writer.completed_ids()
+    if completed:
+        print(f"Resuming: skipping {len(completed)} already completed applicants.")
+
+    writer.open()
+    semaphore = asyncio.Semaphore(concurrency)
+    pending = set()
+    counts = {"ok": 0, "error": 0}
+    start = time.perf_counter()
+
+    async def worker(row):
+        try:
+            record = await process_application(graph, row, applicants_dir)
+            writer.write(record)
+            counts[record["status"]] += 1
+            done = counts["ok"] + counts["error"]
+            if done % 10 == 0:
+                print(f"Processed {done} applications ({counts['error']} errors) in {time.perf_counter() - start:.1f}s")
+        finally:
+            semaphore.release()
+
+    try:
+        # Rows are pulled from the CSV only when a slot frees up, so memory
+        # stays flat no matter how large the CSV is.
+        for row in iter_applications(csv_path, completed, limit):
+            await semaphore.acquire()
+            task = asyncio.create_task(worker(row))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+    finally:
+        writer.close()
+        shutdown_executors()
+
+    print(f"Done: {counts['ok']} succeeded, {counts['error']} failed in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process stored applications through the AI workflow in bulk.")
+    parser.add_argument("--csv", default="data/applications.csv", help="Applications CSV (one row per applicant_id)")
+    parser.add_argument("--applicants-dir", default=APPLICANTS_DIR, help="Directory holding <applicant_id>/ document folders")
+    parser.add_argument("--output", default="data/batch_results.jsonl", help="JSONL file, or directory of part files for --format parquet")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--concurrency", type=int, default=8, help="Applications in flight at once (LLM-bound)")
+    parser.add_argument("--ocr-workers", type=int, default=None, help="Processes in the OCR pool")
+    parser.add_argument("--cpu-workers", type=int, default=None, help="Threads for document parsing")
+    parser.add_argument("--limit", type=int, default=None, help="Process at most this many pending applications")
+    args = parser.parse_args()
+
+    configure_executors(cpu_workers=args.cpu_workers, ocr_workers=args.ocr_workers)
+    writer = ParquetResultWriter(args.output) if args.format == "parquet" else JSONLResultWriter(args.output)
+    asyncio.run(run_batch(args.csv, writer, args.concurrency, args.applicants_dir, args.limit))
@@ -0,0 +1,51 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import REPO_ROOT, write_results
+
+# Each probe runs in a fresh interpreter and prints the seconds it took
+PROBES = {
+    "import core.tools": "import core.tools",
+    "import core.graph": "import core.graph",
+    "import main": "import main",
+    "import main + warm_up": "import main\nfrom core.resources import warm_up\nwarm_up()",
+    "import main + first prediction": (
+        "import main\n"
+        "from core.tools import predict_eligibility_batch\n"
+        "predict_eligibility_batch([{'age': 30, 'monthly_income': 5000, 'family_size': 3, 'employment_years': 5}])"
+    ),
+}
+
+def run_probe(code: str) -> float:
+    script = "import time\n_start = time.perf_counter()\n" + code + "\nprint(time.perf_counter() - _start)"
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, "PYTHONWARNINGS": "ignore"}
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+def run(repeat: int) -> dict:
+    results = {}
+    for name, code in PROBES.items():
+        samples = [run_probe(code) for _ in range(repeat)]
+        results[name] = {
+            "median_seconds": round(statistics.median(samples), 4),
+            "min_seconds": round(min(samples), 4),
+            "max_seconds": round(max(samples), 4),
+        }
+        print(f"{name:<34} median {results[name]['median_seconds']:.3f}s  min {results[name]['min_seconds']:.3f}s")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold-start (import and warm-up) time in fresh interpreters.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per probe")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+    results = run(args.repeat)
+    if args.output:
+        write_results(args.output, "cold_start", results, {"repeat": args.repeat})
@@ -0,0 +1,66 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Sequence
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """q-th percentile (0-100) with linear interpolation; 0.0 for no samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+def summarize(samples: Sequence[float], scale: float = 1.0) -> Dict[str, float]:
+    """count, mean, p50/p95/p99 and max of `samples`, each multiplied by `scale`."""
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean": round(sum(samples) / len(samples) * scale, 4),
+        "p50": round(percentile(samples, 50) * scale, 4),
+        "p95": round(percentile(samples, 95) * scale, 4),
+        "p99": round(percentile(samples, 99) * scale, 4),
+        "max": round(max(samples) * scale, 4),
+    }
+
+def time_calls(func, repeat: int, *args, **kwargs) -> List[float]:
+    """Wall time in seconds of `repeat` calls to func(*args, **kwargs)."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def write_results(path: str, benchmark: str, results: dict, config: dict = None):
+    """Saves results with enough context (commit, machine, config) to compare runs later."""
+    document = {
+        "benchmark": benchmark,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": config or {},
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {path}")
@@ -0,0 +1,61 @@
+"""
+Compares two benchmark result files written by the benchmarks in this folder.
+
+    python benchmarks/compare.py cache/bench/baseline.json cache/bench/load.json --threshold 10
+
+Every numeric result present in both files is listed with its relative
+change. Timings are better when lower, throughput when higher; the exit code
+is 1 when any metric got worse by more than --threshold percent.
+"""
+import argparse
+import json
+import sys
+
+# Metrics (by the last key of their path) where a higher value is better
+HIGHER_IS_BETTER = {"throughput_rps", "speedup", "succeeded", "images_per_second", "name_accuracy", "idn_accuracy"}
+# Counts describing the run rather than its performance
+IGNORED = {"count", "requests", "batch_size"}
+
+def flatten(value, prefix: str = "") -> dict:
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: float(value)}
+    return {}
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    if baseline.get("benchmark") != current.get("benchmark"):
+        print(f"Warning: comparing {baseline.get('benchmark')} against {current.get('benchmark')}")
+    print(f"baseline {baseline.get('commit')} ({baseline.get('timestamp')}) -> current {current.get('commit')} ({current.get('timestamp')})\n")
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        metric = key.rsplit(".", 1)[-1]
+        if metric in IGNORED or old[key] == 0:
+            continue
+        change = (new[key] - old[key]) / abs(old[key]) * 100
+        worse = -change if metric in HIGHER_IS_BETTER else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif worse < -threshold:
+            flag = "  improved"
+        print(f"{key:<60} {old[key]:>12.4f} -> {new[key]:>12.4f}  {change:+7.1f}%{flag}")
+    print(f"\n{regressions} regression(s) beyond {threshold}%")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two benchmark JSON result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change counted as a regression")
+    args = parser.parse_args()
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    sys.exit(compare(baseline, current, args.threshold))
@@ -0,0 +1,170 @@
+"""
+Local stand-in for Ollama's OpenAI-compatible /v1/chat/completions endpoint.
+
+Answers are synthesized from the prompt (structured extraction as a tool call
+or JSON schema response, the decision as a JSON message) with a configurable
+prefill delay and token rate, so the pipeline can be load tested without a
+model. Supports streaming (including tool call deltas and usage chunks).
+
+    python benchmarks/fake_ollama.py --port 11435 --latency 0.5 --tokens-per-second 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="Fake Ollama")
+app.state.latency = float(os.getenv("FAKE_LLM_LATENCY", 0.5))
+app.state.tokens_per_second = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", 20))
+# Prompt processing speed; 0 disables the prompt-length dependent delay
+app.state.prefill_tokens_per_second = float(os.getenv("FAKE_LLM_PREFILL_TOKENS_PER_SECOND", 0))
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+def _prompt_text(messages: list) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        parts.append(content)
+    return "\n".join(parts)
+
+def _fake_field(name: str, schema: dict, prompt: str):
+    """A plausible value for one schema property, read from the prompt where we can."""
+    if name == "name_from_id":
+        match = re.search(r"Name\s*[:;]\s*([^\n]+)", prompt)
+        return match.group(1).strip() if match else "Unknown Applicant"
+    if name == "income_from_statement":
+        match = re.search(r"AED\s*(\d[\d,]*)", prompt)
+        return int(match.group(1).replace(",", "")) if match else 5000
+    if name == "experience_from_resume":
+        match = re.search(r"Experience:?\s*\n\s*-\s*([^\n]+)", prompt)
+        return match.group(1).strip() if match else "5 years of relevant experience"
+    types = schema.get("type") or [option.get("type") for option in schema.get("anyOf", [])]
+    types = types if isinstance(types, list) else [types]
+    if "integer" in types or "number" in types:
+        return 0
+    if "boolean" in types:
+        return False
+    if "array" in types:
+        return []
+    return "n/a"
+
+def _fake_structured(schema: dict, prompt: str) -> dict:
+    properties = schema.get("properties", {})
+    return {name: _fake_field(name, field_schema, prompt) for name, field_schema in properties.items()}
+
+def _fake_decision(prompt: str) -> str:
+    match = re.search(r"Income:\s*(\d+)", prompt)
+    income = int(match.group(1)) if match else 0
+    decision = "Approve" if income and income < 8000 else "Soft Decline"
+    return json.dumps({
+        "final_decision": decision,
+        "decision_reason": f"Synthetic decision for a monthly income of {income} AED.",
+        "enablement_recommendations": [
+            "Enroll in a certified upskilling program.",
+            "Register with the national job matching platform.",
+        ],
+    })
+
+def build_reply(body: dict) -> dict:
+    """Returns {"content": str} or {"tool_call": {"name", "arguments"}} for a request."""
+    prompt = _prompt_text(body.get("messages", []))
+    tools = body.get("tools") or []
+    if tools:
+        function = tools[0]["function"]
+        arguments = json.dumps(_fake_structured(function.get("parameters", {}), prompt))
+        return {"tool_call": {"name": function["name"], "arguments": arguments}}
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        return {"content": json.dumps(_fake_structured(response_format["json_schema"].get("schema", {}), prompt))}
+    if "final_decision" in prompt:
+        return {"content": _fake_decision(prompt)}
+    return {"content": "OK"}
+
+def _pieces(text: str, size: int = 4):
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+async def _prefill(prompt_tokens: int):
+    delay = app.state.latency
+    if app.state.prefill_tokens_per_second > 0:
+        delay += prompt_tokens / app.state.prefill_tokens_per_second
+    await asyncio.sleep(delay)
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    reply = build_reply(body)
+    prompt_tokens = _count_tokens(_prompt_text(body.get("messages", [])))
+    text = reply["tool_call"]["arguments"] if "tool_call" in reply else reply["content"]
+    completion_tokens = _count_tokens(text)
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    model = body.get("model", "phi3")
+    created = int(time.time())
+    finish_reason = "tool_calls" if "tool_call" in reply else "stop"
+
+    if not body.get("stream"):
+        await _prefill(prompt_tokens)
+        await asyncio.sleep(completion_tokens / app.state.tokens_per_second)
+        message = {"role": "assistant", "content": reply.get("content")}
+        if "tool_call" in reply:
+            message["tool_calls"] = [{"id": f"call_{uuid.uuid4().hex[:8]}", "type": "function", "function": reply["tool_call"]}]
+        return JSONResponse({
+            "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": usage,
+        })
+
+    include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+    def chunk(delta: dict = None, finish: str = None, with_usage: bool = False) -> str:
+        payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                   "choices": [] if with_usage else [{"index": 0, "delta": delta or {}, "finish_reason": finish}]}
+        if with_usage:
+            payload["usage"] = usage
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def events():
+        await _prefill(prompt_tokens)
+        if "tool_call" in reply:
+            yield chunk({"role": "assistant", "content": None, "tool_calls": [{
+                "index": 0, "id": f"call_{uuid.uuid4().hex[:8]}", "type": "function",
+                "function": {"name": reply["tool_call"]["name"], "arguments": ""}}]})
+        else:
+            yield chunk({"role": "assistant", "content": ""})
+        for piece in _pieces(text):
+            await asyncio.sleep(1 / app.state.tokens_per_second)
+            if "tool_call" in reply:
+                yield chunk({"tool_calls": [{"index": 0, "function": {"arguments": piece}}]})
+            else:
+                yield chunk({"content": piece})
+        yield chunk(finish=finish_reason)
+        if include_usage:
+            yield chunk(with_usage=True)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM endpoint for load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=app.state.latency, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=app.state.tokens_per_second, help="Generation speed")
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=app.state.prefill_tokens_per_second,
+                        help="Prompt processing speed (0 = prompt length adds no delay)")
+    args = parser.parse_args()
+    app.state.latency = args.latency
+    app.state.tokens_per_second = args.tokens_per_second
+    app.state.prefill_tokens_per_second = args.prefill_tokens_per_second
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
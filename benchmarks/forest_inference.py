@@ -0,0 +1,78 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import write_results
+from core.forest import ForestPredictor, export_forest
+
+MODEL_PATH = "models/eligibility_classifier.joblib"
+
+def synthetic_features(n: int, seed: int = 0) -> np.ndarray:
+    """Feature rows (age, income, family size, employment years, income per person) over the training ranges."""
+    rng = np.random.default_rng(seed)
+    age = rng.integers(18, 80, n)
+    income = rng.integers(0, 60000, n)
+    family_size = rng.integers(1, 12, n)
+    employment_years = rng.integers(0, 45, n)
+    return np.column_stack([age, income, family_size, employment_years, income / family_size]).astype(np.float64)
+
+def check_parity(model, predictor: ForestPredictor, X: np.ndarray):
+    """Raises AssertionError unless the NumPy predictor reproduces sklearn's probabilities."""
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        expected = model.predict_proba(X)
+    actual = predictor.predict_proba(X)
+    max_diff = float(np.abs(expected - actual).max())
+    assert max_diff < 1e-9, f"probabilities differ by up to {max_diff}"
+    assert np.array_equal(model.classes_[expected.argmax(axis=1)], predictor.predict(X)), "predicted labels differ"
+    return max_diff
+
+def time_call(func, X: np.ndarray, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(X)
+        samples.append(time.perf_counter() - start)
+    return {"median_ms": round(statistics.median(samples) * 1000, 4), "min_ms": round(min(samples) * 1000, 4)}
+
+def run(batch_size: int, repeat: int, export_dir: str) -> dict:
+    model = joblib.load(MODEL_PATH)
+    export_forest(model, export_dir)
+    predictor = ForestPredictor.load(export_dir)
+
+    parity_rows = synthetic_features(100000, seed=1)
+    max_diff = check_parity(model, predictor, parity_rows)
+    print(f"Parity OK on {len(parity_rows)} rows (max |diff| {max_diff:.2e})")
+
+    single = synthetic_features(1, seed=2)
+    batch = synthetic_features(batch_size, seed=3)
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        results = {
+            "sklearn_single": time_call(model.predict_proba, single, repeat),
+            "numpy_single": time_call(predictor.predict_proba, single, repeat),
+            "sklearn_batch": time_call(model.predict_proba, batch, max(3, repeat // 20)),
+            "numpy_batch": time_call(predictor.predict_proba, batch, max(3, repeat // 20)),
+        }
+    for name, timing in results.items():
+        print(f"{name:<16} median {timing['median_ms']:.3f} ms  min {timing['min_ms']:.3f} ms")
+    return {"parity_max_abs_diff": max_diff, "batch_size": batch_size, "timings": results}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the NumPy forest against sklearn and compare their latency.")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=200, help="Timed calls for single-row scoring")
+    parser.add_argument("--export-dir", default="cache/bench/eligibility_forest")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+    results = run(args.batch_size, args.repeat, args.export_dir)
+    if args.output:
+        write_results(args.output, "forest_inference", results, {"batch_size": args.batch_size, "repeat": args.repeat})
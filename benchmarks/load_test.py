@@ -0,0 +1,184 @@
+"""
+End-to-end load test of POST /process_application/.
+
+Generates synthetic applicants, starts the fake LLM endpoint and the API
+(unless --api-url points at a running one), replays applications at a target
+concurrency and reports latency percentiles, throughput and the per-node /
+tool / LLM breakdown returned with ?include_timings=true.
+
+    python benchmarks/load_test.py --applicants 100 --concurrency 8 --output cache/bench/load.json
+"""
+import argparse
+import asyncio
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import REPO_ROOT, summarize, write_results
+
+DOCUMENT_FILES = {
+    "emirates_id": ("emirates_id.png", "image/png"),
+    "resume": ("resume.pdf", "application/pdf"),
+    "bank_statement": ("bank_statement.txt", "text/plain"),
+    "assets": ("assets.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+def ensure_applicants(data_dir: str, count: int, regenerate: bool = False) -> list:
+    """Returns `count` application rows from data_dir, generating only the missing ones."""
+    from create_synthetic_data import create_applicant_data
+    # Only the documents the load test uploads
+    create_applicant_data(count, data_dir=data_dir, documents=["emirates_id", "resume_pdf", "bank_statement", "assets"],
+                          incremental=not regenerate)
+    csv_path = os.path.join(data_dir, "applications.csv")
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        rows = sorted(csv.DictReader(f), key=lambda row: int(row["applicant_id"]))
+    return rows[:count]
+
+def start_server(args: list, env: dict, ready_url: str, timeout: float = 60.0) -> subprocess.Popen:
+    process = subprocess.Popen(args, cwd=REPO_ROOT, env={**os.environ, **env})
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(args)} exited with code {process.returncode}")
+        try:
+            if httpx.get(ready_url, timeout=1.0).status_code < 500:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{ready_url} not ready after {timeout}s")
+
+def build_request(row: dict, data_dir: str):
+    folder = os.path.join(data_dir, "applicants", row["applicant_id"])
+    form = {key: row[key] for key in ("name", "age", "monthly_income", "family_size", "employment_years", "address_form")}
+    files = {}
+    for doc_type, (file_name, content_type) in DOCUMENT_FILES.items():
+        with open(os.path.join(folder, file_name), "rb") as f:
+            files[doc_type] = (file_name, f.read(), content_type)
+    return form, files
+
+async def drive(api_url: str, requests: list, concurrency: int, timeout: float) -> dict:
+    """Sends every prepared request with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, breakdown, errors, decisions = [], defaultdict(list), defaultdict(int), defaultdict(int)
+
+    async with httpx.AsyncClient(base_url=api_url, timeout=timeout) as client:
+        async def send(form, files):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/process_application/", params={"include_timings": "true"}, data=form, files=files)
+                except httpx.HTTPError as e:
+                    errors[type(e).__name__] += 1
+                    return
+                elapsed = time.perf_counter() - start
+                if response.status_code != 200:
+                    errors[f"HTTP {response.status_code}"] += 1
+                    return
+                latencies.append(elapsed)
+                body = response.json()
+                for key, seconds in (body.get("timings") or {}).items():
+                    breakdown[key].append(seconds)
+                decisions[(body.get("decision") or {}).get("final_decision", "unknown")] += 1
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(send(form, files) for form, files in requests))
+        wall = time.perf_counter() - wall_start
+
+    return {
+        "requests": len(requests),
+        "succeeded": len(latencies),
+        "errors": dict(errors),
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else 0.0,
+        "latency_seconds": summarize(latencies),
+        "breakdown_seconds": {key: summarize(values) for key, values in sorted(breakdown.items())},
+        "decisions": dict(decisions),
+    }
+
+def print_report(results: dict):
+    latency = results["latency_seconds"]
+    print(f"\n{results['succeeded']}/{results['requests']} succeeded in {results['wall_seconds']}s "
+          f"-> {results['throughput_rps']} req/s; errors: {results['errors'] or 'none'}")
+    if latency.get("count"):
+        print(f"latency  p50 {latency['p50']:.3f}s  p95 {latency['p95']:.3f}s  p99 {latency['p99']:.3f}s  max {latency['max']:.3f}s")
+    print(f"\n{'component':<40} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}  (seconds)")
+    for key, stats in results["breakdown_seconds"].items():
+        print(f"{key:<40} {stats['mean']:>8.3f} {stats['p50']:>8.3f} {stats['p95']:>8.3f} {stats['p99']:>8.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the application API against a fake LLM.")
+    parser.add_argument("--applicants", type=int, default=50, help="Distinct synthetic applicants")
+    parser.add_argument("--requests", type=int, default=None, help="Requests to send (default: one per applicant)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured requests sent first")
+    parser.add_argument("--data-dir", default="cache/bench", help="Where synthetic applicants are generated and reused")
+    parser.add_argument("--regenerate", action="store_true", help="Generate fresh applicants even if some exist")
+    parser.add_argument("--api-url", default=None, help="Use a running API instead of starting one")
+    parser.add_argument("--api-port", type=int, default=8765)
+    parser.add_argument("--llm-port", type=int, default=11435)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Fake LLM seconds before the first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=20)
+    parser.add_argument("--llm-prefill-tokens-per-second", type=float, default=0)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    data_dir = os.path.abspath(args.data_dir)
+    rows = ensure_applicants(data_dir, args.applicants, args.regenerate)
+    total = args.requests or len(rows)
+    requests = [build_request(rows[i % len(rows)], data_dir) for i in range(total)]
+
+    processes = []
+    try:
+        api_url = args.api_url
+        if api_url is None:
+            llm_url = f"http://127.0.0.1:{args.llm_port}"
+            processes.append(start_server([
+                sys.executable, "benchmarks/fake_ollama.py", "--port", str(args.llm_port),
+                "--latency", str(args.llm_latency), "--tokens-per-second", str(args.llm_tokens_per_second),
+                "--prefill-tokens-per-second", str(args.llm_prefill_tokens_per_second),
+            ], {}, f"{llm_url}/docs"))
+            # Fresh caches per run so results are not answered from earlier runs
+            run_dir = tempfile.mkdtemp(prefix="load_test_", dir=data_dir)
+            api_url = f"http://127.0.0.1:{args.api_port}"
+            processes.append(start_server([
+                sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.api_port), "--log-level", "warning",
+            ], {
+                "OLLAMA_BASE_URL": f"{llm_url}/v1",
+                "LLM_CACHE_BACKEND": "none",
+                # Repeated applicants send identical prompts; each request must pay for its own generation
+                "LLM_COALESCE": "0",
+                "DOCUMENT_CACHE_PATH": os.path.join(run_dir, "documents.sqlite"),
+                "BLOB_STORE_PATH": os.path.join(run_dir, "blobs.sqlite"),
+                "JOB_DB_PATH": os.path.join(run_dir, "jobs.sqlite"),
+                "RESULTS_DB_PATH": os.path.join(run_dir, "results.sqlite"),
+                "CHECKPOINT_DB_PATH": os.path.join(run_dir, "checkpoints.sqlite"),
+                # Repeated applicants must run the graph, not come back from the result store
+                "RESULT_REUSE": "0",
+            }, f"{api_url}/metrics", timeout=120.0))
+
+        if args.warmup:
+            asyncio.run(drive(api_url, requests[:args.warmup], args.concurrency, args.timeout))
+        results = asyncio.run(drive(api_url, requests, args.concurrency, args.timeout))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=30)
+
+    print_report(results)
+    if args.output:
+        config = {key: value for key, value in vars(args).items() if key != "output"}
+        write_results(args.output, "load_test", results, config)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Micro-benchmarks of the per-application tools: document parsing per format,
+OCR and eligibility prediction. Parsing and OCR are timed without the
+document cache (the cost of a new upload) and as cache hits.
+
+    python benchmarks/micro.py --repeat 50 --output cache/bench/micro.json
+"""
+import argparse
+import os
+import sys
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import summarize, time_calls, write_results
+from core.resources import warm_up
+from core.tools import (DOCUMENT_MAX_CHARS, DOCUMENT_MAX_PAGES, _ocr_image, _parse_document,
+                        parse_document, predict_eligibility, predict_eligibility_batch)
+
+SAMPLE_DOCUMENTS = ["resume.pdf", "resume.docx", "resume.txt", "bank_statement.txt", "assets.xlsx"]
+SAMPLE_APPLICANT = {"age": 35, "monthly_income": 6500, "family_size": 4, "employment_years": 8}
+
+def bench(name: str, results: dict, func, repeat: int, *args):
+    try:
+        samples = time_calls(func, repeat, *args)
+    except Exception as e:
+        results[name] = {"error": f"{type(e).__name__}: {e}"}
+        print(f"{name:<40} unavailable ({type(e).__name__})")
+        return
+    results[name] = summarize(samples, scale=1000)
+    print(f"{name:<40} p50 {results[name]['p50']:>9.3f} ms  p95 {results[name]['p95']:>9.3f} ms")
+
+def run(applicant_dir: str, repeat: int, batch_size: int) -> dict:
+    warm_up(["eligibility_model"])
+    results = {}
+    for file_name in SAMPLE_DOCUMENTS:
+        path = os.path.join(applicant_dir, file_name)
+        if not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        bench(f"parse:{file_name}", results, _parse_document, repeat, data, file_name, DOCUMENT_MAX_PAGES, DOCUMENT_MAX_CHARS)
+        bench(f"parse_cached:{file_name}", results, parse_document, repeat, path)
+
+    image_path = os.path.join(applicant_dir, "emirates_id.png")
+    with open(image_path, "rb") as f:
+        image = f.read()
+    bench("ocr:emirates_id.png", results, _ocr_image, max(1, repeat // 5), image)
+
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=DeprecationWarning)
+        bench("predict_eligibility:tool", results, predict_eligibility.invoke, repeat, {"data": SAMPLE_APPLICANT})
+    bench("predict_eligibility:single", results, predict_eligibility_batch, repeat, [SAMPLE_APPLICANT])
+    bench(f"predict_eligibility:batch_{batch_size}", results, predict_eligibility_batch,
+          max(1, repeat // 10), [SAMPLE_APPLICANT] * batch_size)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for document parsing, OCR and eligibility prediction.")
+    parser.add_argument("--applicant-dir", default="data/applicants/1000", help="Folder with sample documents")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+    results = run(args.applicant_dir, args.repeat, args.batch_size)
+    if args.output:
+        write_results(args.output, "micro", results, {"repeat": args.repeat, "batch_size": args.batch_size, "applicant_dir": args.applicant_dir})
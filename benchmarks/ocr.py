@@ -0,0 +1,100 @@
+"""
+Throughput and accuracy of Emirates ID OCR: the original full-resolution
+pytesseract call against the preprocessed full-page and region-targeted
+modes of core/ocr.py, with each available engine.
+
+    python benchmarks/ocr.py --data-dir data --limit 100 --output cache/bench/ocr.json
+
+Accuracy is measured against applications.csv: the name must be extracted
+exactly, and the IDN line must read as the card's ID number.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import summarize, write_results
+from core.extractors import extract_name
+from core.ocr import CARD_REGIONS, PytesseractEngine, TesserocrEngine, ocr_id_card
+
+# Printed on every synthetic card (see create_synthetic_data.py)
+EXPECTED_IDN = "784-1990-1234567-1"
+IDN_PATTERN = next(region.pattern for region in CARD_REGIONS if region.field == "idn")
+
+def baseline(path: str) -> str:
+    """What tools._ocr_image did before core/ocr.py: the whole image, default settings."""
+    import pytesseract
+    from PIL import Image
+    return pytesseract.image_to_string(Image.open(path))
+
+def load_cards(data_dir: str, limit: int) -> list:
+    with open(os.path.join(data_dir, "applications.csv"), newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    cards = []
+    for row in rows:
+        path = os.path.join(data_dir, "applicants", row["applicant_id"], "emirates_id.png")
+        if os.path.exists(path):
+            cards.append((path, row["name"]))
+        if len(cards) == limit:
+            break
+    return cards
+
+def run_mode(read, cards: list) -> dict:
+    samples, names, idns = [], 0, 0
+    start = time.perf_counter()
+    for path, expected_name in cards:
+        call_start = time.perf_counter()
+        text = read(path)
+        samples.append(time.perf_counter() - call_start)
+        names += extract_name(text)[0] == expected_name
+        match = IDN_PATTERN.search(text)
+        idns += match is not None and match.group(0) == EXPECTED_IDN
+    wall = time.perf_counter() - start
+    return {
+        "images_per_second": round(len(cards) / wall, 3),
+        "latency_ms": summarize(samples, scale=1000),
+        "name_accuracy": round(names / len(cards), 4),
+        "idn_accuracy": round(idns / len(cards), 4),
+    }
+
+def run(data_dir: str, limit: int) -> dict:
+    cards = load_cards(data_dir, limit)
+    if not cards:
+        raise SystemExit(f"No emirates_id.png found under {data_dir}/applicants (run create_synthetic_data.py)")
+    engines = {"pytesseract": PytesseractEngine, "tesserocr": TesserocrEngine}
+    modes = {"baseline": baseline}
+    for engine_name, engine_class in engines.items():
+        try:
+            engine = engine_class()
+        except ImportError as e:
+            print(f"{engine_name:<24} unavailable ({e})")
+            continue
+        modes[f"full:{engine_name}"] = lambda path, engine=engine: ocr_id_card(path, mode="full", engine=engine)
+        modes[f"regions:{engine_name}"] = lambda path, engine=engine: ocr_id_card(path, mode="regions", engine=engine)
+
+    results = {}
+    for name, read in modes.items():
+        try:
+            read(cards[0][0])  # Warm-up: loads the engine and language model
+            results[name] = run_mode(read, cards)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"{name:<24} unavailable ({type(e).__name__})")
+            continue
+        stats = results[name]
+        print(f"{name:<24} {stats['images_per_second']:>8.2f} img/s  p50 {stats['latency_ms']['p50']:>8.2f} ms  "
+              f"name {stats['name_accuracy']:.1%}  idn {stats['idn_accuracy']:.1%}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Emirates ID OCR modes and engines.")
+    parser.add_argument("--data-dir", default="data", help="Folder with applications.csv and applicants/<id>/emirates_id.png")
+    parser.add_argument("--limit", type=int, default=100, help="Cards to read per mode")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+    results = run(args.data_dir, args.limit)
+    if args.output:
+        write_results(args.output, "ocr", results, {"data_dir": args.data_dir, "limit": args.limit})
@@ -0,0 +1,138 @@
+"""
+Throughput of the API served by serve.py with 1, 2, 4... worker processes.
+
+For each worker count, starts the fake LLM endpoint and `serve.py --workers N`
+with fresh caches, replays the same applications at a fixed concurrency and
+records throughput, latency and the memory of the server's processes. The
+LLM slot budget is set high enough that the fake LLM is never the limit, so
+the numbers show how OCR, parsing and scoring scale across processes.
+
+    python benchmarks/serve_scaling.py --workers 1 2 4 --applicants 40 --concurrency 16 --output cache/bench/serve.json
+
+Workers beyond the number of cores cannot add throughput; run on the
+deployment host size. Memory is the proportional set size (PSS) summed over the
+master and its workers, so pages shared copy-on-write after the preload are
+counted once; it is only available on Linux.
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import write_results
+from benchmarks.load_test import build_request, drive, ensure_applicants, start_server
+
+def process_tree(pid: int) -> list:
+    """The process and all of its descendants, from /proc."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    # The parent pid is the second field after the parenthesized command
+                    parent = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(parent, []).append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+def server_memory_mb(pid: int):
+    """Total PSS of the server's processes in MB, or None where /proc is unavailable."""
+    if not os.path.exists(f"/proc/{pid}/smaps_rollup"):
+        return None
+    total_kb = 0
+    for member in process_tree(pid):
+        try:
+            with open(f"/proc/{member}/smaps_rollup") as f:
+                total_kb += sum(int(line.split()[1]) for line in f if line.startswith("Pss:"))
+        except OSError:
+            continue
+    return round(total_kb / 1024, 1)
+
+def run_workers(workers: int, requests: list, args, llm_url: str, data_dir: str) -> dict:
+    run_dir = tempfile.mkdtemp(prefix=f"serve_{workers}_", dir=data_dir)
+    api_url = f"http://127.0.0.1:{args.api_port}"
+    process = start_server([
+        sys.executable, "serve.py", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(args.api_port),
+    ], {
+        "OLLAMA_BASE_URL": f"{llm_url}/v1",
+        "LLM_CACHE_BACKEND": "none",
+        "LLM_MAX_CONCURRENCY": str(args.concurrency * workers),
+        "DOCUMENT_CACHE_PATH": os.path.join(run_dir, "documents.sqlite"),
+        "JOB_DB_PATH": os.path.join(run_dir, "jobs.sqlite"),
+        "RESULTS_DB_PATH": os.path.join(run_dir, "results.sqlite"),
+        "CHECKPOINT_DB_PATH": os.path.join(run_dir, "checkpoints.sqlite"),
+        "BLOB_STORE_PATH": os.path.join(run_dir, "blobs.sqlite"),
+        "RESULT_REUSE": "0",
+        "LLM_COALESCE": "0",
+    }, f"{api_url}/metrics", timeout=180.0)
+    try:
+        # Enough warm-up requests to reach every worker once
+        asyncio.run(drive(api_url, requests[:max(args.warmup, workers * 2)], args.concurrency, args.timeout))
+        run = asyncio.run(drive(api_url, requests, args.concurrency, args.timeout))
+        run["memory_pss_mb"] = server_memory_mb(process.pid)
+        return run
+    finally:
+        process.terminate()
+        process.wait(timeout=args.timeout)
+
+def gunicorn_available() -> bool:
+    """Whether serve.py will use gunicorn (and preload) rather than the uvicorn fallback."""
+    return importlib.util.find_spec("gunicorn") is not None
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API throughput against the number of worker processes.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to compare")
+    parser.add_argument("--applicants", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=4, help="Unmeasured requests sent first")
+    parser.add_argument("--data-dir", default="cache/bench")
+    parser.add_argument("--api-port", type=int, default=8766)
+    parser.add_argument("--llm-port", type=int, default=11436)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM seconds before the first token")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=200)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    data_dir = os.path.abspath(args.data_dir)
+    rows = ensure_applicants(data_dir, args.applicants)
+    requests = [build_request(row, data_dir) for row in rows]
+
+    llm_url = f"http://127.0.0.1:{args.llm_port}"
+    fake_llm = start_server([
+        sys.executable, "benchmarks/fake_ollama.py", "--port", str(args.llm_port),
+        "--latency", str(args.llm_latency), "--tokens-per-second", str(args.llm_tokens_per_second),
+    ], {}, f"{llm_url}/docs")
+    results = {}
+    try:
+        for workers in args.workers:
+            results[f"workers_{workers}"] = run = run_workers(workers, requests, args, llm_url, data_dir)
+            print(f"{workers:>2} workers  {run['throughput_rps']:>8.2f} req/s  "
+                  f"p50 {run['latency_seconds'].get('p50', 0):.3f}s  p95 {run['latency_seconds'].get('p95', 0):.3f}s  "
+                  f"PSS {run['memory_pss_mb']} MB  errors: {run['errors'] or 'none'}")
+    finally:
+        fake_llm.terminate()
+        fake_llm.wait(timeout=30)
+
+    baseline = results[f"workers_{args.workers[0]}"]["throughput_rps"]
+    for workers in args.workers:
+        run = results[f"workers_{workers}"]
+        run["speedup"] = round(run["throughput_rps"] / baseline, 3) if baseline else None
+    if args.output:
+        write_results(args.output, "serve_scaling", results, {
+            "applicants": args.applicants, "concurrency": args.concurrency, "cpu_count": os.cpu_count(),
+            "server": "gunicorn --preload" if gunicorn_available() else "uvicorn --workers",
+        })
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Per-application cost of carrying the graph state: rebuilding it before every
+node, checkpointing it after every step and serializing the response.
+
+Compares the original representation (document bytes inline as DocumentBlob,
+parsed texts inline, json.dumps responses) with the compact one (DocumentRef
+into the blob store, document cache keys for the texts, orjson) on a state
+with large documents. Each simulated request rebuilds the
+state as often as a full LLM-decision run does and serializes it with the
+checkpointer's serializer once per checkpoint. The components section also
+times GraphState validation against model_construct: pydantic does not
+revalidate nested model instances, so validation costs about as much as
+skipping it and nodes keep receiving validated states.
+
+    python benchmarks/state.py --document-mb 2 --repeat 20 --output cache/bench/state.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict
+
+import orjson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from benchmarks.common import summarize, write_results
+from core.blobs import BlobStore
+from core.schemas import (ApplicationData, Decision, DocumentBlob, ExtractedData, FieldExtraction, GraphState,
+                          ValidationResult, state_to_dict)
+from core.tools import DOCUMENT_MAX_CHARS, DOCUMENT_MAX_PAGES, PARSER_VERSION
+from main import FastJSONResponse
+
+DOCUMENT_TYPES = {"emirates_id": "emirates_id.png", "resume": "resume.pdf", "bank_statement": "bank_statement.pdf", "assets": "assets.xlsx"}
+# A run through the decision LLM: 4 readers, extraction, validation, ML check
+# and decision read the state, plus the two routing functions
+STATE_REBUILDS = 10
+# Checkpoints written: the input, the reader superstep and one per later node
+CHECKPOINTS = 6
+
+class InlineGraphState(GraphState):
+    """The state as it was before: parsed document texts carried in a channel."""
+    document_texts: Dict[str, str] = {}
+
+def final_values(documents: dict, inline_texts: bool) -> dict:
+    """Channel values of a finished application, with document texts at the parser's size limit."""
+    if inline_texts:
+        texts = {"document_texts": {doc_type: "x" * DOCUMENT_MAX_CHARS for doc_type in documents}}
+    else:
+        texts = {"document_text_keys": {doc_type: f"{PARSER_VERSION}-p{DOCUMENT_MAX_PAGES}-c{DOCUMENT_MAX_CHARS}:{ref.digest}"
+                                        for doc_type, ref in documents.items()}}
+    return {
+        "application_data": ApplicationData(name="Kimberly Mcintosh", age=42, monthly_income=9240, family_size=4,
+                                            employment_years=7, address_form="Villa 12, Al Barsha, Dubai"),
+        "document_paths": documents,
+        **texts,
+        "extracted_data": ExtractedData(name_from_id="Kimberly Mcintosh", income_from_statement=9200,
+                                        experience_from_resume="7 years in logistics"),
+        "extraction_details": {field: FieldExtraction(method="rules", confidence=0.95)
+                               for field in ("name_from_id", "income_from_statement", "experience_from_resume")},
+        "validation_result": ValidationResult(name_matches=True, income_consistent=True, validation_passed=True),
+        "decision": Decision(ml_eligibility_prediction="Decline", ml_eligibility_probability=0.71,
+                             final_decision="Soft Decline", decision_reason="Income above the threshold.",
+                             enablement_recommendations=["Register with the job matching platform."]),
+    }
+
+def simulate_request(values: dict, serde, response_class) -> dict:
+    state_class = InlineGraphState if "document_texts" in values else GraphState
+    for _ in range(STATE_REBUILDS):
+        state_class(**values)
+    checkpoint_bytes = sum(len(serde.dumps_typed(values)[1]) for _ in range(CHECKPOINTS))
+    body = response_class(content=state_to_dict(values)).body
+    return {"checkpoint_bytes": checkpoint_bytes, "response_bytes": len(body)}
+
+def measure(values: dict, response_class, repeat: int) -> dict:
+    serde = JsonPlusSerializer()
+    sizes = simulate_request(values, serde, response_class)  # Warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        simulate_request(values, serde, response_class)
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    simulate_request(values, serde, response_class)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "request_ms": summarize(samples, scale=1000),
+        "peak_alloc_mb": round(peak / 1e6, 3),
+        "checkpoint_mb": round(sizes["checkpoint_bytes"] / 1e6, 3),
+        "response_kb": round(sizes["response_bytes"] / 1e3, 1),
+    }
+
+def measure_components(values: dict, repeat: int) -> dict:
+    """Milliseconds of each part on its own, so the savings can be attributed."""
+    def timed(func, *args):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(*args)
+            samples.append(time.perf_counter() - start)
+        return summarize(samples, scale=1000)
+    content = state_to_dict(values)
+    return {
+        "validate_state_ms": timed(lambda: GraphState(**values)),
+        "construct_state_ms": timed(lambda: GraphState.model_construct(**values)),
+        "json_response_ms": timed(lambda: JSONResponse(content=content)),
+        "orjson_response_ms": timed(lambda: FastJSONResponse(content=content)),
+        "json_round_trip_ms": timed(lambda: json.loads(json.dumps(content, default=str))),
+        "orjson_round_trip_ms": timed(lambda: orjson.loads(orjson.dumps(content, default=str))),
+    }
+
+def run(document_mb: float, repeat: int) -> dict:
+    content = os.urandom(int(document_mb * 1e6))
+    inline_documents = {doc_type: DocumentBlob(filename=name, content=content) for doc_type, name in DOCUMENT_TYPES.items()}
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BlobStore(os.path.join(tmp, "blobs.sqlite"))
+        compact_documents = {doc_type: store.put(content, name) for doc_type, name in DOCUMENT_TYPES.items()}
+    results = {
+        "inline": measure(final_values(inline_documents, inline_texts=True), JSONResponse, repeat),
+        "compact": measure(final_values(compact_documents, inline_texts=False), FastJSONResponse, repeat),
+        "components": measure_components(final_values(compact_documents, inline_texts=False), repeat),
+    }
+    for name in ("inline", "compact"):
+        stats = results[name]
+        print(f"{name:<8} p50 {stats['request_ms']['p50']:>9.2f} ms  peak alloc {stats['peak_alloc_mb']:>8.2f} MB  "
+              f"checkpoints {stats['checkpoint_mb']:>8.2f} MB  response {stats['response_kb']:>7.1f} KB")
+    for name, stats in results["components"].items():
+        print(f"  {name:<22} p50 {stats['p50']:>9.3f} ms")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark graph state handling and response serialization.")
+    parser.add_argument("--document-mb", type=float, default=2.0, help="Size of each of the four uploaded documents")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    args = parser.parse_args()
+    results = run(args.document_mb, args.repeat)
+    if args.output:
+        write_results(args.output, "state", results, {"document_mb": args.document_mb, "repeat": args.repeat})
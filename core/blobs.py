@@ -0,0 +1,78 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from core.cache import SQLiteLRUTier
+from core.schemas import DocumentBlob, DocumentRef
+
+# --- Blob Store Configuration ---
+# Uploaded documents are kept here, addressed by SHA-256, and the graph state
+# only carries a DocumentRef; the checkpointer would otherwise write every
+# document's bytes again at every step.
+BLOB_STORE_PATH = os.getenv("BLOB_STORE_PATH", "cache/blobs.sqlite")
+BLOB_STORE_MEMORY_MB = int(os.getenv("BLOB_STORE_MEMORY_MB", 64))
+BLOB_STORE_MAX_MB = int(os.getenv("BLOB_STORE_MAX_MB", 1024))
+
+class BlobStore:
+    """
+    Content-addressed store for uploaded document bytes.
+
+    Two tiers: an in-memory LRU bounded by size, so the reader nodes of a
+    running application get its bytes without touching the disk, and an
+    SQLiteLRUTier bounded by `max_disk_bytes` that lets a checkpointed run
+    resume after a restart. Each distinct document is written once, however
+    often it is submitted.
+    """
+
+    def __init__(self, db_path: str, max_memory_bytes: int = 64 * 1024 * 1024, max_disk_bytes: int = 1024 * 1024 * 1024):
+        self.max_memory_bytes = max_memory_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = SQLiteLRUTier(db_path, "blobs", max_disk_bytes)
+        self._lock = threading.Lock()
+
+    def put(self, content: bytes, filename: str = "") -> DocumentRef:
+        """
+        Stores document bytes (once per distinct content) and returns a
+        reference to them. Hashing and the SQLite write block, so callers on
+        the event loop run it through core.executors.run_blocking.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            self._remember(digest, content)
+            if not self._disk.touch(digest):
+                self._disk.put(digest, content)
+        return DocumentRef(filename=filename, digest=digest, size=len(content))
+
+    def put_blob(self, blob: DocumentBlob) -> DocumentRef:
+        return self.put(blob.content, blob.filename)
+
+    def get(self, digest: str) -> Optional[bytes]:
+        """Returns the bytes stored under a digest, or None if they were evicted (may read SQLite)."""
+        with self._lock:
+            content = self._memory.get(digest)
+            if content is not None:
+                self._memory.move_to_end(digest)
+                return content
+            content = self._disk.get(digest)
+            if content is not None:
+                self._remember(digest, content)
+            return content
+
+    def _remember(self, digest: str, content: bytes):
+        if digest in self._memory:
+            self._memory.move_to_end(digest)
+            return
+        self._memory[digest] = content
+        self._memory_bytes += len(content)
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, dropped = self._memory.popitem(last=False)
+            self._memory_bytes -= len(dropped)
+
+blob_store = BlobStore(
+    BLOB_STORE_PATH,
+    max_memory_bytes=BLOB_STORE_MEMORY_MB * 1024 * 1024,
+    max_disk_bytes=BLOB_STORE_MAX_MB * 1024 * 1024,
+)
@@ -0,0 +1,310 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+from core.metrics import registry
+
+# --- Cache Configuration ---
+DOCUMENT_CACHE_PATH = os.getenv("DOCUMENT_CACHE_PATH", "cache/documents.sqlite")
+DOCUMENT_CACHE_MEMORY_ITEMS = int(os.getenv("DOCUMENT_CACHE_MEMORY_ITEMS", 256))
+DOCUMENT_CACHE_MAX_MB = int(os.getenv("DOCUMENT_CACHE_MAX_MB", 512))
+# Backend for LLM responses: "sqlite" (persistent, default) or "none"
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "sqlite")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "cache/llm_responses.sqlite")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 10000))
+
+class SQLiteLRUTier:
+    """
+    SQLite table of byte values, evicted least-recently-used once their total
+    size exceeds `max_bytes`. The disk tier of DocumentCache and BlobStore.
+
+    The running total is read once on connect and kept up to date on insert,
+    so puts never scan the table. Not thread-safe on its own: the owning
+    store calls it under its lock.
+    """
+
+    def __init__(self, db_path: str, table: str, max_bytes: int):
+        self.db_path = db_path
+        self.table = table
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._bytes = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened lazily so forked workers never inherit a live connection
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_last_access ON {self.table}(last_access)")
+            self._bytes = self._total(conn)
+            self._conn = conn
+        return self._conn
+
+    def _total(self, conn: sqlite3.Connection) -> int:
+        return conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns the value stored under a key and marks it recently used, or None."""
+        conn = self._connect()
+        row = conn.execute(f"SELECT data FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (time.time(), key))
+        return bytes(row[0])
+
+    def touch(self, key: str) -> bool:
+        """Marks a key recently used; returns False if it is not stored."""
+        return self._connect().execute(
+            f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (time.time(), key)
+        ).rowcount > 0
+
+    def put(self, key: str, data: bytes):
+        """Stores a value, replacing any under the same key, and evicts past the size budget."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            replaced = conn.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, data, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time())
+            )
+            self._bytes += len(data) - (replaced[0] if replaced else 0)
+            if self._bytes > self.max_bytes:
+                self._evict(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            # The running total may include the rolled-back write
+            self._bytes = self._total(conn)
+            raise
+
+    def _evict(self, conn: sqlite3.Connection):
+        """
+        Drops least-recently-used values until the table fits its size budget.
+        The total is recounted first, since other processes may have written
+        to the same file since this one last did.
+        """
+        self._bytes = self._total(conn)
+        if self._bytes <= self.max_bytes:
+            return
+        for key, size in conn.execute(f"SELECT key, size FROM {self.table} ORDER BY last_access").fetchall():
+            if self._bytes <= self.max_bytes:
+                break
+            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._bytes -= size
+            self.evictions += 1
+
+class DocumentCache:
+    """
+    Content-addressed cache for OCR and document-parse results.
+
+    Keys are the SHA-256 of the file bytes plus the OCR/parser version, so a
+    resubmitted document skips Tesseract/pypdf no matter what it is called.
+    Two tiers: an in-memory LRU of `memory_items` texts and an SQLiteLRUTier
+    of zlib-compressed text bounded by `max_disk_bytes`.
+    """
+
+    def __init__(self, db_path: str, memory_items: int = 256, max_disk_bytes: int = 512 * 1024 * 1024):
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._disk = SQLiteLRUTier(db_path, "documents", max_disk_bytes)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for_file(file_path: str, version: str) -> str:
+        """Returns the cache key for a file: its SHA-256 digest scoped by version."""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return f"{version}:{digest.hexdigest()}"
+
+    @staticmethod
+    def key_for_bytes(data: bytes, version: str) -> str:
+        """Returns the cache key for in-memory document bytes."""
+        return f"{version}:{hashlib.sha256(data).hexdigest()}"
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+            data = self._disk.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            text = zlib.decompress(data).decode("utf-8")
+            self._remember(key, text)
+            return text
+
+    def put(self, key: str, text: str):
+        data = zlib.compress(text.encode("utf-8"))
+        with self._lock:
+            self._remember(key, text)
+            self._disk.put(key, data)
+
+    def _remember(self, key: str, text: str):
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for monitoring."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self._disk.evictions,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+document_cache = DocumentCache(
+    DOCUMENT_CACHE_PATH,
+    memory_items=DOCUMENT_CACHE_MEMORY_ITEMS,
+    max_disk_bytes=DOCUMENT_CACHE_MAX_MB * 1024 * 1024,
+)
+
+registry.register_gauge(
+    "document_cache_events", "Document cache lookups by outcome.", "event",
+    lambda: {k: v for k, v in document_cache.stats().items() if k != "hit_rate"}
+)
+
+class LLMResponseCache(BaseCache):
+    """
+    Exact-match LLM response cache persisted in SQLite.
+
+    Plugs into LangChain through the chat model's `cache=` argument. Entries
+    are keyed on the whitespace-normalized prompt plus the serialized model
+    and call parameters (model name, temperature, bound tools/schema), expire
+    after `ttl_seconds` and are evicted least-recently-used beyond `max_entries`.
+    Only worthwhile for deterministic calls (temperature=0).
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: int = 7 * 24 * 3600, max_entries: int = 10000):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, generations TEXT NOT NULL, tokens INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        normalized_prompt = " ".join(prompt.split())
+        return hashlib.sha256(f"{llm_string}\x00{normalized_prompt}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _count_tokens(generations: Sequence[Generation]) -> int:
+        tokens = 0
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                tokens += usage.get("total_tokens", 0)
+        return tokens
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[list]:
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT generations, tokens, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[2] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            self.saved_tokens += row[1]
+        return [loads(generation) for generation in json.loads(row[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]):
+        key = self._key(prompt, llm_string)
+        generations = json.dumps([dumps(generation) for generation in return_val])
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, generations, tokens, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, generations, self._count_tokens(return_val), now, now)
+            )
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            conn.commit()
+
+    def clear(self, **kwargs):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the tokens not regenerated thanks to hits."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "saved_tokens": self.saved_tokens,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+def get_llm_response_cache() -> Optional[BaseCache]:
+    """Returns the configured LLM response cache backend, or None if disabled."""
+    if LLM_CACHE_BACKEND == "sqlite":
+        return LLMResponseCache(LLM_CACHE_PATH, ttl_seconds=LLM_CACHE_TTL_SECONDS, max_entries=LLM_CACHE_MAX_ENTRIES)
+    return None
+
+llm_response_cache = get_llm_response_cache()
+
+if isinstance(llm_response_cache, LLMResponseCache):
+    registry.register_gauge(
+        "llm_cache_events", "LLM response cache lookups and tokens saved by hits.", "event",
+        lambda: {k: v for k, v in llm_response_cache.stats().items() if k != "hit_rate"}
+    )
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import sqlite3
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from core.executors import run_blocking
+from core.resources import LazyResource
+
+# --- Checkpoint Configuration ---
+# Every graph step of an application is saved, so a failed or partial run can
+# resume from its last completed node (set GRAPH_CHECKPOINTS=0 to disable)
+GRAPH_CHECKPOINTS = os.getenv("GRAPH_CHECKPOINTS", "1") == "1"
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "cache/checkpoints.sqlite")
+# The nodes that make the final decision; re-evaluations restart at them
+DECISION_NODES = ("decision_recommendation", "rules_decision", "review_required")
+# Keep the checkpoint before the decision of a finished application for
+# /results/{fingerprint}/rerun_decision; with 0 the whole thread is deleted
+CHECKPOINT_KEEP_FOR_RERUN = os.getenv("CHECKPOINT_KEEP_FOR_RERUN", "1") == "1"
+
+class ExecutorSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver usable from `ainvoke`/`astream`: the async methods run the
+    (lock-protected) sync implementation on the shared CPU executor, so
+    checkpoint writes never block the event loop.
+    """
+
+    async def aget_tuple(self, config):
+        return await run_blocking(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        checkpoints = await run_blocking(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await run_blocking(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await run_blocking(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        return await run_blocking(self.delete_thread, thread_id)
+
+def _build_checkpointer() -> ExecutorSqliteSaver:
+    os.makedirs(os.path.dirname(CHECKPOINT_DB_PATH) or ".", exist_ok=True)
+    # check_same_thread=False is safe: SqliteSaver serializes access with a lock
+    return ExecutorSqliteSaver(sqlite3.connect(CHECKPOINT_DB_PATH, check_same_thread=False, timeout=30))
+
+graph_checkpointer = LazyResource("graph_checkpointer", _build_checkpointer)
+
+def get_checkpointer() -> Optional[ExecutorSqliteSaver]:
+    """The process-wide checkpointer, or None when GRAPH_CHECKPOINTS is off."""
+    return graph_checkpointer.get() if GRAPH_CHECKPOINTS else None
+
+def thread_config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+def rerun_thread(thread_id: str) -> str:
+    """Thread holding the pre-decision checkpoint of a finished application."""
+    return f"{thread_id}:rerun"
+
+# thread id -> [lock, number of runs holding or waiting for it]
+_thread_locks: Dict[str, list] = {}
+
+@asynccontextmanager
+async def thread_run_lock(thread_id: Optional[str]):
+    """
+    Lets one run of a thread (an application fingerprint) proceed at a time in
+    this process. Identical submissions that arrive together wait for the
+    first one and then find its stored result, instead of all running the
+    graph on the same checkpoint thread. Runs in other worker processes are
+    not covered.
+    """
+    if thread_id is None:
+        yield
+        return
+    entry = _thread_locks.setdefault(thread_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            del _thread_locks[thread_id]
+
+async def adecision_checkpoint(graph, thread_id: str) -> Optional[dict]:
+    """
+    The config of a thread's latest checkpoint taken right before its
+    decision node. Running the graph from it replays only the decision (as a
+    new branch of the thread); everything upstream comes from the checkpoint.
+    Returns None if the thread never reached a decision node.
+    """
+    async for snapshot in graph.aget_state_history(thread_config(thread_id)):
+        if any(node in DECISION_NODES for node in snapshot.next):
+            return snapshot.config
+    return None
+
+async def aprepare_run(graph, initial_state, thread_id: Optional[str]) -> Tuple[object, dict]:
+    """
+    Returns the (input, config) to run an application with. A thread that
+    stopped part-way (e.g. the LLM call failed) resumes from its last
+    completed node; one that finished with an unparseable decision re-runs
+    only the decision; otherwise the graph starts from the initial state.
+    Call it under thread_run_lock, so the checkpoint resumed from never
+    belongs to a run that is still going.
+    """
+    if graph.checkpointer is None or thread_id is None:
+        return initial_state, {}
+    config = thread_config(thread_id)
+    snapshot = await graph.aget_state(config)
+    if snapshot.next:
+        print(f"---RESUMING THREAD {thread_id[:12]} AT {', '.join(snapshot.next)}---")
+        return None, config
+    decision = snapshot.values.get("decision")
+    if decision is not None and decision.final_decision == "Error":
+        checkpoint = await adecision_checkpoint(graph, thread_id)
+        if checkpoint is not None:
+            print(f"---RE-RUNNING DECISION FOR THREAD {thread_id[:12]}---")
+            return None, checkpoint
+    return initial_state, config
+
+async def _akeep_checkpoint(saver, thread_id: str, saved):
+    """Replaces a thread with the single checkpoint `saved`."""
+    await saver.adelete_thread(thread_id)
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    await saver.aput(config, saved.checkpoint, saved.metadata, {})
+
+async def arelease_thread(graph, thread_id: Optional[str]):
+    """
+    Drops the checkpoints of an application once its result is stored, so the
+    checkpoint database does not keep every step of every run and a later
+    resubmission starts fresh. The checkpoint before the decision is moved to
+    the rerun thread first (unless CHECKPOINT_KEEP_FOR_RERUN=0). Runs that
+    stopped part-way or ended with an "Error" decision (which the result
+    store does not keep) are left alone, so resubmitting them still resumes.
+    """
+    if graph.checkpointer is None or thread_id is None:
+        return
+    snapshot = await graph.aget_state(thread_config(thread_id))
+    decision = snapshot.values.get("decision")
+    if snapshot.next or decision is None or decision.final_decision == "Error":
+        return
+    saver = graph.checkpointer
+    if CHECKPOINT_KEEP_FOR_RERUN:
+        checkpoint = await adecision_checkpoint(graph, thread_id)
+        if checkpoint is not None:
+            await _akeep_checkpoint(saver, rerun_thread(thread_id), await saver.aget_tuple(checkpoint))
+    await saver.adelete_thread(thread_id)
+
+async def arerun_decision(graph, thread_id: str) -> Optional[dict]:
+    """
+    Re-runs only the final decision of a checkpointed application (e.g. after
+    changing the decision prompt or model), reusing the stored document
+    texts, extraction, validation and ML results. Returns the new final
+    state, or None if the application has no checkpoint before its decision.
+    """
+    async with thread_run_lock(thread_id):
+        # A finished application's checkpoint is on its rerun thread; one
+        # whose thread was not released yet is re-run from the thread itself
+        for thread in (rerun_thread(thread_id), thread_id):
+            checkpoint = await adecision_checkpoint(graph, thread)
+            if checkpoint is not None:
+                break
+        else:
+            return None
+        saved = await graph.checkpointer.aget_tuple(checkpoint)
+        final_state = await graph.ainvoke(None, checkpoint)
+        if thread != thread_id:
+            # Only the pre-decision checkpoint is kept, not this re-run's steps
+            await _akeep_checkpoint(graph.checkpointer, thread, saved)
+        return final_state
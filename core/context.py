@@ -0,0 +1,117 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import List
+
+from core.metrics import CONTEXT_TOKENS
+
+# --- Context Selection Configuration ---
+# Approximate prompt tokens each field may use from its source document
+CONTEXT_TOKENS_PER_FIELD = int(os.getenv("CONTEXT_TOKENS_PER_FIELD", 256))
+CONTEXT_CHUNK_CHARS = int(os.getenv("CONTEXT_CHUNK_CHARS", 400))
+# "bm25" (default, no dependencies) or "chroma" (local embedding index)
+CONTEXT_RETRIEVER = os.getenv("CONTEXT_RETRIEVER", "bm25")
+
+# What each ExtractedData field looks for in its document
+FIELD_QUERIES = {
+    "name_from_id": "name full name holder emirates identity card",
+    "income_from_statement": "average monthly income salary credit deposit AED amount",
+    "experience_from_resume": "experience years work job role company employer position",
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) good enough for budgeting."""
+    return (len(text) + 3) // 4
+
+def _tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+def chunk_text(text: str, chunk_chars: int = CONTEXT_CHUNK_CHARS) -> List[str]:
+    """Splits text into line-aligned chunks of roughly `chunk_chars` characters."""
+    chunks, current, size = [], [], 0
+    for line in text.splitlines(keepends=True):
+        if current and size + len(line) > chunk_chars:
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+def bm25_scores(query: str, chunks: List[str], k1: float = 1.5, b: float = 0.75) -> List[float]:
+    """Okapi BM25 relevance of each chunk to the query."""
+    tokenized = [_tokenize(chunk) for chunk in chunks]
+    average_length = sum(len(tokens) for tokens in tokenized) / len(tokenized) or 1.0
+    document_frequency = Counter(term for tokens in tokenized for term in set(tokens))
+    scores = []
+    for tokens in tokenized:
+        frequencies = Counter(tokens)
+        score = 0.0
+        for term in set(_tokenize(query)):
+            if term not in frequencies:
+                continue
+            idf = math.log(1 + (len(chunks) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            tf = frequencies[term]
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(tokens) / average_length))
+        scores.append(score)
+    return scores
+
+def embedding_scores(query: str, chunks: List[str]) -> List[float]:
+    """Relevance from a local, in-memory chromadb embedding index."""
+    import chromadb
+    client = chromadb.EphemeralClient()
+    collection = client.create_collection(f"context-{os.getpid()}-{id(chunks)}")
+    try:
+        collection.add(ids=[str(i) for i in range(len(chunks))], documents=chunks)
+        result = collection.query(query_texts=[query], n_results=len(chunks))
+        scores = [0.0] * len(chunks)
+        for chunk_id, distance in zip(result["ids"][0], result["distances"][0]):
+            scores[int(chunk_id)] = -distance
+        return scores
+    finally:
+        client.delete_collection(collection.name)
+
+def select_relevant_context(field: str, text: str, token_budget: int = CONTEXT_TOKENS_PER_FIELD) -> str:
+    """
+    Returns only the chunks of `text` most relevant to `field`, within
+    `token_budget`, in their original order. Short documents pass through.
+    """
+    original_tokens = estimate_tokens(text)
+    if original_tokens <= token_budget:
+        CONTEXT_TOKENS.inc(original_tokens, kind="original")
+        CONTEXT_TOKENS.inc(original_tokens, kind="selected")
+        return text
+
+    chunks = chunk_text(text)
+    query = FIELD_QUERIES[field]
+    scores = None
+    if CONTEXT_RETRIEVER == "chroma":
+        try:
+            scores = embedding_scores(query, chunks)
+        except Exception as e:
+            print(f"Embedding retrieval unavailable, falling back to BM25: {e}")
+    if scores is None:
+        scores = bm25_scores(query, chunks)
+
+    selected, used = set(), 0
+    for index in sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True):
+        chunk_tokens = estimate_tokens(chunks[index])
+        if used + chunk_tokens > token_budget:
+            if not selected:
+                # Always keep the best chunk, trimmed to the budget
+                chunks[index] = chunks[index][:token_budget * 4]
+                selected.add(index)
+            continue
+        selected.add(index)
+        used += chunk_tokens
+
+    context = "...\n".join(chunks[i] for i in sorted(selected))
+    selected_tokens = estimate_tokens(context)
+    CONTEXT_TOKENS.inc(original_tokens, kind="original")
+    CONTEXT_TOKENS.inc(selected_tokens, kind="selected")
+    print(f"Context for {field}: {selected_tokens}/{original_tokens} tokens ({original_tokens - selected_tokens} saved)")
+    return context
@@ -0,0 +1,109 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from core.metrics import QUEUE_WAIT_SECONDS
+
+def per_worker_share(host_total: int) -> int:
+    """
+    Splits a per-host budget evenly across the API worker processes
+    (WEB_CONCURRENCY, set by serve.py), keeping at least one per worker. With
+    more workers than the budget the shares add up to more than it, which is
+    why serve.py refuses worker counts above LLM_MAX_CONCURRENCY.
+    """
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+    return max(1, host_total // workers)
+
+# --- Executor Configuration ---
+# The configured sizes are totals for the host. Every API worker process
+# (serve.py) creates its own pools, sized to its share of those totals, so
+# OCR and parsing across all workers never oversubscribe the cores.
+# Bounded pool for blocking document work (OCR, PDF/DOCX/XLSX parsing) so the
+# event loop stays free while many applications wait on the LLM.
+CPU_WORKERS = per_worker_share(int(os.getenv("CPU_WORKERS", os.cpu_count() or 4)))
+# Tesseract is the heaviest step per application; it gets its own process pool
+# so concurrent OCR calls scale across cores.
+OCR_WORKERS = per_worker_share(int(os.getenv("OCR_WORKERS", os.cpu_count() or 4)))
+
+_cpu_executor = None
+_ocr_executor = None
+_lock = threading.Lock()
+
+def configure_executors(cpu_workers: int = None, ocr_workers: int = None):
+    """Overrides pool sizes (e.g. from a CLI) before the pools are first created."""
+    global CPU_WORKERS, OCR_WORKERS
+    with _lock:
+        if _cpu_executor is not None or _ocr_executor is not None:
+            raise RuntimeError("Executors are already running; configure them before first use.")
+        if cpu_workers:
+            CPU_WORKERS = cpu_workers
+        if ocr_workers:
+            OCR_WORKERS = ocr_workers
+
+def get_cpu_executor() -> ThreadPoolExecutor:
+    """Returns the shared, bounded executor for CPU-bound document work."""
+    global _cpu_executor
+    if _cpu_executor is None:
+        with _lock:
+            if _cpu_executor is None:
+                _cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu-work")
+    return _cpu_executor
+
+def get_ocr_executor() -> ProcessPoolExecutor:
+    """Returns the shared process pool used for OCR."""
+    global _ocr_executor
+    if _ocr_executor is None:
+        with _lock:
+            if _ocr_executor is None:
+                _ocr_executor = ProcessPoolExecutor(max_workers=OCR_WORKERS)
+    return _ocr_executor
+
+def _call_with_start_time(func, *args):
+    """Runs `func` in a worker and reports when it actually started (picklable)."""
+    return time.time(), func(*args)
+
+def _record_queue_wait(pool: str, submitted_at: float, started_at: float):
+    QUEUE_WAIT_SECONDS.observe(max(0.0, started_at - submitted_at), pool=pool)
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Runs a blocking callable on the CPU executor without blocking the event loop.
+    The caller's context variables are carried over to the worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, _call_with_start_time, functools.partial(func, *args, **kwargs))
+    submitted_at = time.time()
+    started_at, result = await loop.run_in_executor(get_cpu_executor(), call)
+    _record_queue_wait("cpu", submitted_at, started_at)
+    return result
+
+async def run_in_ocr_pool(func, *args):
+    """Runs a picklable, module-level callable on the OCR process pool."""
+    loop = asyncio.get_running_loop()
+    submitted_at = time.time()
+    started_at, result = await loop.run_in_executor(get_ocr_executor(), _call_with_start_time, func, *args)
+    _record_queue_wait("ocr", submitted_at, started_at)
+    return result
+
+def run_in_ocr_pool_sync(func, *args):
+    """Blocking counterpart of run_in_ocr_pool for the synchronous graph path."""
+    submitted_at = time.time()
+    started_at, result = get_ocr_executor().submit(_call_with_start_time, func, *args).result()
+    _record_queue_wait("ocr", submitted_at, started_at)
+    return result
+
+def shutdown_executors():
+    """Shuts down the shared executors (called on application shutdown)."""
+    global _cpu_executor, _ocr_executor
+    with _lock:
+        if _cpu_executor is not None:
+            _cpu_executor.shutdown(wait=True)
+            _cpu_executor = None
+        if _ocr_executor is not None:
+            _ocr_executor.shutdown(wait=True)
+            _ocr_executor = None
@@ -0,0 +1,84 @@
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+from core.schemas import ExtractedData, FieldExtraction
+
+# --- Extractor Configuration ---
+# Fields extracted by rules with at least this confidence skip the LLM
+EXTRACTION_MIN_CONFIDENCE = float(os.getenv("EXTRACTION_MIN_CONFIDENCE", 0.8))
+
+# Which document text each ExtractedData field is read from
+FIELD_SOURCES = {
+    "name_from_id": "id_text",
+    "income_from_statement": "bank_text",
+    "experience_from_resume": "resume_text",
+}
+
+# Patterns for the templated documents produced by our intake (see
+# create_synthetic_data.py), most specific first, with the confidence a match earns.
+NAME_PATTERNS = [
+    (re.compile(r"^\s*Name\s*[:;]\s*(?P<value>[A-Za-z][A-Za-z .'\-]*[A-Za-z.])\s*$", re.MULTILINE | re.IGNORECASE), 0.95),
+]
+INCOME_PATTERNS = [
+    (re.compile(r"Average\s+Monthly\s+Income\s*[:\-]?\s*AED\s*(?P<value>\d[\d,]*(?:\.\d+)?)", re.IGNORECASE), 0.95),
+    (re.compile(r"Monthly\s+Income\s*[:\-]?\s*(?:AED)?\s*(?P<value>\d[\d,]*(?:\.\d+)?)", re.IGNORECASE), 0.85),
+    (re.compile(r"Salary(?:\s+Credit)?\s*[:\-]?\s*(?:AED)?\s*(?P<value>\d[\d,]*(?:\.\d+)?)", re.IGNORECASE), 0.6),
+]
+EXPERIENCE_SECTION = re.compile(r"^\s*(?:Work\s+)?Experience\s*:?\s*\n(?P<value>(?:[ \t]*[-*•].*(?:\n|$))+)", re.MULTILINE | re.IGNORECASE)
+
+def _match_first(patterns, text: str) -> Tuple[Optional[str], float]:
+    for pattern, confidence in patterns:
+        match = pattern.search(text)
+        if match:
+            return match.group("value").strip(), confidence
+    return None, 0.0
+
+def extract_name(id_text: str) -> Tuple[Optional[str], float]:
+    name, confidence = _match_first(NAME_PATTERNS, id_text)
+    if name and len(name.split()) < 2:
+        # A single token is more likely an OCR fragment than a full name
+        confidence = min(confidence, 0.5)
+    return name, confidence
+
+def extract_income(bank_text: str) -> Tuple[Optional[int], float]:
+    value, confidence = _match_first(INCOME_PATTERNS, bank_text)
+    if value is None:
+        return None, 0.0
+    try:
+        return int(float(value.replace(",", ""))), confidence
+    except ValueError:
+        return None, 0.0
+
+def extract_experience(resume_text: str) -> Tuple[Optional[str], float]:
+    match = EXPERIENCE_SECTION.search(resume_text)
+    if not match:
+        return None, 0.0
+    items = [line.strip().lstrip("-*•").strip() for line in match.group("value").splitlines()]
+    items = [item for item in items if item]
+    if not items:
+        return None, 0.0
+    return "; ".join(items), 0.9
+
+def extract_fields(texts: Dict[str, str]) -> Tuple[ExtractedData, Dict[str, FieldExtraction]]:
+    """
+    Fills ExtractedData from document text with regex/layout rules.
+    `texts` uses the extraction prompt keys (id_text, bank_text, resume_text).
+    Returns the data plus per-field method/confidence; fields below
+    EXTRACTION_MIN_CONFIDENCE are left empty for the LLM to fill.
+    """
+    extractors = {
+        "name_from_id": extract_name,
+        "income_from_statement": extract_income,
+        "experience_from_resume": extract_experience,
+    }
+    values = {}
+    details = {}
+    for field, extractor in extractors.items():
+        value, confidence = extractor(texts.get(FIELD_SOURCES[field]) or "")
+        if value is not None and confidence >= EXTRACTION_MIN_CONFIDENCE:
+            values[field] = value
+            details[field] = FieldExtraction(method="rules", confidence=confidence)
+        else:
+            details[field] = FieldExtraction(method="missing", confidence=confidence)
+    return ExtractedData(**values), details
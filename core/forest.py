@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from core.resources import read_pointer, write_pointer
+
+# Array files making up an exported forest, next to forest.json
+FOREST_ARRAYS = ("feature", "threshold", "children", "value", "roots")
+# Rows scored together; bounds the (rows x nodes) comparison matrix
+PREDICT_CHUNK_ROWS = 1024
+
+def export_forest(model, directory: str) -> dict:
+    """
+    Flattens a fitted sklearn RandomForestClassifier into contiguous NumPy
+    arrays saved as .npy files. All trees share one node table;
+    `children[node] = (right, left)` and leaves point to themselves, so
+    traversal can run a fixed number of steps.
+
+    Each export goes to a new subdirectory of `directory`, which is then
+    published through the pointer file (see core.resources.write_pointer):
+    files that workers may have memory-mapped are never rewritten, and a
+    reader sees either the previous export or the new one, never a mix.
+    """
+    features, thresholds, children, values, roots = [], [], [], [], []
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        is_leaf = tree.children_left == -1
+        node_ids = np.arange(n_nodes)
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        children.append(np.column_stack([
+            np.where(is_leaf, node_ids, tree.children_right),
+            np.where(is_leaf, node_ids, tree.children_left),
+        ]) + offset)
+        # Per-node class distribution (counts in older sklearn, fractions in newer)
+        value = tree.value[:, 0, :]
+        values.append(value / value.sum(axis=1, keepdims=True))
+        roots.append(offset)
+        offset += n_nodes
+
+    arrays = {
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "children": np.ascontiguousarray(np.concatenate(children), dtype=np.int32),
+        "value": np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+        "roots": np.array(roots, dtype=np.int32),
+    }
+    meta = {
+        "n_trees": len(model.estimators_),
+        "n_nodes": offset,
+        "n_features": int(model.n_features_in_),
+        "max_depth": int(max(estimator.tree_.max_depth for estimator in model.estimators_)),
+        "classes": model.classes_.tolist(),
+    }
+    previous = read_pointer(directory)
+    export_name = f"export-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{time.monotonic_ns()}"
+    export_dir = os.path.join(directory, export_name)
+    os.makedirs(export_dir)
+    for name in FOREST_ARRAYS:
+        np.save(os.path.join(export_dir, f"{name}.npy"), arrays[name])
+    with open(os.path.join(export_dir, "forest.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    write_pointer(directory, export_name)
+    _remove_old_exports(directory, keep={export_name, previous})
+    return meta
+
+def _remove_old_exports(directory: str, keep: set):
+    """
+    Deletes exports older than the previous one. The previous export stays
+    for workers that read the old pointer but have not opened its files yet;
+    older ones are only mapped by workers that already hold their pages
+    (unlinking a mapped file is safe on POSIX; on Windows it is skipped).
+    """
+    for name in os.listdir(directory):
+        if name.startswith("export-") and name not in keep:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+def current_export_dir(directory: str) -> str:
+    """The published export under `directory`; `directory` itself for an export written before pointers were used."""
+    name = read_pointer(directory)
+    return os.path.join(directory, name) if name else directory
+
+class ForestPredictor:
+    """
+    Pure-NumPy RandomForest inference over arrays written by export_forest.
+    Exposes `classes_` and `predict_proba` like the sklearn model it replaces.
+    Loaded with mmap, every worker process maps the same pages of the files.
+    """
+
+    def __init__(self, arrays: dict, meta: dict):
+        for name in FOREST_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.max_depth = meta["max_depth"]
+        self.n_features_in_ = meta["n_features"]
+        self.classes_ = np.array(meta["classes"])
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "ForestPredictor":
+        """Loads the export currently published in `directory`."""
+        directory = current_export_dir(directory)
+        with open(os.path.join(directory, "forest.json")) as f:
+            meta = json.load(f)
+        mmap_mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode) for name in FOREST_ARRAYS}
+        return cls(arrays, meta)
+
+    def _apply_chunk(self, X: np.ndarray) -> np.ndarray:
+        # Every node's split is evaluated for every row up front, so each
+        # traversal step is two gathers: the comparison, then the child.
+        n_nodes = self.feature.shape[0]
+        go_left = (X[:, self.feature] <= self.threshold).ravel()
+        row_offsets = (np.arange(X.shape[0], dtype=np.intp) * n_nodes)[:, None]
+        children = self.children.ravel()
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.roots.shape[0])).copy()
+        for _ in range(self.max_depth):
+            nodes = children[2 * nodes + go_left[row_offsets + nodes]]
+        return nodes
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node index reached by every row in every tree, shape (n_rows, n_trees)."""
+        # sklearn compares float32 features against float64 thresholds; do the same for parity
+        X = np.asarray(X, dtype=np.float32)
+        return np.concatenate([
+            self._apply_chunk(X[start:start + PREDICT_CHUNK_ROWS])
+            for start in range(0, X.shape[0], PREDICT_CHUNK_ROWS)
+        ]) if X.shape[0] else np.empty((0, self.roots.shape[0]), dtype=np.int32)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        leaves = self.apply(X)
+        # One class column at a time avoids materializing (rows, trees, classes)
+        return np.column_stack([self.value[:, k][leaves].mean(axis=1) for k in range(self.value.shape[1])])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
@@ -1,40 +1,188 @@
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import RunnableLambda
 from typing import Dict
-import json
+import os
 
-from core.schemas import GraphState, ExtractedData, ValidationResult, Decision
-from core.tools import extract_text_from_image, read_document_content, predict_eligibility
+from core.schemas import GraphState, ExtractedData, FieldExtraction, ValidationResult, Decision
+from core.executors import run_blocking
+from core.context import select_relevant_context
+from core.extractors import FIELD_SOURCES, extract_fields
+from core.metrics import EXTRACTION_FIELDS, EXTRACTION_LLM_CALLS, GRAPH_ROUTES, NODE_SECONDS, timed
+from core.resources import LazyResource, get_llm
+from core.streaming import parse_json_object
+from core.cache import document_cache
+from core.tools import aocr_image_keyed, aparse_document_keyed, ocr_image_keyed, parse_document_keyed, predict_eligibility_batch
 
-# Initialize LLM
-llm = ChatOpenAI(model="phi3", base_url="http://localhost:11434/v1", api_key="ollama", temperature=0)
+# --- Routing Configuration ---
+# When the ML model is at least this confident, the decision is made by rules
+# and the decision LLM is skipped (set FAST_PATH_ENABLED=0 to always use the LLM).
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "1") == "1"
+FAST_PATH_APPROVE_CONFIDENCE = float(os.getenv("FAST_PATH_APPROVE_CONFIDENCE", 0.9))
+FAST_PATH_DECLINE_CONFIDENCE = float(os.getenv("FAST_PATH_DECLINE_CONFIDENCE", 0.9))
+
+# --- Prompts ---
+
+EXTRACTION_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are an expert data extraction assistant. Extract the required information and format it as the requested JSON object."),
+    ("human", "Emirates ID Text: {id_text}\n\nBank Statement Text: {bank_text}\n\nResume Text: {resume_text}\n\nAssets/Liabilities Text: {assets_text}")
+])
+
+DECISION_PROMPT = ChatPromptTemplate.from_template(
+    """You are a social support case officer. Based on the applicant's profile, make a final decision and provide recommendations.
+
+    Profile:
+    - Name: {name}, Age: {age}
+    - Income: {income} AED, Family: {family_size}
+    - Experience: {experience}
+    - ML Model Check: {ml_prediction}
+
+    Your task:
+    1.  Final Decision: 'Approve' or 'Soft Decline'.
+    2.  Decision Reason: A concise justification.
+    3.  Enablement Recommendations: 2-3 concrete upskilling or job matching ideas.
+
+    Respond with a JSON object with keys 'final_decision', 'decision_reason', and 'enablement_recommendations'.
+    """
+)
+
+# Chains share the LLM client from core.resources and are built on first use.
+# `llm_call` labels the LLM latency/token metrics of each chain.
+extraction_chain = LazyResource("extraction_chain", lambda: (
+    EXTRACTION_PROMPT | get_llm().with_structured_output(ExtractedData)
+).with_config(metadata={"llm_call": "extraction"}))
+decision_chain = LazyResource("decision_chain", lambda: (
+    DECISION_PROMPT | get_llm()
+).with_config(metadata={"llm_call": "decision"}))
 
 # --- Define Graph Nodes ---
 
+# Documents read concurrently at the start of the graph: doc_type -> uses OCR
+DOCUMENT_READERS = {
+    "emirates_id": True,
+    "resume": False,
+    "bank_statement": False,
+    "assets": False,
+}
+
+def make_document_reader_node(doc_type: str, use_ocr: bool) -> RunnableLambda:
+    """
+    Builds a fan-out node that reads one document into the document cache and
+    records its key in `document_text_keys`. OCR goes to the process pool,
+    other parsers to the CPU thread pool, and both are skipped entirely for
+    documents already in the document cache. Optional documents (e.g. assets)
+    that were not uploaded are skipped.
+    """
+    @timed(NODE_SECONDS, node=f"read_{doc_type}")
+    def read_node(state: GraphState) -> Dict:
+        source = state.document_paths.get(doc_type)
+        if not source:
+            return {}
+        print(f"---NODE: READ DOCUMENT ({doc_type})---")
+        key, _ = _read_document(doc_type, source)
+        return {"document_text_keys": {doc_type: key}}
+
+    @timed(NODE_SECONDS, node=f"read_{doc_type}")
+    async def aread_node(state: GraphState) -> Dict:
+        source = state.document_paths.get(doc_type)
+        if not source:
+            return {}
+        print(f"---NODE: READ DOCUMENT ({doc_type}) (async)---")
+        if use_ocr:
+            key, _ = await aocr_image_keyed(source)
+        else:
+            key, _ = await aparse_document_keyed(source)
+        return {"document_text_keys": {doc_type: key}}
+
+    return RunnableLambda(read_node, afunc=aread_node, name=f"read_{doc_type}")
+
+def _read_document(doc_type: str, source):
+    """Reads one document with its reader; returns (document cache key, text)."""
+    if DOCUMENT_READERS[doc_type]:
+        return ocr_image_keyed(source, use_pool=True)
+    return parse_document_keyed(source)
+
+def load_document_texts(state: GraphState) -> Dict[str, str]:
+    """
+    The texts the reader nodes stored in the document cache. A text evicted
+    since (or an error message, which is never cached) is read again.
+    """
+    texts = {}
+    for doc_type, key in state.document_text_keys.items():
+        text = document_cache.get(key) if key else None
+        if text is None:
+            _, text = _read_document(doc_type, state.document_paths[doc_type])
+        texts[doc_type] = text
+    return texts
+
+def _extraction_inputs(texts: Dict[str, str], fields=None) -> Dict:
+    """
+    Builds the extraction prompt variables from the document texts.
+    When `fields` are given (the LLM fallback), each needed document is cut
+    down to the chunks relevant to its field and documents not needed for
+    those fields are left out of the prompt.
+    """
+    inputs = {
+        "id_text": texts.get("emirates_id", ""),
+        "bank_text": texts.get("bank_statement", ""),
+        "resume_text": texts.get("resume", ""),
+        "assets_text": texts.get("assets", "Not provided"),
+    }
+    if fields is None:
+        return inputs
+    if len(fields) < len(FIELD_SOURCES):
+        needed = {FIELD_SOURCES[field] for field in fields}
+        for key in inputs:
+            if key not in needed:
+                inputs[key] = "Not needed"
+    for field in fields:
+        source = FIELD_SOURCES[field]
+        inputs[source] = select_relevant_context(field, inputs[source])
+    return inputs
+
+def _merge_extraction(rules_data: ExtractedData, details: Dict, llm_data, missing) -> Dict:
+    """Fills the fields the rules could not extract from the LLM result."""
+    values = rules_data.dict()
+    for field in missing:
+        value = getattr(llm_data, field, None) if llm_data is not None else None
+        if value is not None:
+            values[field] = value
+            details[field] = FieldExtraction(method="llm")
+    for field, detail in details.items():
+        EXTRACTION_FIELDS.inc(field=field, method=detail.method)
+    return {"extracted_data": ExtractedData(**values), "extraction_details": details}
+
+def _rules_first(texts: Dict[str, str]):
+    rules_data, details = extract_fields(_extraction_inputs(texts))
+    missing = [field for field, detail in details.items() if detail.method == "missing"]
+    EXTRACTION_LLM_CALLS.inc(outcome="called" if missing else "skipped")
+    return rules_data, details, missing
+
+@timed(NODE_SECONDS, node="data_extraction")
 def data_extraction_node(state: GraphState) -> Dict:
     """
-    Extracts information from uploaded documents using tools.
+    Extracts structured information from the document texts read by the
+    fan-out reader nodes. Deterministic extractors run first; the LLM is
+    only called for fields they could not extract confidently.
     """
     print("---NODE: DATA EXTRACTION---")
-    doc_paths = state.document_paths
-    
-    id_text = extract_text_from_image.invoke({"image_path": doc_paths['emirates_id']})
-    resume_text = read_document_content.invoke({"file_path": doc_paths['resume']})
-    bank_statement_text = read_document_content.invoke({"file_path": doc_paths['bank_statement']})
-    
-    extraction_prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are an expert data extraction assistant. Extract the required information and format it as the requested JSON object."),
-        ("human", "Emirates ID Text: {id_text}\n\nBank Statement Text: {bank_text}\n\nResume Text: {resume_text}")
-    ])
-    
-    extraction_chain = extraction_prompt | llm.with_structured_output(ExtractedData)
-    extracted_data = extraction_chain.invoke({
-        "id_text": id_text, "bank_text": bank_statement_text, "resume_text": resume_text
-    })
-    
-    return {"extracted_data": extracted_data}
+    texts = load_document_texts(state)
+    rules_data, details, missing = _rules_first(texts)
+    llm_data = extraction_chain.get().invoke(_extraction_inputs(texts, missing)) if missing else None
+    return _merge_extraction(rules_data, details, llm_data, missing)
 
+@timed(NODE_SECONDS, node="data_extraction")
+async def adata_extraction_node(state: GraphState) -> Dict:
+    """
+    Async variant of data_extraction_node; awaits the LLM fallback call.
+    """
+    print("---NODE: DATA EXTRACTION (async)---")
+    texts = await run_blocking(load_document_texts, state)
+    rules_data, details, missing = _rules_first(texts)
+    llm_data = await extraction_chain.get().ainvoke(_extraction_inputs(texts, missing)) if missing else None
+    return _merge_extraction(rules_data, details, llm_data, missing)
+
+@timed(NODE_SECONDS, node="data_validation")
 def data_validation_node(state: GraphState) -> Dict:
     """
     Validates extracted data against the application form data.
@@ -64,93 +212,184 @@ def data_validation_node(state: GraphState) -> Dict:
     
     return {"validation_result": validation_result}
 
+def _ml_decision(app_data) -> Decision:
+    """Scores the applicant with the ML model and starts the Decision from it."""
+    try:
+        score = predict_eligibility_batch([app_data.dict()])[0]
+        prediction, probability = score["prediction"], score["probability"]
+    except Exception as e:
+        prediction, probability = f"Error during prediction: {e}", None
+    return Decision(
+        ml_eligibility_prediction=prediction,
+        ml_eligibility_probability=probability,
+        final_decision="",
+        decision_reason=""
+    )
+
+@timed(NODE_SECONDS, node="ml_eligibility_check")
 def ml_eligibility_node(state: GraphState) -> Dict:
     """
     Runs the pre-trained ML model for an initial eligibility check.
     """
     print("---NODE: ML ELIGIBILITY CHECK---")
-    app_data = state.application_data
-    
-    # CORRECTED: The input dictionary must have a key "data" that matches the
-    # tool's argument name.
-    tool_input = {"data": app_data.dict()}
-    prediction = predict_eligibility.invoke(tool_input)
-    
+    return {"decision": _ml_decision(state.application_data)}
+
+@timed(NODE_SECONDS, node="ml_eligibility_check")
+async def aml_eligibility_node(state: GraphState) -> Dict:
+    """
+    Async variant of ml_eligibility_node; model inference runs on the CPU executor.
+    """
+    print("---NODE: ML ELIGIBILITY CHECK (async)---")
+    return {"decision": await run_blocking(_ml_decision, state.application_data)}
+
+@timed(NODE_SECONDS, node="review_required")
+def review_required_node(state: GraphState) -> Dict:
+    """
+    Terminal node for applications that failed validation: no ML or LLM work
+    is done, the case is sent to manual review.
+    """
+    print("---NODE: REVIEW REQUIRED---")
     decision = Decision(
-        ml_eligibility_prediction=prediction,
-        final_decision="",
-        decision_reason=""
+        ml_eligibility_prediction="Not evaluated",
+        final_decision="Review Required",
+        decision_reason="Data inconsistencies found. Manual review is necessary.",
+        enablement_recommendations=["Applicant should be contacted to clarify information."]
     )
-    
     return {"decision": decision}
 
-def decision_recommendation_node(state: GraphState) -> Dict:
+@timed(NODE_SECONDS, node="rules_decision")
+def rules_decision_node(state: GraphState) -> Dict:
     """
-    Makes the final decision and generates recommendations using an LLM.
+    Fast path for clear-cut cases: when the ML model is confident enough, the
+    decision follows the model and rule-based recommendations are used
+    instead of calling the decision LLM.
     """
-    print("---NODE: DECISION & RECOMMENDATION---")
-    app_data = state.application_data
-    ext_data = state.extracted_data
-    validation = state.validation_result
+    print("---NODE: RULES DECISION (fast path)---")
     decision = state.decision
-
-    if not validation.validation_passed:
-        decision.final_decision = "Review Required"
-        decision.decision_reason = "Data inconsistencies found. Manual review is necessary."
-        decision.enablement_recommendations = ["Applicant should be contacted to clarify information."]
-        return {"decision": decision}
-        
-    prompt = ChatPromptTemplate.from_template(
-        """You are a social support case officer. Based on the applicant's profile, make a final decision and provide recommendations.
-
-        Profile:
-        - Name: {name}, Age: {age}
-        - Income: {income} AED, Family: {family_size}
-        - Experience: {experience}
-        - ML Model Check: {ml_prediction}
-
-        Your task:
-        1.  Final Decision: 'Approve' or 'Soft Decline'.
-        2.  Decision Reason: A concise justification.
-        3.  Enablement Recommendations: 2-3 concrete upskilling or job matching ideas.
-
-        Respond with a JSON object with keys 'final_decision', 'decision_reason', and 'enablement_recommendations'.
-        """
+    app_data = state.application_data
+    approve = decision.ml_eligibility_prediction == "Approve"
+    decision.final_decision = "Approve" if approve else "Soft Decline"
+    decision.decision_reason = (
+        f"The eligibility model predicts '{decision.ml_eligibility_prediction}' with "
+        f"{decision.ml_eligibility_probability:.0%} confidence for a household of {app_data.family_size} "
+        f"with a monthly income of {app_data.monthly_income} AED, and all documents are consistent."
     )
-    decision_chain = prompt | llm
-    
+    if app_data.employment_years < 2:
+        decision.enablement_recommendations = [
+            "Enroll in an entry-level vocational training program.",
+            "Register with the national job matching platform for entry-level roles.",
+        ]
+    else:
+        decision.enablement_recommendations = [
+            "Pursue a certification that builds on existing work experience.",
+            "Register with the national job matching platform for roles matching prior experience.",
+        ]
+    return {"decision": decision}
+
+def _decision_inputs(state: GraphState) -> Dict:
+    """Builds the decision prompt variables from the current state."""
+    app_data = state.application_data
+    ext_data = state.extracted_data
     experience_summary = ext_data.experience_from_resume if ext_data else "Not available"
-    
-    response_str = decision_chain.invoke({
+    return {
         "name": app_data.name, "age": app_data.age,
         "income": app_data.monthly_income, "family_size": app_data.family_size,
         "experience": experience_summary,
-        "ml_prediction": decision.ml_eligibility_prediction
-    }).content
+        "ml_prediction": state.decision.ml_eligibility_prediction
+    }
 
-    try:
-        cleaned_str = response_str.strip().replace("```json", "").replace("```", "").strip()
-        response_json = json.loads(cleaned_str)
+def _apply_decision_response(decision: Decision, response_str: str) -> Decision:
+    """
+    Parses the LLM's JSON decision and copies it onto the Decision object.
+    The same parser follows the response token by token on the streaming
+    endpoint; here it also skips ```json fences and any trailing text.
+    """
+    response_json = parse_json_object(response_str)
+    if response_json is not None:
         decision.final_decision = response_json.get('final_decision', "Error parsing")
         decision.decision_reason = response_json.get('decision_reason', "Error parsing")
         decision.enablement_recommendations = response_json.get('enablement_recommendations', [])
-    except json.JSONDecodeError:
+    else:
         decision.final_decision = "Error"
         decision.decision_reason = "Failed to parse the LLM's decision response."
         print(f"LLM JSON parsing failed. Response was: {response_str}")
+    return decision
 
-    return {"decision": decision}
+@timed(NODE_SECONDS, node="decision_recommendation")
+def decision_recommendation_node(state: GraphState) -> Dict:
+    """
+    Makes the final decision and generates recommendations using an LLM.
+    """
+    print("---NODE: DECISION & RECOMMENDATION---")
+    decision = state.decision
+    response_str = decision_chain.get().invoke(_decision_inputs(state)).content
+    return {"decision": _apply_decision_response(decision, response_str)}
 
-def get_graph():
-    """Compiles and returns the LangGraph agentic workflow."""
+@timed(NODE_SECONDS, node="decision_recommendation")
+async def adecision_recommendation_node(state: GraphState) -> Dict:
+    """
+    Async variant of decision_recommendation_node; awaits the LLM call.
+    """
+    print("---NODE: DECISION & RECOMMENDATION (async)---")
+    decision = state.decision
+    response = await decision_chain.get().ainvoke(_decision_inputs(state))
+    return {"decision": _apply_decision_response(decision, response.content)}
+
+# --- Routing ---
+
+def route_after_validation(state: GraphState) -> str:
+    """Failed validation goes straight to manual review, skipping ML and LLM work."""
+    if state.validation_result is None or not state.validation_result.validation_passed:
+        GRAPH_ROUTES.inc(route="review_required")
+        return "review_required"
+    return "ml_eligibility_check"
+
+def route_after_ml(state: GraphState) -> str:
+    """Confident ML predictions take the rules fast path; the rest go to the decision LLM."""
+    decision = state.decision
+    probability = decision.ml_eligibility_probability
+    if FAST_PATH_ENABLED and probability is not None:
+        threshold = {"Approve": FAST_PATH_APPROVE_CONFIDENCE, "Decline": FAST_PATH_DECLINE_CONFIDENCE}.get(decision.ml_eligibility_prediction)
+        if threshold is not None and probability >= threshold:
+            GRAPH_ROUTES.inc(route="fast_path")
+            return "rules_decision"
+    GRAPH_ROUTES.inc(route="llm_decision")
+    return "decision_recommendation"
+
+def get_graph(checkpointer=None):
+    """
+    Compiles and returns the LangGraph agentic workflow.
+    I/O-bound nodes carry both a sync and an async implementation, so the
+    compiled graph supports `invoke` as well as non-blocking `ainvoke`.
+    Document reads fan out as parallel branches that join before extraction.
+    Failed validation and confident ML predictions exit early without
+    calling the decision LLM. With a `checkpointer` (see core/checkpoints.py)
+    every step is saved per thread, and runs need a thread_id.
+    """
     workflow = StateGraph(GraphState)
-    workflow.add_node("data_extraction", data_extraction_node)
+    reader_nodes = []
+    for doc_type, use_ocr in DOCUMENT_READERS.items():
+        node_name = f"read_{doc_type}"
+        workflow.add_node(node_name, make_document_reader_node(doc_type, use_ocr))
+        workflow.add_edge(START, node_name)
+        reader_nodes.append(node_name)
+    workflow.add_node("data_extraction", RunnableLambda(data_extraction_node, afunc=adata_extraction_node))
     workflow.add_node("data_validation", data_validation_node)
-    workflow.add_node("ml_eligibility_check", ml_eligibility_node)
-    workflow.add_node("decision_recommendation", decision_recommendation_node)
-    workflow.set_entry_point("data_extraction")
+    workflow.add_node("ml_eligibility_check", RunnableLambda(ml_eligibility_node, afunc=aml_eligibility_node))
+    workflow.add_node("decision_recommendation", RunnableLambda(decision_recommendation_node, afunc=adecision_recommendation_node))
+    workflow.add_node("review_required", review_required_node)
+    workflow.add_node("rules_decision", rules_decision_node)
+    workflow.add_edge(reader_nodes, "data_extraction")
     workflow.add_edge("data_extraction", "data_validation")
-    workflow.add_edge("data_validation", "ml_eligibility_check")
-    workflow.add_edge("ml_eligibility_check", "decision_recommendation")
+    workflow.add_conditional_edges(
+        "data_validation", route_after_validation,
+        {"review_required": "review_required", "ml_eligibility_check": "ml_eligibility_check"}
+    )
+    workflow.add_conditional_edges(
+        "ml_eligibility_check", route_after_ml,
+        {"rules_decision": "rules_decision", "decision_recommendation": "decision_recommendation"}
+    )
+    workflow.add_edge("review_required", END)
+    workflow.add_edge("rules_decision", END)
     workflow.add_edge("decision_recommendation", END)
-    return workflow.compile()
\ No newline at end of file
+    return workflow.compile(checkpointer=checkpointer)
\ No newline at end of file
@@ -0,0 +1,305 @@
+import asyncio
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import orjson
+
+from core.blobs import blob_store
+from core.checkpoints import aprepare_run, arelease_thread, thread_run_lock
+from core.executors import run_blocking
+from core.llm import BATCH, llm_priority
+from core.metrics import JOB_QUEUE_WAIT_SECONDS, registry
+from core.results import RESULT_REUSE, application_fingerprint, result_store
+from core.schemas import ApplicationData, DocumentBlob, GraphState, state_to_dict
+
+# --- Job Queue Configuration ---
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "cache/jobs.sqlite")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+# Submissions beyond this many queued jobs are rejected (HTTP 429)
+JOB_MAX_QUEUE_DEPTH = int(os.getenv("JOB_MAX_QUEUE_DEPTH", 100))
+# Jobs left "running" longer than this (e.g. after a crash) are queued again
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", 900))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 1.0))
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", 10))
+# Webhooks to loopback, private and link-local addresses are refused unless
+# enabled (e.g. when every receiver is on the internal network)
+WEBHOOK_ALLOW_PRIVATE_HOSTS = os.getenv("WEBHOOK_ALLOW_PRIVATE_HOSTS", "0") == "1"
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at its configured depth limit."""
+
+def validate_webhook_url(url: str) -> str:
+    """
+    Returns the URL if it is an http(s) URL whose host resolves only to public
+    addresses; raises ValueError otherwise. Blocking (resolves the host name).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("webhook_url must be an http:// or https:// URL with a host")
+    if WEBHOOK_ALLOW_PRIVATE_HOSTS:
+        return url
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(parts.hostname, parts.port or 443, proto=socket.IPPROTO_TCP)}
+    except socket.gaierror:
+        raise ValueError(f"webhook_url host '{parts.hostname}' does not resolve")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if not ip.is_global:
+            raise ValueError(f"webhook_url host '{parts.hostname}' is not a public address")
+    return url
+
+class JobQueue:
+    """
+    Persistent application job queue in SQLite.
+
+    Jobs and their uploaded documents survive restarts; workers claim the
+    oldest queued job atomically, so several workers (or processes sharing
+    the database) never run the same job twice.
+    """
+
+    def __init__(self, db_path: str, max_queue_depth: int = 100):
+        self.db_path = db_path
+        self.max_queue_depth = max_queue_depth
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, application_json TEXT NOT NULL, "
+                "webhook_url TEXT, progress_json TEXT NOT NULL DEFAULT '[]', result_json TEXT, error TEXT, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_documents ("
+                "job_id TEXT NOT NULL, doc_type TEXT NOT NULL, filename TEXT NOT NULL, content BLOB NOT NULL, "
+                "PRIMARY KEY (job_id, doc_type))"
+            )
+            self._conn = conn
+        return self._conn
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def submit(self, application: ApplicationData, documents: Dict[str, DocumentBlob], webhook_url: Optional[str] = None) -> str:
+        """Stores a new job and its documents; raises QueueFullError under backpressure."""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                depth = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+                if depth >= self.max_queue_depth:
+                    raise QueueFullError(f"Job queue is full ({depth} queued).")
+                conn.execute(
+                    "INSERT INTO jobs (id, status, application_json, webhook_url, created_at) VALUES (?, 'queued', ?, ?, ?)",
+                    (job_id, json.dumps(application.dict()), webhook_url, time.time())
+                )
+                conn.executemany(
+                    "INSERT INTO job_documents (job_id, doc_type, filename, content) VALUES (?, ?, ?, ?)",
+                    [(job_id, doc_type, blob.filename, blob.content) for doc_type, blob in documents.items()]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def claim(self) -> Optional[dict]:
+        """Atomically marks the oldest queued job as running and returns it."""
+        with self._lock:
+            row = self._connect().execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ("
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1) "
+                "RETURNING id, application_json, webhook_url, created_at, started_at",
+                (time.time(),)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def load_documents(self, job_id: str) -> Dict[str, DocumentBlob]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT doc_type, filename, content FROM job_documents WHERE job_id = ?", (job_id,)
+            ).fetchall()
+        return {row["doc_type"]: DocumentBlob(filename=row["filename"], content=row["content"]) for row in rows}
+
+    def record_progress(self, job_id: str, progress: List[dict]):
+        with self._lock:
+            self._connect().execute("UPDATE jobs SET progress_json = ? WHERE id = ?", (json.dumps(progress), job_id))
+
+    def complete(self, job_id: str, result: dict):
+        """Stores the result and drops the job's documents, which are no longer needed."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "UPDATE jobs SET status = 'completed', result_json = ?, finished_at = ? WHERE id = ?",
+                (orjson.dumps(result, default=str).decode(), time.time(), job_id)
+            )
+            conn.execute("DELETE FROM job_documents WHERE job_id = ?", (job_id,))
+
+    def fail(self, job_id: str, error: str):
+        with self._lock:
+            self._connect().execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (error, time.time(), job_id)
+            )
+
+    def requeue_stale(self, stale_seconds: int) -> int:
+        """Puts jobs whose worker died mid-run back in the queue."""
+        with self._lock:
+            cursor = self._connect().execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running' AND started_at < ?",
+                (time.time() - stale_seconds,)
+            )
+            return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT id, status, progress_json, result_json, error, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = {
+                "job_id": row["id"],
+                "status": row["status"],
+                "progress": json.loads(row["progress_json"]),
+                "result": orjson.loads(row["result_json"]) if row["result_json"] else None,
+                "error": row["error"],
+                "created_at": row["created_at"],
+                "started_at": row["started_at"],
+                "finished_at": row["finished_at"],
+            }
+            if row["status"] == "queued":
+                job["queue_position"] = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at <= ?", (row["created_at"],)
+                ).fetchone()[0]
+        return job
+
+class JobWorkerPool:
+    """
+    Background asyncio workers that pull jobs from the queue and run the graph.
+    Each finished node is recorded as progress; a webhook, if given, is called
+    with the final job status. Identical submissions are completed from the
+    result store without running the graph.
+    """
+
+    def __init__(self, queue: JobQueue, graph, workers: int = 4, poll_seconds: float = 1.0):
+        self.queue = queue
+        self.graph = graph
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self._stopping = False
+        self._http = None
+
+    def notify(self):
+        """Wakes idle workers after a submission instead of waiting for the next poll."""
+        self._wakeup.set()
+
+    async def start(self):
+        requeued = await run_blocking(self.queue.requeue_stale, JOB_STALE_SECONDS)
+        if requeued:
+            print(f"Requeued {requeued} stale jobs.")
+        self._http = httpx.AsyncClient(timeout=WEBHOOK_TIMEOUT_SECONDS)
+        self._tasks = [asyncio.create_task(self._worker_loop(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        """Stops taking new jobs and waits for running ones to finish."""
+        self._stopping = True
+        self._wakeup.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._http is not None:
+            await self._http.aclose()
+
+    async def _worker_loop(self, worker_id: int):
+        while not self._stopping:
+            job = await run_blocking(self.queue.claim)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            JOB_QUEUE_WAIT_SECONDS.observe(job["started_at"] - job["created_at"])
+            await self._run_job(job)
+
+    async def _run_job(self, job: dict):
+        # Background jobs queue for the LLM behind synchronous and streaming requests
+        with llm_priority(BATCH):
+            await self._process_job(job)
+
+    async def _process_job(self, job: dict):
+        job_id = job["id"]
+        print(f"---JOB {job_id}: STARTED---")
+        try:
+            # The graph state references the documents in the blob store rather than carrying their bytes
+            documents = await run_blocking(
+                lambda: {doc_type: blob_store.put_blob(blob) for doc_type, blob in self.queue.load_documents(job_id).items()}
+            )
+            initial_state = GraphState(
+                application_data=ApplicationData(**json.loads(job["application_json"])),
+                document_paths=documents
+            )
+            fingerprint = await run_blocking(application_fingerprint, initial_state.application_data, documents)
+            async with thread_run_lock(fingerprint):
+                result = await run_blocking(result_store.get, fingerprint) if RESULT_REUSE else None
+                if result is None:
+                    progress = []
+                    final_state = None
+                    graph_input, config = await aprepare_run(self.graph, initial_state, fingerprint)
+                    async for mode, chunk in self.graph.astream(graph_input, config, stream_mode=["updates", "values"]):
+                        if mode == "updates":
+                            for node_name in chunk:
+                                progress.append({"node": node_name, "completed_at": time.time()})
+                            await run_blocking(self.queue.record_progress, job_id, progress)
+                        else:
+                            final_state = chunk
+                    result = state_to_dict(final_state)
+                    await run_blocking(result_store.put, fingerprint, result)
+                    await arelease_thread(self.graph, fingerprint)
+            await run_blocking(self.queue.complete, job_id, result)
+            print(f"---JOB {job_id}: COMPLETED---")
+            await self._notify_webhook(job, {"job_id": job_id, "status": "completed", "result": result})
+        except Exception as e:
+            print(f"---JOB {job_id}: FAILED: {e}---")
+            await run_blocking(self.queue.fail, job_id, str(e))
+            await self._notify_webhook(job, {"job_id": job_id, "status": "failed", "error": str(e)})
+
+    async def _notify_webhook(self, job: dict, payload: dict):
+        if not job.get("webhook_url"):
+            return
+        try:
+            # Checked again at delivery: the host may resolve differently than at submission
+            url = await run_blocking(validate_webhook_url, job["webhook_url"])
+            await self._http.post(url, content=orjson.dumps(payload, default=str),
+                                  headers={"Content-Type": "application/json"})
+        except (ValueError, httpx.HTTPError) as e:
+            print(f"Webhook for job {job['id']} failed: {e}")
+
+job_queue = JobQueue(JOB_DB_PATH, max_queue_depth=JOB_MAX_QUEUE_DEPTH)
+
+registry.register_gauge(
+    "job_queue_depth", "Jobs waiting in the application queue.", "status",
+    lambda: {"queued": job_queue.queue_depth()}
+)
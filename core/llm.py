@@ -0,0 +1,254 @@
+import asyncio
+import contextlib
+import contextvars
+import copy
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+import httpx
+import openai
+from langchain_openai import ChatOpenAI
+
+from core.executors import per_worker_share
+from core.metrics import LLM_RETRIES, QUEUE_WAIT_SECONDS, llm_metrics_handler, registry
+
+# --- LLM Client Configuration ---
+# Calls allowed at the LLM server at once; match Ollama's OLLAMA_NUM_PARALLEL.
+# Requests beyond this wait here (by priority) instead of piling up in Ollama.
+# A host total, split across API worker processes like the executor pools.
+LLM_MAX_CONCURRENCY = per_worker_share(int(os.getenv("LLM_MAX_CONCURRENCY", 2)))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 300))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", 0.5))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", 10))
+# Concurrent identical prompts share one generation
+LLM_COALESCE = os.getenv("LLM_COALESCE", "1") == "1"
+
+# Lower runs first: interactive requests overtake queued batch work (background
+# jobs) waiting in the same process
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+_llm_priority = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+# Failures worth another attempt; anything else (bad request, auth) is raised at once
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.APITimeoutError, openai.RateLimitError, openai.InternalServerError)
+
+def set_llm_priority(priority: int):
+    """Sets the LLM priority of the current context (and tasks/threads started from it)."""
+    _llm_priority.set(priority)
+
+@contextlib.contextmanager
+def llm_priority(priority: int):
+    token = _llm_priority.set(priority)
+    try:
+        yield
+    finally:
+        _llm_priority.reset(token)
+
+class _Waiter:
+    __slots__ = ("wake", "granted", "abandoned")
+
+    def __init__(self, wake):
+        self.wake = wake
+        self.granted = False
+        self.abandoned = False
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+class PriorityGate:
+    """
+    A counting semaphore shared by worker threads and event loops. When all
+    slots are busy, waiters are served by priority, then in arrival order; a
+    released slot is handed directly to the next waiter.
+    """
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self._in_use = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def _acquire_or_enqueue(self, priority: int, waiter: _Waiter) -> bool:
+        with self._lock:
+            if self._in_use < self.slots and not self._waiters:
+                self._in_use += 1
+                return True
+            heapq.heappush(self._waiters, (priority, next(self._seq), waiter))
+            return False
+
+    def acquire(self, priority: int = INTERACTIVE):
+        start = time.perf_counter()
+        event = threading.Event()
+        if not self._acquire_or_enqueue(priority, _Waiter(event.set)):
+            event.wait()
+        QUEUE_WAIT_SECONDS.observe(time.perf_counter() - start, pool=f"llm_{PRIORITY_NAMES.get(priority, priority)}")
+
+    async def acquire_async(self, priority: int = INTERACTIVE):
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = _Waiter(lambda: loop.call_soon_threadsafe(_resolve, future))
+        if not self._acquire_or_enqueue(priority, waiter):
+            try:
+                await future
+            except asyncio.CancelledError:
+                with self._lock:
+                    granted = waiter.granted
+                    waiter.abandoned = not granted
+                if granted:
+                    self.release()
+                raise
+        QUEUE_WAIT_SECONDS.observe(time.perf_counter() - start, pool=f"llm_{PRIORITY_NAMES.get(priority, priority)}")
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                _, _, waiter = heapq.heappop(self._waiters)
+                if not waiter.abandoned:
+                    waiter.granted = True
+                    break
+            else:
+                self._in_use -= 1
+                return
+        waiter.wake()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"capacity": self.slots, "in_use": self._in_use, "waiting": sum(not w.abandoned for _, _, w in self._waiters)}
+
+llm_gate = PriorityGate(LLM_MAX_CONCURRENCY)
+
+registry.register_gauge("llm_slots", "LLM concurrency slots: capacity, in use and callers waiting.", "state", llm_gate.stats)
+
+def retry_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter, so retries from many callers spread out."""
+    return random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+
+class GatedChatOpenAI(ChatOpenAI):
+    """
+    ChatOpenAI whose calls go through the shared PriorityGate, are retried
+    with jittered backoff while nothing has been streamed yet, and (async,
+    with LLM_COALESCE) share one generation between identical concurrent prompts.
+    """
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        priority = _llm_priority.get()
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            llm_gate.acquire(priority)
+            streamed = False
+            try:
+                for chunk in super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    streamed = True
+                    yield chunk
+                return
+            except RETRYABLE_ERRORS as e:
+                if streamed or attempt == LLM_MAX_RETRIES:
+                    raise
+                delay = retry_delay(attempt)
+                LLM_RETRIES.inc(error=type(e).__name__)
+                print(f"LLM call failed ({type(e).__name__}), retrying in {delay:.2f}s")
+            finally:
+                llm_gate.release()
+            time.sleep(delay)
+
+    async def _gated_astream(self, messages, stop=None, run_manager=None, **kwargs):
+        priority = _llm_priority.get()
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await llm_gate.acquire_async(priority)
+            streamed = False
+            try:
+                async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    streamed = True
+                    yield chunk
+                return
+            except RETRYABLE_ERRORS as e:
+                if streamed or attempt == LLM_MAX_RETRIES:
+                    raise
+                delay = retry_delay(attempt)
+                LLM_RETRIES.inc(error=type(e).__name__)
+                print(f"LLM call failed ({type(e).__name__}), retrying in {delay:.2f}s")
+            finally:
+                llm_gate.release()
+            await asyncio.sleep(delay)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        if not LLM_COALESCE:
+            async for chunk in self._gated_astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+            return
+
+        key = _coalesce_key(self, messages, stop, kwargs)
+        leader = _inflight.get(key)
+        if leader is not None:
+            try:
+                chunks = await asyncio.shield(leader)
+            except Exception:
+                chunks = None  # The leader failed; make our own call below
+            if chunks is not None:
+                for chunk in chunks:
+                    replay = copy.deepcopy(chunk)
+                    replay.message.id = None
+                    yield replay
+                return
+            async for chunk in self._gated_astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        _inflight[key] = future
+        chunks = []
+        try:
+            async for chunk in self._gated_astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                chunks.append(copy.deepcopy(chunk))
+                yield chunk
+            future.set_result(chunks)
+        except BaseException:
+            future.set_exception(RuntimeError("Coalesced LLM call did not complete"))
+            future.exception()  # Followers retry on their own; don't warn if there are none
+            raise
+        finally:
+            _inflight.pop(key, None)
+
+# In-flight coalesced generations by (event loop, model, prompt, call options)
+_inflight = {}
+
+def _coalesce_key(model: ChatOpenAI, messages, stop, kwargs) -> tuple:
+    payload = json.dumps(
+        [[message.type, message.content, message.additional_kwargs] for message in messages] + [stop, kwargs],
+        sort_keys=True, default=str
+    )
+    return (id(asyncio.get_running_loop()), id(model), payload)
+
+def build_chat_llm(base_url: str, model: str) -> GatedChatOpenAI:
+    """
+    The process-wide chat model. HTTP connections to the LLM server are kept
+    alive and reused (one pool per sync/async client) instead of reconnecting
+    per call; retries are done by GatedChatOpenAI so the slot is freed while
+    backing off. Calls are deterministic (temperature=0), so identical prompts
+    are answered from the response cache instead of a new generation.
+    Responses are streamed internally so time-to-first-token and token usage
+    can be recorded by the metrics callback.
+    """
+    from core.cache import llm_response_cache
+    limits = httpx.Limits(
+        max_connections=LLM_MAX_CONCURRENCY * 2, max_keepalive_connections=LLM_MAX_CONCURRENCY, keepalive_expiry=120
+    )
+    timeout = httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=10.0)
+    return GatedChatOpenAI(
+        model=model, base_url=base_url, api_key="ollama", temperature=0,
+        cache=llm_response_cache if llm_response_cache is not None else False,
+        streaming=True, stream_usage=True, callbacks=[llm_metrics_handler],
+        max_retries=0, timeout=timeout,
+        http_client=httpx.Client(limits=limits, timeout=timeout),
+        http_async_client=httpx.AsyncClient(limits=limits, timeout=timeout),
+    )
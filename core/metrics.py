@@ -0,0 +1,221 @@
+import asyncio
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# --- Metric Types ---
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+# Per-request timing breakdown; set by start_request_timings() for callers that want one
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("request_timings", default=None)
+
+def _format_labels(label_names: Sequence[str], label_values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Histogram:
+    """A labelled Prometheus histogram with fixed buckets."""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, breakdown_prefix: Optional[str] = None):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # Observations are also added to the per-request breakdown as "<prefix>:<labels>"
+        self.breakdown_prefix = breakdown_prefix
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series["buckets"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+        timings = _request_timings.get()
+        if timings is not None and self.breakdown_prefix:
+            breakdown_key = f"{self.breakdown_prefix}:{'/'.join(key)}"
+            timings[breakdown_key] = round(timings.get(breakdown_key, 0.0) + value, 6)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    cumulative += count
+                    bucket_labels = _format_labels(self.label_names, key, 'le="%s"' % bound)
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                inf_labels = _format_labels(self.label_names, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf_labels} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {series['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {series['count']}")
+        return lines
+
+class Counter:
+    """A labelled Prometheus counter."""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+class MetricsRegistry:
+    """Holds every metric of the process and renders the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = []
+        self._gauge_callbacks = []
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def register_gauge(self, name: str, documentation: str, label_name: str, callback: Callable[[], Dict[str, float]]):
+        """Registers a gauge whose {label_value: value} series are read from `callback` at scrape time."""
+        self._gauge_callbacks.append((name, documentation, label_name, callback))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, documentation, label_name, callback in self._gauge_callbacks:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            for label_value, value in sorted(callback().items()):
+                lines.append(f'{name}{{{label_name}="{label_value}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+# --- Metrics ---
+
+NODE_SECONDS = registry.histogram(
+    "graph_node_seconds", "Time spent in each LangGraph node.", ["node"], breakdown_prefix="node")
+TOOL_SECONDS = registry.histogram(
+    "tool_seconds", "Time spent in each document/ML tool.", ["tool"], breakdown_prefix="tool")
+LLM_SECONDS = registry.histogram(
+    "llm_call_seconds", "End-to-end latency of LLM calls.", ["call"], breakdown_prefix="llm")
+LLM_TTFT_SECONDS = registry.histogram(
+    "llm_time_to_first_token_seconds", "Time until the first streamed LLM token.", ["call"], breakdown_prefix="llm_ttft")
+LLM_TOKENS = registry.histogram(
+    "llm_tokens", "Tokens per LLM call.", ["call", "kind"], buckets=TOKEN_BUCKETS)
+LLM_RETRIES = registry.counter(
+    "llm_retries_total", "LLM calls retried after a transient error.", ["error"])
+QUEUE_WAIT_SECONDS = registry.histogram(
+    "executor_queue_wait_seconds", "Time work waited for a free executor worker.", ["pool"], breakdown_prefix="queue")
+GRAPH_ROUTES = registry.counter(
+    "graph_route_total", "Applications per graph exit route (review_required, fast_path, llm_decision).", ["route"])
+EXTRACTION_FIELDS = registry.counter(
+    "extraction_fields_total", "Extracted fields by method (rules, llm, missing).", ["field", "method"])
+EXTRACTION_LLM_CALLS = registry.counter(
+    "extraction_llm_calls_total", "Extraction LLM calls made or skipped thanks to the rule-based extractors.", ["outcome"])
+CONTEXT_TOKENS = registry.counter(
+    "extraction_context_tokens_total", "Estimated extraction prompt tokens before (original) and after (selected) context selection.", ["kind"])
+JOB_QUEUE_WAIT_SECONDS = registry.histogram(
+    "job_queue_wait_seconds", "Time applications waited in the job queue before a worker picked them up.")
+RESULT_STORE_LOOKUPS = registry.counter(
+    "result_store_lookups_total", "Result store lookups for submitted applications (hit: answered without running the graph).", ["outcome"])
+
+# --- Timing Helpers ---
+
+def timed(histogram: Histogram, **labels):
+    """Decorator recording the wall time of a sync or async function into `histogram`."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start, **labels)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+def start_request_timings() -> Dict[str, float]:
+    """Starts collecting a per-request timing breakdown in the current context."""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """
+    LangChain callback recording LLM latency, time-to-first-token and token
+    counts. The call is labelled by the `llm_call` metadata of the chain.
+    """
+
+    def __init__(self):
+        self._runs = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        call = (metadata or {}).get("llm_call", "unknown")
+        self._runs[run_id] = {"call": call, "start": time.perf_counter(), "first_token": None}
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is not None and run["first_token"] is None:
+            run["first_token"] = time.perf_counter()
+            LLM_TTFT_SECONDS.observe(run["first_token"] - run["start"], call=run["call"])
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        LLM_SECONDS.observe(time.perf_counter() - run["start"], call=run["call"])
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    LLM_TOKENS.observe(usage.get("input_tokens", 0), call=run["call"], kind="prompt")
+                    LLM_TOKENS.observe(usage.get("output_tokens", 0), call=run["call"], kind="completion")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._runs.pop(run_id, None)
+
+llm_metrics_handler = LLMMetricsHandler()
@@ -0,0 +1,179 @@
+import io
+import os
+import re
+import threading
+from collections import namedtuple
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+# --- OCR Configuration ---
+# "regions" reads only the known fields of the Emirates ID card, each as a
+# single line with its own character whitelist; "full" reads the whole page.
+OCR_MODE = os.getenv("OCR_MODE", "regions")
+# Cropped lines are rescaled to this height before recognition; Tesseract is
+# most accurate with ~20-30 px capitals, and this also shrinks large photos.
+OCR_LINE_HEIGHT = int(os.getenv("OCR_LINE_HEIGHT", 64))
+# Full-page OCR downsamples wider images to this width first
+OCR_MAX_WIDTH = int(os.getenv("OCR_MAX_WIDTH", 1600))
+
+# Layout of the card issued by our intake (see create_synthetic_data.py),
+# in pixels of the 400x250 reference card; other sizes are scaled.
+CARD_SIZE = (400, 250)
+OCRRegion = namedtuple("OCRRegion", ["field", "box", "whitelist", "pattern"])
+CARD_REGIONS = [
+    OCRRegion("name", (0, 76, 400, 97),
+              "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz .'-:",
+              re.compile(r"^\s*Name\s*[:;]\s*\S+", re.IGNORECASE)),
+    OCRRegion("idn", (0, 97, 400, 118),
+              "IDN0123456789-: ",
+              re.compile(r"\d{3}-\d{4}-\d{7}-\d")),
+]
+# Aspect ratios accepted as the card layout; anything else is read in full
+CARD_ASPECT_RANGE = (1.45, 1.75)
+
+def _load_image(data: Union[str, bytes]):
+    from PIL import Image
+    image = Image.open(data if isinstance(data, str) else io.BytesIO(data))
+    return image.convert("L")
+
+def binarize(gray):
+    """Black text on white using Otsu's threshold on the grayscale histogram."""
+    from PIL import Image
+    pixels = np.asarray(gray, dtype=np.uint8)
+    histogram = np.bincount(pixels.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    weight_below = np.cumsum(histogram)
+    weight_above = weight_below[-1] - weight_below
+    mass_below = np.cumsum(histogram * levels)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_below = mass_below / weight_below
+        mean_above = (mass_below[-1] - mass_below) / weight_above
+        between = weight_below * weight_above * (mean_below - mean_above) ** 2
+    threshold = int(np.nanargmax(between))
+    return Image.fromarray(np.where(pixels > threshold, 255, 0).astype(np.uint8))
+
+def preprocess_page(gray):
+    """Downsamples oversized images and binarizes them for full-page OCR."""
+    if gray.width > OCR_MAX_WIDTH:
+        gray = gray.resize((OCR_MAX_WIDTH, round(gray.height * OCR_MAX_WIDTH / gray.width)))
+    return binarize(gray)
+
+def crop_region(gray, region: OCRRegion):
+    """
+    Crops one card region, scaled to the image size, rescales it to
+    OCR_LINE_HEIGHT and binarizes it. Blank space right and left of the text
+    is trimmed so Tesseract only sees the line itself.
+    """
+    from PIL import ImageOps
+    scale_x, scale_y = gray.width / CARD_SIZE[0], gray.height / CARD_SIZE[1]
+    left, top, right, bottom = region.box
+    crop = gray.crop((round(left * scale_x), round(top * scale_y), round(right * scale_x), round(bottom * scale_y)))
+    width = max(1, round(crop.width * OCR_LINE_HEIGHT / crop.height))
+    line = binarize(crop.resize((width, OCR_LINE_HEIGHT)))
+    ink = ImageOps.invert(line).getbbox()
+    if ink is not None:
+        margin = OCR_LINE_HEIGHT // 4
+        line = line.crop((max(0, ink[0] - margin), 0, min(line.width, ink[2] + margin), line.height))
+    return line
+
+def is_card_layout(gray) -> bool:
+    return CARD_ASPECT_RANGE[0] <= gray.width / gray.height <= CARD_ASPECT_RANGE[1]
+
+class TesserocrEngine:
+    """
+    Keeps one initialized Tesseract API per thread (tesserocr handles are not
+    thread-safe), so the language model is loaded once per worker instead of
+    once per call.
+    """
+    name = "tesserocr"
+
+    def __init__(self):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self._local = threading.local()
+
+    def _api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            api = self._local.api = self._tesserocr.PyTessBaseAPI()
+        return api
+
+    def read_page(self, image) -> str:
+        api = self._api()
+        api.SetPageSegMode(self._tesserocr.PSM.AUTO)
+        api.SetVariable("tessedit_char_whitelist", "")
+        api.SetImage(image)
+        return api.GetUTF8Text()
+
+    def read_line(self, image, whitelist: str) -> str:
+        api = self._api()
+        api.SetPageSegMode(self._tesserocr.PSM.SINGLE_LINE)
+        api.SetVariable("tessedit_char_whitelist", whitelist)
+        api.SetImage(image)
+        return api.GetUTF8Text().strip()
+
+class PytesseractEngine:
+    """Runs the tesseract executable once per call through pytesseract."""
+    name = "pytesseract"
+
+    def read_page(self, image) -> str:
+        import pytesseract
+        return pytesseract.image_to_string(image)
+
+    def read_line(self, image, whitelist: str) -> str:
+        import pytesseract
+        config = f'--psm 7 -c tessedit_char_whitelist="{whitelist}"'
+        return pytesseract.image_to_string(image, config=config).strip()
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    """The OCR engine of this process: a persistent tesserocr handle if installed, else pytesseract."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                try:
+                    _engine = TesserocrEngine()
+                except ImportError:
+                    _engine = PytesseractEngine()
+    return _engine
+
+def engine_name() -> str:
+    try:
+        import tesserocr  # noqa: F401
+        return "tesserocr"
+    except ImportError:
+        return "pytesseract"
+
+def read_card_regions(gray, engine=None) -> Optional[Dict[str, str]]:
+    """
+    Reads each CARD_REGIONS line, or returns None when the image is not laid
+    out like the card (or a region does not read as its field).
+    """
+    if not is_card_layout(gray):
+        return None
+    engine = engine or get_engine()
+    lines = {}
+    for region in CARD_REGIONS:
+        text = engine.read_line(crop_region(gray, region), region.whitelist)
+        if not region.pattern.search(text):
+            return None
+        lines[region.field] = text
+    return lines
+
+def ocr_id_card(data: Union[str, bytes], mode: Optional[str] = None, engine=None) -> str:
+    """
+    OCRs an Emirates ID image given as a path or bytes. In "regions" mode
+    only the name and IDN lines are read; images that do not match the card
+    layout fall back to preprocessed full-page OCR. Raises on failure.
+    """
+    engine = engine or get_engine()
+    gray = _load_image(data)
+    if (mode or OCR_MODE) == "regions":
+        lines = read_card_regions(gray, engine)
+        if lines is not None:
+            return "\n".join(lines.values()) + "\n"
+    return engine.read_page(preprocess_page(gray))
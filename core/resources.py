@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Every LazyResource, in creation order; warm_up() loads them all
+_resources = []
+
+class LazyResource(Generic[T]):
+    """
+    A process-wide singleton built on first use. Construction runs exactly
+    once even when several threads ask for it at the same time.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        _resources.append(self)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self) -> T:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._value = self._factory()
+                    self._loaded = True
+        return self._value
+
+    def get_current(self, is_stale: Callable[[T], bool]) -> T:
+        """Like get(), but rebuilds the value first when `is_stale(value)` says it is out of date."""
+        value = self.get()
+        if is_stale(value):
+            with self._lock:
+                if not self._loaded or is_stale(self._value):
+                    self._value = self._factory()
+                    self._loaded = True
+                value = self._value
+        return value
+
+    def reset(self):
+        """Drops the value so the next get() rebuilds it (e.g. after retraining)."""
+        with self._lock:
+            self._value = None
+            self._loaded = False
+
+def warm_up(names: Optional[list] = None) -> Dict[str, float]:
+    """
+    Loads the given resources (all registered ones by default) ahead of the
+    first request. Returns the seconds each one took; 0.0 if already loaded.
+    """
+    timings = {}
+    for resource in list(_resources):
+        if names is not None and resource.name not in names:
+            continue
+        start = time.perf_counter()
+        resource.get()
+        timings[resource.name] = round(time.perf_counter() - start, 4)
+    return timings
+
+# --- Shared Resources ---
+
+# "numpy" scores with the exported, memory-mapped forest (core/forest.py) when
+# it exists; "sklearn" always unpickles the full RandomForestClassifier. NumPy
+# is much faster for the API's single rows and small batches, sklearn for
+# batches of more than ~1000 rows (see benchmarks/forest_inference.py).
+ELIGIBILITY_MODEL_BACKEND = os.getenv("ELIGIBILITY_MODEL_BACKEND", "numpy")
+MODEL_DIR = "models"
+# Subdirectory of a model version holding its NumPy export
+FOREST_EXPORT_NAME = "eligibility_forest"
+
+# OpenAI-compatible endpoint serving the LLM (Ollama by default)
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "phi3")
+
+# Exported model artifacts are never rewritten in place: API workers may have
+# them memory-mapped, and overwriting a mapped file crashes the reader with
+# SIGBUS or hands it a torn mix of old and new data. A new export is written
+# to a fresh directory and published by atomically replacing a small pointer
+# file that names it.
+POINTER_FILE = "CURRENT"
+
+def read_pointer(directory: str) -> Optional[str]:
+    """The entry of `directory` its pointer file names, or None if there is no pointer."""
+    try:
+        with open(os.path.join(directory, POINTER_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def write_pointer(directory: str, name: str):
+    """Atomically points `directory`'s pointer file at its entry `name`."""
+    path = os.path.join(directory, POINTER_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def published_model_dir(model_dir: str = MODEL_DIR) -> str:
+    """
+    Directory of the model version published in `model_dir` (its pointer
+    names versions/<version>, see train_ml_model.save_model_version), or
+    `model_dir` itself for a model saved before versions were published.
+    """
+    name = read_pointer(model_dir)
+    return os.path.join(model_dir, name) if name else model_dir
+
+# `version` comes from the loaded version's manifest; `published` identifies
+# the pointer files it was loaded through, to notice a newer publication
+EligibilityModel = namedtuple("EligibilityModel", ["model", "label_encoder", "features", "version", "directory", "published"])
+
+def _pointer_stamp(directory: str) -> Optional[tuple]:
+    # write_pointer replaces the file, so each publication gets a new inode
+    try:
+        stat = os.stat(os.path.join(directory, POINTER_FILE))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+def _publication_stamp(directory: str) -> tuple:
+    """The current model version pointer and the forest export pointer of `directory`."""
+    return _pointer_stamp(MODEL_DIR), _pointer_stamp(os.path.join(directory, FOREST_EXPORT_NAME))
+
+def _read_model_version(directory: str) -> str:
+    try:
+        with open(os.path.join(directory, "model_manifest.json")) as f:
+            return json.load(f)["version"]
+    except (OSError, ValueError, KeyError):
+        return "unversioned"
+
+def _load_eligibility_model() -> EligibilityModel:
+    import joblib
+    from core.forest import ForestPredictor, current_export_dir
+    # Stamped before loading: a version published meanwhile is loaded on the next call
+    model_stamp = _pointer_stamp(MODEL_DIR)
+    directory = published_model_dir()
+    published = (model_stamp, _pointer_stamp(os.path.join(directory, FOREST_EXPORT_NAME)))
+    forest_dir = os.path.join(directory, FOREST_EXPORT_NAME)
+    if ELIGIBILITY_MODEL_BACKEND == "numpy" and os.path.exists(os.path.join(current_export_dir(forest_dir), "forest.json")):
+        model = ForestPredictor.load(forest_dir)
+    else:
+        model = joblib.load(os.path.join(directory, 'eligibility_classifier.joblib'))
+    return EligibilityModel(
+        model=model,
+        label_encoder=joblib.load(os.path.join(directory, 'label_encoder.joblib')),
+        features=joblib.load(os.path.join(directory, 'features.joblib')),
+        version=_read_model_version(directory),
+        directory=directory,
+        published=published,
+    )
+
+def _build_llm():
+    from core.llm import build_chat_llm
+    return build_chat_llm(OLLAMA_BASE_URL, OLLAMA_MODEL)
+
+eligibility_model: LazyResource[EligibilityModel] = LazyResource("eligibility_model", _load_eligibility_model)
+chat_llm = LazyResource("llm", _build_llm)
+
+def get_eligibility_model() -> EligibilityModel:
+    """
+    The loaded eligibility model, reloaded once a retrain or re-export has
+    published a new version (two stat calls per use; see train_ml_model.py).
+    """
+    return eligibility_model.get_current(lambda loaded: _publication_stamp(loaded.directory) != loaded.published)
+
+def use_eligibility_backend(backend: str):
+    """Switches the eligibility model backend ("numpy" or "sklearn") for this process."""
+    global ELIGIBILITY_MODEL_BACKEND
+    ELIGIBILITY_MODEL_BACKEND = backend
+    eligibility_model.reset()
+
+def get_llm():
+    return chat_llm.get()
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import orjson
+
+from core.metrics import RESULT_STORE_LOOKUPS
+from core.resources import get_eligibility_model
+from core.schemas import ApplicationData, DocumentBlob, DocumentRef
+
+# --- Result Store Configuration ---
+RESULTS_DB_PATH = os.getenv("RESULTS_DB_PATH", "cache/results.sqlite")
+# Return the stored result for an identical resubmission instead of rerunning
+# the graph (set RESULT_REUSE=0 to always process; results are still stored)
+RESULT_REUSE = os.getenv("RESULT_REUSE", "1") == "1"
+# Bump when the graph's output for the same inputs changes
+RESULT_SCHEMA_VERSION = 1
+
+def model_version() -> str:
+    """
+    Version of the eligibility model this process scores with (see
+    train_ml_model.py), part of every fingerprint. Taken from the loaded
+    model rather than the files on disk, so a result is never stored under
+    a newly published version while holding the previous model's prediction.
+    """
+    return get_eligibility_model().version
+
+def document_digest(source) -> str:
+    """SHA-256 of an uploaded document in the blob store, held in memory or spilled to a temp file."""
+    if isinstance(source, DocumentRef):
+        return source.digest
+    digest = hashlib.sha256()
+    if isinstance(source, DocumentBlob):
+        digest.update(source.content)
+    else:
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+def application_fingerprint(application: ApplicationData, documents: Dict[str, object]) -> str:
+    """
+    Identifies a submission by its form data and the content of its documents
+    (not their file names), scoped by the result schema and model version.
+    """
+    payload = json.dumps({
+        "version": [RESULT_SCHEMA_VERSION, model_version()],
+        "application": application.dict(),
+        "documents": {doc_type: document_digest(source) for doc_type, source in sorted(documents.items())},
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ResultStore:
+    """
+    Processed applications in SQLite, keyed by submission fingerprint.
+
+    The final state is stored as JSON next to indexed columns (applicant
+    name, decision, date), so caseworker queries are answered from the
+    indexes without reading the JSON.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS application_results ("
+                "fingerprint TEXT PRIMARY KEY, applicant_name TEXT NOT NULL, name_key TEXT NOT NULL, "
+                "final_decision TEXT, ml_prediction TEXT, validation_passed INTEGER, "
+                "result_json TEXT NOT NULL, created_at REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_name ON application_results(name_key, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_decision ON application_results(final_decision, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_results_created ON application_results(created_at)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, fingerprint: str, resubmission: bool = True) -> Optional[dict]:
+        """
+        Returns the stored final state for a fingerprint, or None. Lookups for
+        a resubmission are counted (per row and in the metrics); caseworker
+        reads pass resubmission=False.
+        """
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT result_json FROM application_results WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+            if row is not None and resubmission:
+                conn.execute("UPDATE application_results SET hits = hits + 1 WHERE fingerprint = ?", (fingerprint,))
+        if resubmission:
+            RESULT_STORE_LOOKUPS.inc(outcome="hit" if row else "miss")
+        return orjson.loads(row["result_json"]) if row else None
+
+    def put(self, fingerprint: str, result: dict):
+        """
+        Stores a final state (as returned by state_to_dict), replacing any
+        earlier one. Failed decisions are not stored, so resubmitting retries them.
+        """
+        application = result.get("application_data") or {}
+        decision = result.get("decision") or {}
+        if decision.get("final_decision") == "Error":
+            return
+        validation = result.get("validation_result") or {}
+        passed = validation.get("validation_passed")
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO application_results (fingerprint, applicant_name, name_key, final_decision, "
+                "ml_prediction, validation_passed, result_json, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (fingerprint, application.get("name", ""), _name_key(application.get("name", "")),
+                 decision.get("final_decision"), decision.get("ml_eligibility_prediction"),
+                 None if passed is None else int(passed), orjson.dumps(result, default=str).decode(), time.time())
+            )
+
+    def query(self, name: Optional[str] = None, decision: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None, limit: int = 50, offset: int = 0) -> List[dict]:
+        """
+        Lists stored applications, newest first. `name` matches the start of
+        the applicant name, case-insensitively; `since`/`until` are Unix times.
+        """
+        clauses, params = [], []
+        if name:
+            # Range scan on the name index instead of LIKE, which SQLite cannot index case-insensitively
+            prefix = _name_key(name)
+            clauses.append("name_key >= ? AND name_key < ?")
+            params += [prefix, prefix + "\uffff"]
+        if decision:
+            clauses.append("final_decision = ?")
+            params.append(decision)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT fingerprint, applicant_name, final_decision, ml_prediction, validation_passed, created_at, hits "
+                f"FROM application_results {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset)
+            ).fetchall()
+        return [
+            {**dict(row), "validation_passed": None if row["validation_passed"] is None else bool(row["validation_passed"])}
+            for row in rows
+        ]
+
+def _name_key(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+result_store = ResultStore(RESULTS_DB_PATH)
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Annotated, Dict, List, Optional
+import operator
 
 class ApplicationData(BaseModel):
     """Schema for the initial application form data."""
@@ -10,12 +11,30 @@ class ApplicationData(BaseModel):
     employment_years: int = Field(description="Total years of employment")
     address_form: str = Field(description="Address provided in the application form")
 
+class EligibilityFeatures(BaseModel):
+    """Schema for one applicant in a batch eligibility scoring request."""
+    age: int = Field(description="Applicant's age")
+    monthly_income: int = Field(description="Applicant's monthly income in AED")
+    family_size: int = Field(description="Number of family members")
+    employment_years: int = Field(description="Total years of employment")
+
+class EligibilityScore(BaseModel):
+    """Schema for one applicant's batch eligibility score."""
+    prediction: str = Field(description="Predicted eligibility label (Approve/Decline)")
+    probability: float = Field(description="Model probability of the predicted label")
+    probabilities: Dict[str, float] = Field(description="Model probability for every label")
+
 class ExtractedData(BaseModel):
     """Schema for data extracted from documents."""
     name_from_id: Optional[str] = Field(None, description="Name extracted from Emirates ID")
     income_from_statement: Optional[int] = Field(None, description="Income extracted from bank statement")
     experience_from_resume: Optional[str] = Field(None, description="Work experience summary from resume")
 
+class FieldExtraction(BaseModel):
+    """How one ExtractedData field was obtained."""
+    method: str = Field(description="'rules' (deterministic extractor), 'llm' (LLM fallback) or 'missing'")
+    confidence: Optional[float] = Field(None, description="Extractor confidence for rule-based values")
+
 class ValidationResult(BaseModel):
     """Schema for data validation checks."""
     name_matches: Optional[bool] = Field(None, description="True if name on form matches ID")
@@ -26,14 +45,53 @@ class ValidationResult(BaseModel):
 class Decision(BaseModel):
     """Schema for the final decision and recommendations."""
     ml_eligibility_prediction: str = Field(description="Initial prediction from the ML model (Approve/Decline)")
+    ml_eligibility_probability: Optional[float] = Field(None, description="ML model probability of its prediction")
     final_decision: str = Field(description="Final decision after LLM review (Approve/Soft Decline)")
     decision_reason: str = Field(description="Justification for the final decision")
     enablement_recommendations: List[str] = Field([], description="List of upskilling or job matching recommendations")
 
+class DocumentBlob(BaseModel):
+    """An uploaded document kept in memory instead of being written to disk."""
+    filename: str = Field(description="Original file name; its extension selects the parser")
+    content: bytes = Field(description="Raw file bytes")
+
+class DocumentRef(BaseModel):
+    """An uploaded document held in the blob store (core/blobs.py), referenced by content hash."""
+    filename: str = Field(description="Original file name; its extension selects the parser")
+    digest: str = Field(description="SHA-256 of the file bytes")
+    size: int = Field(description="File size in bytes")
+
 class GraphState(BaseModel):
     """Represents the state of our workflow."""
     application_data: ApplicationData
+    # doc_type -> file path, DocumentRef for uploads in the blob store, or
+    # DocumentBlob for bytes held inline
     document_paths: dict
+    # Filled concurrently by the document reader branches; the reducer merges
+    # each branch's {doc_type: key} update instead of overwriting. The texts
+    # stay in the document cache under these keys (None: reading failed), so
+    # checkpoints and responses never carry them.
+    document_text_keys: Annotated[Dict[str, Optional[str]], operator.or_] = Field(default_factory=dict)
     extracted_data: Optional[ExtractedData] = None
+    extraction_details: Dict[str, FieldExtraction] = Field(default_factory=dict)
     validation_result: Optional[ValidationResult] = None
-    decision: Optional[Decision] = None
\ No newline at end of file
+    decision: Optional[Decision] = None
+
+def _to_jsonable(value):
+    if isinstance(value, DocumentBlob):
+        # Never echo raw document bytes back to the client
+        return {"filename": value.filename, "size_bytes": len(value.content)}
+    if isinstance(value, DocumentRef):
+        return {"filename": value.filename, "size_bytes": value.size, "sha256": value.digest}
+    if isinstance(value, BaseModel):
+        return value.dict()
+    if isinstance(value, dict):
+        return {k: _to_jsonable(v) for k, v in value.items()}
+    return value
+
+# Channels only the graph's own nodes use; left out of responses and stored results
+INTERNAL_STATE_KEYS = {"document_text_keys"}
+
+def state_to_dict(state: dict) -> dict:
+    """Converts a final graph state (a dict of pydantic models) into plain JSON-able data."""
+    return {key: _to_jsonable(value) for key, value in state.items() if key not in INTERNAL_STATE_KEYS}
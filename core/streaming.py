@@ -0,0 +1,213 @@
+import json
+import re
+from typing import Optional
+
+import orjson
+
+def sse_event(event: str, data) -> bytes:
+    """Formats one Server-Sent Event with a JSON payload (orjson never emits raw newlines)."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data, default=str) + b"\n\n"
+
+class PartialJSONParser:
+    """
+    Parses a JSON object while it is still being generated. Text is fed in
+    as it arrives; `value` is the best parse of what has been seen so far,
+    with open strings, arrays and objects closed. Anything before the first
+    '{' (such as a ```json fence) and after the closing '}' is ignored.
+
+    Each fed character is scanned once: containers are built in place as
+    their brackets arrive, and a key, number or literal is decoded when it
+    ends. String text is decoded as it arrives, so a feed costs the new text
+    plus one copy of the string still being generated, never a re-parse of
+    everything so far. `value` is updated in place and `changed` tells whether
+    the last feed altered it. The complete object is parsed once more with
+    json.loads, so the final value is exact.
+    """
+
+    def __init__(self):
+        self._text = []
+        self._length = 0
+        self._start = None
+        self._end = None
+        # Open containers, innermost last: [container, key awaiting its value]
+        self._frames = []
+        # Decoded pieces of the string being read (None outside strings) and
+        # the raw text of an escape sequence that is not finished yet
+        self._string = None
+        self._string_is_key = False
+        self._escape = ""
+        self._scalar = []
+        self.value: Optional[dict] = None
+        self.changed = False
+
+    @property
+    def complete(self) -> bool:
+        """True once the closing brace of the object has been seen."""
+        return self._end is not None
+
+    def feed(self, text: str) -> Optional[dict]:
+        """Adds generated text and returns the (partial) object parsed so far."""
+        self.changed = False
+        if self.complete or not text:
+            return self.value
+        offset = self._length
+        self._text.append(text)
+        self._length += len(text)
+        i = 0
+        if self._start is None:
+            i = text.find("{")
+            if i < 0:
+                return self.value
+            self._start = offset + i
+            self.value = {}
+            self._frames.append([self.value, None])
+            self.changed = True
+            i += 1
+        while i < len(text):
+            if self._string is not None:
+                i = self._scan_string(text, i)
+                continue
+            char = text[i]
+            i += 1
+            if char in ",:}] \t\r\n" and self._scalar:
+                self._close_scalar()
+            if char == '"':
+                frame = self._frames[-1]
+                self._string_is_key = isinstance(frame[0], dict) and frame[1] is None
+                self._string = []
+            elif char in "{[":
+                self._attach({} if char == "{" else [])
+            elif char in "}]":
+                self._frames.pop()
+                if not self._frames:
+                    self._end = offset + i
+                    break
+            elif char not in ",: \t\r\n":
+                self._scalar.append(char)
+        if self._string is not None and not self._string_is_key:
+            self._show_open_string()
+        if self.complete:
+            self._parse_complete()
+        return self.value
+
+    def _scan_string(self, text: str, i: int) -> int:
+        """Reads string content from text[i:] up to its end or the closing quote; returns the next index."""
+        if self._escape:
+            # \uXXXX or a two-character escape such as \n
+            needed = 6 if (self._escape + text[i])[1] == "u" else 2
+            take = needed - len(self._escape)
+            self._escape += text[i:i + take]
+            i = min(i + take, len(text))
+            if len(self._escape) == needed:
+                self._add_string_text(_decode_string(self._escape))
+                self._escape = ""
+            return i
+        match = _STRING_SPECIAL.search(text, i)
+        end = match.start() if match else len(text)
+        if end > i:
+            self._add_string_text(text[i:end])
+        if match is None:
+            return end
+        if match.group() == "\\":
+            self._escape = "\\"
+            return end + 1
+        self._close_string()
+        return end + 1
+
+    def _add_string_text(self, text: str):
+        pieces = self._string
+        if pieces and _is_low_surrogate(text[:1]) and _is_high_surrogate(pieces[-1][-1:]):
+            # The two halves of a \u-escaped surrogate pair arrive as separate escapes
+            pair = pieces[-1][-1] + text[0]
+            pieces[-1] = pieces[-1][:-1] + pair.encode("utf-16", "surrogatepass").decode("utf-16")
+            text = text[1:]
+        if text:
+            pieces.append(text)
+
+    def _close_string(self):
+        text = "".join(self._string)
+        self._string = None
+        if self._string_is_key:
+            self._frames[-1][1] = text
+        else:
+            self._attach(text)
+
+    def _show_open_string(self):
+        """Puts the decoded prefix of the string being generated into the value."""
+        text = "".join(self._string)
+        # Keep the pieces joined so each feed only copies the string once
+        self._string[:] = [text] if text else []
+        if _is_high_surrogate(text[-1:]):
+            # A high surrogate waits for its pair
+            text = text[:-1]
+        frame = self._frames[-1]
+        container, key = frame
+        if isinstance(container, dict):
+            if key not in container or container[key] != text:
+                container[key] = text
+                self.changed = True
+        elif len(container) > frame[1]:
+            if container[frame[1]] != text:
+                container[frame[1]] = text
+                self.changed = True
+        else:
+            container.append(text)
+            self.changed = True
+
+    def _close_scalar(self):
+        literal = "".join(self._scalar)
+        self._scalar = []
+        try:
+            value = json.loads(literal)
+        except json.JSONDecodeError:
+            return
+        self._attach(value)
+
+    def _attach(self, value):
+        """Adds a finished value (or a new, still open container) to the innermost container."""
+        frame = self._frames[-1]
+        container, key = frame
+        if isinstance(container, dict):
+            container[key] = value
+            frame[1] = None
+        else:
+            # For lists the slot of the next item is tracked instead of a key
+            index = frame[1] or 0
+            if len(container) > index:
+                container[index] = value
+            else:
+                container.append(value)
+            frame[1] = index + 1
+        self.changed = True
+        if isinstance(value, (dict, list)):
+            self._frames.append([value, None if isinstance(value, dict) else 0])
+
+    def _parse_complete(self):
+        try:
+            value = json.loads("".join(self._text)[self._start:self._end])
+        except json.JSONDecodeError:
+            return
+        if value != self.value:
+            self.changed = True
+        self.value = value
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+def _is_high_surrogate(char: str) -> bool:
+    return "\ud800" <= char <= "\udbff"
+
+def _is_low_surrogate(char: str) -> bool:
+    return "\udc00" <= char <= "\udfff"
+
+def _decode_string(raw: str) -> str:
+    """Decodes one JSON escape sequence; an invalid one is kept as written."""
+    try:
+        return json.loads(f'"{raw}"')
+    except json.JSONDecodeError:
+        return raw
+
+def parse_json_object(text: str) -> Optional[dict]:
+    """Parses the first complete JSON object in an LLM response, or returns None."""
+    parser = PartialJSONParser()
+    parser.feed(text)
+    return parser.value if parser.complete else None
@@ -1,76 +1,274 @@
-import pandas as pd
-import pytesseract
-from PIL import Image
-import joblib
 from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain_core.tools import tool
-from langchain_openai import ChatOpenAI
-from core.schemas import ApplicationData
+from typing import TYPE_CHECKING, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+import io
+from core.schemas import ApplicationData, DocumentBlob, DocumentRef
+from core.blobs import blob_store
+from core.cache import document_cache
+from core.executors import run_blocking, run_in_ocr_pool, run_in_ocr_pool_sync
+from core.metrics import TOOL_SECONDS, timed
+from core.ocr import OCR_MODE, engine_name, ocr_id_card
+from core.resources import get_eligibility_model
+import functools
 import os
+import warnings
+import numpy as np
 import pypdf
 import docx
+import openpyxl
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # --- Tool Configuration ---
-# Point pytesseract to the Tesseract executable if needed
+# OCR (preprocessing, card regions and the Tesseract engine) lives in
+# core/ocr.py; pytesseract (which pulls in pandas) and PIL are imported where
+# OCR runs, so importing this module stays cheap. Point pytesseract to the
+# Tesseract executable if needed:
 # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
-# Load the trained ML model, encoder and features
-model = joblib.load('models/eligibility_classifier.joblib')
-label_encoder = joblib.load('models/label_encoder.joblib')
-features_list = joblib.load('models/features.joblib')
-
-# Initialize LLM
-llm = ChatOpenAI(model="phi3", base_url="http://localhost:11434/v1", api_key="ollama")
+# The trained ML model, encoder and features are loaded on first use (or at
+# startup by core.resources.warm_up), not at import.
 
 # --- Tool Definitions ---
 
+# Bump when parsing/OCR output changes so stale cache entries are not reused
+CACHE_SCHEMA_VERSION = 2
+PARSER_VERSION = f"parse-v{CACHE_SCHEMA_VERSION}-pypdf{pypdf.__version__}-openpyxl{openpyxl.__version__}"
+
+# Bounds for the streaming reader: total characters kept per document, and
+# optionally pages (PDF pages / XLSX sheets). Text past the budget is never
+# extracted. Pages are not limited by default (0), so a long statement is read
+# until the character budget runs out; truncation is logged either way.
+DOCUMENT_MAX_PAGES = int(os.getenv("DOCUMENT_MAX_PAGES", 0)) or None
+DOCUMENT_MAX_CHARS = int(os.getenv("DOCUMENT_MAX_CHARS", 100000))
+TRUNCATION_MARKER = "\n[... document truncated ...]\n"
+
+@functools.lru_cache(maxsize=1)
+def ocr_version() -> str:
+    """Cache namespace for OCR results, tied to the installed Tesseract."""
+    import pytesseract
+    try:
+        tesseract = pytesseract.get_tesseract_version()
+    except Exception:
+        tesseract = "unknown"
+    return f"ocr-v{CACHE_SCHEMA_VERSION}-tesseract{tesseract}-{engine_name()}-{OCR_MODE}"
+
+# A document can be a file path, raw bytes, a file-like object (BytesIO,
+# SpooledTemporaryFile, UploadFile.file), a DocumentBlob held in memory or a
+# DocumentRef to an upload in the blob store.
+DocumentSource = Union[str, bytes, bytearray, memoryview, BinaryIO, DocumentBlob, DocumentRef]
+
+def _resolve_source(source: DocumentSource, filename: Optional[str] = None) -> Tuple[Union[str, bytes], str]:
+    """
+    Normalizes a document source to either a path or bytes (both picklable, so
+    they can be sent to the OCR pool) plus the name that determines its type.
+    File objects already spilled to disk are used by path rather than read.
+    """
+    if isinstance(source, DocumentBlob):
+        return source.content, filename or source.filename
+    if isinstance(source, DocumentRef):
+        content = blob_store.get(source.digest)
+        if content is None:
+            raise FileNotFoundError(f"document {source.digest[:12]} is no longer in the blob store")
+        return content, filename or source.filename
+    if isinstance(source, str):
+        return source, filename or source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source), filename or ""
+    name = getattr(source, "name", None)
+    if isinstance(name, str) and os.path.exists(name):
+        return name, filename or name
+    source.seek(0)
+    return source.read(), filename or (name if isinstance(name, str) else "")
+
+def _open(data: Union[str, bytes]):
+    """Returns something the parsers can open: the path itself or an in-memory stream."""
+    return data if isinstance(data, str) else io.BytesIO(data)
+
+def _cache_key(data: Union[str, bytes], version: str, source: Optional[DocumentSource] = None) -> str:
+    if isinstance(source, DocumentRef):
+        # Blob store references already carry the SHA-256 the key is built from
+        return f"{version}:{source.digest}"
+    if isinstance(data, str):
+        return document_cache.key_for_file(data, version)
+    return document_cache.key_for_bytes(data, version)
+
+def _iter_xlsx_rows(data: Union[str, bytes], name: str, max_pages: Optional[int]) -> Iterator[str]:
+    # read_only mode streams rows from the sheet XML instead of loading the workbook
+    workbook = openpyxl.load_workbook(_open(data), read_only=True, data_only=True)
+    try:
+        for index, sheet in enumerate(workbook.worksheets):
+            if max_pages is not None and index >= max_pages:
+                print(f"Document truncated: read {max_pages} of {len(workbook.worksheets)} sheets of {name} (DOCUMENT_MAX_PAGES)")
+                return
+            yield f"--- Sheet: {sheet.title} ---\n"
+            for row in sheet.iter_rows(values_only=True):
+                if any(value is not None for value in row):
+                    yield "\t".join("" if value is None else str(value) for value in row) + "\n"
+            yield "\n"
+    finally:
+        workbook.close()
+
+def _iter_text_lines(data: Union[str, bytes]) -> Iterator[str]:
+    if isinstance(data, str):
+        with open(data, 'r', encoding='utf-8') as f:
+            yield from f
+    else:
+        yield from io.TextIOWrapper(io.BytesIO(data), encoding='utf-8')
+
+def iter_document_chunks(data: Union[str, bytes], name: str, max_pages: Optional[int] = None) -> Iterator[str]:
+    """
+    Lazily yields the text of a document (PDF, DOCX, XLSX, TXT) chunk by chunk:
+    per PDF page, DOCX paragraph, XLSX row or text line. At most `max_pages`
+    PDF pages / XLSX sheets are read. Raises on failure.
+    """
+    _, extension = os.path.splitext(name)
+    extension = extension.lower()
+
+    if extension == '.pdf':
+        reader = pypdf.PdfReader(_open(data))
+        for index, page in enumerate(reader.pages):
+            if max_pages is not None and index >= max_pages:
+                print(f"Document truncated: read {max_pages} of {len(reader.pages)} pages of {name} (DOCUMENT_MAX_PAGES)")
+                return
+            yield page.extract_text() or ""
+
+    elif extension == '.docx':
+        doc = docx.Document(_open(data))
+        for index, para in enumerate(doc.paragraphs):
+            yield ("\n" if index else "") + para.text
+
+    elif extension == '.xlsx':
+        yield from _iter_xlsx_rows(data, name, max_pages)
+
+    elif extension == '.txt':
+        yield from _iter_text_lines(data)
+    else:
+        yield f"Unsupported file type: {extension}"
+
+def _parse_document(data: Union[str, bytes], name: str, max_pages: Optional[int] = None,
+                    max_chars: Optional[int] = None) -> str:
+    """
+    Parses a document from a path or bytes into text, stopping once `max_chars`
+    is reached so memory stays bounded regardless of document size. Raises on failure.
+    """
+    chunks = []
+    size = 0
+    for chunk in iter_document_chunks(data, name, max_pages):
+        if max_chars is not None and size + len(chunk) > max_chars:
+            chunks.append(chunk[:max_chars - size])
+            chunks.append(TRUNCATION_MARKER)
+            print(f"Document truncated: kept the first {max_chars} characters of {name} (DOCUMENT_MAX_CHARS)")
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    return "".join(chunks)
+
+def _ocr_image(data: Union[str, bytes]) -> str:
+    """
+    Runs Tesseract on an image given as a path or bytes. Raises on failure.
+    Plain module-level function so it can run on the OCR process pool.
+    """
+    return ocr_id_card(data)
+
+@timed(TOOL_SECONDS, tool="parse_document")
+def parse_document_keyed(source: DocumentSource, filename: Optional[str] = None, max_pages: Optional[int] = DOCUMENT_MAX_PAGES,
+                         max_chars: Optional[int] = DOCUMENT_MAX_CHARS) -> Tuple[Optional[str], str]:
+    """
+    Like parse_document, but also returns the document cache key the text is
+    stored under, so it can be looked up again later (None if reading failed).
+    """
+    name = filename or "document"
+    try:
+        data, name = _resolve_source(source, filename)
+        key = _cache_key(data, f"{PARSER_VERSION}-p{max_pages}-c{max_chars}", source)
+        text = document_cache.get(key)
+        if text is None:
+            text = _parse_document(data, name, max_pages, max_chars)
+            document_cache.put(key, text)
+        return key, text
+    except Exception as e:
+        return None, f"Error reading file {name}: {e}"
+
+def parse_document(source: DocumentSource, filename: Optional[str] = None,
+                   max_pages: Optional[int] = DOCUMENT_MAX_PAGES, max_chars: Optional[int] = DOCUMENT_MAX_CHARS) -> str:
+    """
+    Reads the text content from a document (PDF, DOCX, XLSX, TXT) given as a
+    path, bytes or file-like object; `filename` supplies the type for
+    in-memory sources. Reading is streamed and bounded by `max_pages` and
+    `max_chars`. Served from the document cache when the same bytes were
+    parsed before.
+    """
+    return parse_document_keyed(source, filename, max_pages, max_chars)[1]
+
+@timed(TOOL_SECONDS, tool="ocr_image")
+def ocr_image_keyed(source: DocumentSource, use_pool: bool = False) -> Tuple[Optional[str], str]:
+    """Like ocr_image, but also returns the document cache key of the text (None if OCR failed)."""
+    try:
+        data, _ = _resolve_source(source)
+        key = _cache_key(data, ocr_version(), source)
+        text = document_cache.get(key)
+        if text is None:
+            if use_pool:
+                text = run_in_ocr_pool_sync(_ocr_image, data)
+            else:
+                text = _ocr_image(data)
+            document_cache.put(key, text)
+        return key, text
+    except Exception as e:
+        return None, f"Error processing image: {e}"
+
+def ocr_image(source: DocumentSource, use_pool: bool = False) -> str:
+    """
+    Extracts text from an image (path, bytes or file-like) using OCR, served
+    from the document cache when the same image was processed before. With
+    `use_pool`, Tesseract runs on the shared OCR process pool.
+    """
+    return ocr_image_keyed(source, use_pool)[1]
+
+async def aparse_document_keyed(source: DocumentSource, filename: Optional[str] = None, max_pages: Optional[int] = DOCUMENT_MAX_PAGES,
+                                max_chars: Optional[int] = DOCUMENT_MAX_CHARS) -> Tuple[Optional[str], str]:
+    """Async variant of parse_document_keyed; parsing runs on the CPU executor."""
+    return await run_blocking(parse_document_keyed, source, filename, max_pages, max_chars)
+
+async def aparse_document(source: DocumentSource, filename: Optional[str] = None,
+                          max_pages: Optional[int] = DOCUMENT_MAX_PAGES, max_chars: Optional[int] = DOCUMENT_MAX_CHARS) -> str:
+    """Async variant of parse_document; parsing runs on the CPU executor."""
+    return (await aparse_document_keyed(source, filename, max_pages, max_chars))[1]
+
+@timed(TOOL_SECONDS, tool="ocr_image")
+async def aocr_image_keyed(source: DocumentSource) -> Tuple[Optional[str], str]:
+    """
+    Async variant of ocr_image_keyed. Cache lookups run on the CPU executor and
+    Tesseract on the OCR process pool, so the event loop is never blocked.
+    """
+    try:
+        data, _ = await run_blocking(_resolve_source, source)
+        key = await run_blocking(_cache_key, data, ocr_version(), source)
+        text = await run_blocking(document_cache.get, key)
+        if text is None:
+            text = await run_in_ocr_pool(_ocr_image, data)
+            await run_blocking(document_cache.put, key, text)
+        return key, text
+    except Exception as e:
+        return None, f"Error processing image: {e}"
+
+async def aocr_image(source: DocumentSource) -> str:
+    """Async variant of ocr_image (see aocr_image_keyed)."""
+    return (await aocr_image_keyed(source))[1]
+
 @tool
 def read_document_content(file_path: str) -> str:
     """
     Reads the text content from a document file (PDF, DOCX, XLSX, TXT).
     """
-    try:
-        _, extension = os.path.splitext(file_path)
-        extension = extension.lower()
-
-        if extension == '.pdf':
-            reader = pypdf.PdfReader(file_path)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() or ""
-            return text
-        
-        elif extension == '.docx':
-            doc = docx.Document(file_path)
-            return "\n".join([para.text for para in doc.paragraphs])
-            
-        elif extension == '.xlsx':
-            # Read all sheets and convert them to a string format
-            xls = pd.ExcelFile(file_path)
-            content = ""
-            for sheet_name in xls.sheet_names:
-                df = pd.read_excel(xls, sheet_name=sheet_name)
-                content += f"--- Sheet: {sheet_name} ---\n"
-                content += df.to_string() + "\n\n"
-            return content
-
-        elif extension == '.txt':
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        else:
-            return f"Unsupported file type: {extension}"
-            
-    except Exception as e:
-        return f"Error reading file {file_path}: {e}"
+    return parse_document(file_path)
 
 @tool
 def extract_text_from_image(image_path: str) -> str:
     """Extracts text from an image file using OCR."""
-    try:
-        text = pytesseract.image_to_string(Image.open(image_path))
-        return text
-    except Exception as e:
-        return f"Error processing image: {e}"
+    return ocr_image(image_path)
 
 class MLInput(BaseModel):
     age: int = Field(description="Applicant's age")
@@ -78,18 +276,64 @@ class MLInput(BaseModel):
     family_size: int = Field(description="Number of family members")
     employment_years: int = Field(description="Total years of employment")
 
+# Raw inputs taken from the application; everything else in the model's features is derived
+BASE_FEATURES = ['age', 'monthly_income', 'family_size', 'employment_years']
+
+def eligibility_feature_matrix(applicants: Union["pd.DataFrame", List[Dict]]) -> np.ndarray:
+    """
+    Builds the model's feature matrix (columns in the model's feature order) for
+    many applicants at once. Accepts a DataFrame with the base columns or a list of dicts.
+    """
+    if hasattr(applicants, "columns"):
+        base = applicants[BASE_FEATURES].to_numpy(dtype=np.float64)
+    else:
+        base = np.array([[row[f] for f in BASE_FEATURES] for row in applicants], dtype=np.float64).reshape(-1, len(BASE_FEATURES))
+    columns = {name: base[:, i] for i, name in enumerate(BASE_FEATURES)}
+    columns['income_per_person'] = columns['monthly_income'] / columns['family_size']
+    return np.column_stack([columns[f] for f in get_eligibility_model().features])
+
+def score_feature_matrix(X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Scores a feature matrix in a single predict_proba call.
+    Returns (labels, class probability matrix); columns follow label_encoder.classes_.
+    """
+    loaded = get_eligibility_model()
+    model, label_encoder = loaded.model, loaded.label_encoder
+    with warnings.catch_warnings():
+        # The model was fitted on a DataFrame; the column order is guaranteed by the features list
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        probabilities = model.predict_proba(X)
+    labels = label_encoder.inverse_transform(model.classes_[probabilities.argmax(axis=1)])
+    return labels, probabilities
+
+def eligibility_class_names() -> np.ndarray:
+    """Class labels in the order of the probability columns."""
+    loaded = get_eligibility_model()
+    return loaded.label_encoder.inverse_transform(loaded.model.classes_)
+
+@timed(TOOL_SECONDS, tool="predict_eligibility")
+def predict_eligibility_batch(applicants: Union["pd.DataFrame", List[Dict]]) -> List[Dict]:
+    """
+    Vectorized eligibility scoring for many applicants. Returns, per applicant,
+    the predicted label, its probability and the probability of every class.
+    """
+    labels, probabilities = score_feature_matrix(eligibility_feature_matrix(applicants))
+    class_names = eligibility_class_names()
+    return [
+        {
+            "prediction": label,
+            "probability": float(row.max()),
+            "probabilities": dict(zip(class_names, row.tolist())),
+        }
+        for label, row in zip(labels, probabilities)
+    ]
+
 @tool
 def predict_eligibility(data: MLInput) -> str:
     """
     Predicts financial support eligibility using a pre-trained machine learning model.
     """
     try:
-        input_data = pd.DataFrame([data.dict()], columns=features_list, index=[0])
-        input_data['income_per_person'] = input_data['monthly_income'] / input_data['family_size']
-        input_data = input_data[features_list]
-
-        prediction_encoded = model.predict(input_data)[0]
-        prediction = label_encoder.inverse_transform([prediction_encoded])[0]
-        return prediction
+        return predict_eligibility_batch([data.dict()])[0]["prediction"]
     except Exception as e:
-        return f"Error during prediction: {e}"
\ No newline at end of file
+        return f"Error during prediction: {e}"
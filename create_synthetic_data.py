@@ -1,26 +1,45 @@
-import pandas as pd
+import argparse
+import csv
+import functools
+import io
+import multiprocessing
+import os
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
 import numpy as np
 from faker import Faker
 from PIL import Image, ImageDraw, ImageFont
-import os
 import docx
 from fpdf import FPDF
+from openpyxl import Workbook
 
-# Initialize Faker
+# Document files that can be generated per applicant, by type
+DOCUMENT_FILES = {
+    "emirates_id": "emirates_id.png",
+    "resume_docx": "resume.docx",
+    "resume_pdf": "resume.pdf",
+    "bank_statement": "bank_statement.txt",
+    "assets": "assets.xlsx",
+}
+CSV_COLUMNS = ['applicant_id', 'name', 'age', 'monthly_income', 'family_size', 'employment_years', 'address_form', 'eligibility_status']
+
+# One Faker per process, reseeded for every applicant
 fake = Faker()
 
-# Create directories if they don't exist
-os.makedirs('data/applicants', exist_ok=True)
+@functools.lru_cache(maxsize=1)
+def _id_card_font():
+    try:
+        return ImageFont.truetype("arial.ttf", 15)
+    except IOError:
+        return ImageFont.load_default()
 
 def create_mock_emirates_id(applicant_name, file_path):
-    # (This function remains unchanged)
     width, height = 400, 250
     img = Image.new('RGB', (width, height), color = 'lightgrey')
     d = ImageDraw.Draw(img)
-    try:
-        font = ImageFont.truetype("arial.ttf", 15)
-    except IOError:
-        font = ImageFont.load_default()
+    font = _id_card_font()
     d.text((10,10), "United Arab Emirates", fill=(0,0,0), font=font)
     d.text((10,30), "Emirates Identity Card", fill=(0,0,0), font=font)
     d.text((10, 80), f"Name: {applicant_name}", fill=(0,0,0), font=font)
@@ -38,11 +57,31 @@ def create_resume_content(name, employment_years):
         "Skills:\n- Python\n- Project Management\n- Data Analysis"
     )
 
-def create_docx_resume(content, file_path):
+RESUME_PLACEHOLDER = "@@RESUME_CONTENT@@"
+
+@functools.lru_cache(maxsize=1)
+def _docx_resume_template():
+    """
+    The parts of a python-docx resume with a placeholder paragraph, built once
+    per process. Loading python-docx's default template and saving through it
+    costs ~30 ms per file; filling this template in costs a few.
+    """
     doc = docx.Document()
     doc.add_heading('Curriculum Vitae', 0)
-    doc.add_paragraph(content)
-    doc.save(file_path)
+    doc.add_paragraph(RESUME_PLACEHOLDER)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    with zipfile.ZipFile(buffer) as package:
+        return [(info, package.read(info.filename)) for info in package.infolist()]
+
+def create_docx_resume(content, file_path):
+    # Same markup python-docx writes for add_paragraph(content): one run, <w:br/> per newline
+    run = "<w:br/>".join(f'<w:t xml:space="preserve">{escape(line)}</w:t>' if line else "" for line in content.split("\n"))
+    with zipfile.ZipFile(file_path, "w", zipfile.ZIP_DEFLATED) as package:
+        for info, data in _docx_resume_template():
+            if info.filename == "word/document.xml":
+                data = data.replace(f"<w:t>{RESUME_PLACEHOLDER}</w:t>".encode(), run.encode())
+            package.writestr(info, data, compress_type=zipfile.ZIP_DEFLATED)
 
 def create_pdf_resume(content, file_path):
     pdf = FPDF()
@@ -52,63 +91,127 @@ def create_pdf_resume(content, file_path):
     pdf.multi_cell(0, 10, txt=content)
     pdf.output(file_path)
 
-def create_applicant_data(num_applicants=10):
-    """Generates a dataset of applicants and their documents."""
-    data = []
-    for i in range(num_applicants):
-        applicant_id = 1000 + i
-        name = fake.name()
-        income = np.random.randint(2000, 15000)
-        family_size = np.random.randint(1, 7)
-        employment_years = np.random.randint(0, 20)
-        
-        # Determine eligibility for the training data
-        if income < 5000 and family_size > 3:
-            eligibility = "Approve"
-        elif income < 8000 and family_size > 1:
-            eligibility = np.random.choice(["Approve", "Decline"], p=[0.6, 0.4])
-        else:
-            eligibility = "Decline"
-
-        applicant_folder = f'data/applicants/{applicant_id}'
-        os.makedirs(applicant_folder, exist_ok=True)
-        
-        # --- Create Documents ---
-        # 1. Emirates ID
-        id_path = os.path.join(applicant_folder, 'emirates_id.png')
-        create_mock_emirates_id(name, id_path)
-
-        # 2. Resume (now in multiple formats)
-        resume_content = create_resume_content(name, employment_years)
-        create_docx_resume(resume_content, os.path.join(applicant_folder, 'resume.docx'))
-        create_pdf_resume(resume_content, os.path.join(applicant_folder, 'resume.pdf'))
-
-        # 3. Bank Statement (as TXT)
-        bank_stmt_path = os.path.join(applicant_folder, 'bank_statement.txt')
-        with open(bank_stmt_path, 'w') as f:
+def create_assets_sheet(rng, file_path):
+    # Written with openpyxl directly; going through a pandas DataFrame costs more than the file itself
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(['Asset', 'Value', 'Liability', 'Amount'])
+    ws.append(['Savings Account', int(rng.integers(1000, 50000)), 'Personal Loan', int(rng.integers(0, 20000))])
+    ws.append(['Car', int(rng.integers(0, 80000)), 'Credit Card Debt', int(rng.integers(0, 10000))])
+    wb.save(file_path)
+
+def generate_applicant(applicant_id, data_dir, documents, seed):
+    """
+    Creates one applicant's folder and documents and returns its CSV row.
+    Every random draw comes from RNGs seeded by (seed, applicant_id), so an
+    applicant is identical whichever worker generates it, and in any run.
+    """
+    rng = np.random.default_rng([seed, applicant_id])
+    fake.seed_instance(seed * 1_000_003 + applicant_id)
+
+    name = fake.name()
+    income = int(rng.integers(2000, 15000))
+    family_size = int(rng.integers(1, 7))
+    employment_years = int(rng.integers(0, 20))
+
+    # Determine eligibility for the training data
+    if income < 5000 and family_size > 3:
+        eligibility = "Approve"
+    elif income < 8000 and family_size > 1:
+        eligibility = str(rng.choice(["Approve", "Decline"], p=[0.6, 0.4]))
+    else:
+        eligibility = "Decline"
+
+    applicant_folder = os.path.join(data_dir, 'applicants', str(applicant_id))
+    os.makedirs(applicant_folder, exist_ok=True)
+
+    # --- Create Documents ---
+    # Content is always drawn in the same order, so selecting fewer document
+    # types does not change the applicant's data.
+    resume_content = create_resume_content(name, employment_years)
+    statement_income = income + int(rng.integers(-500, 500))
+    if "emirates_id" in documents:
+        create_mock_emirates_id(name, os.path.join(applicant_folder, DOCUMENT_FILES["emirates_id"]))
+    if "resume_docx" in documents:
+        create_docx_resume(resume_content, os.path.join(applicant_folder, DOCUMENT_FILES["resume_docx"]))
+    if "resume_pdf" in documents:
+        create_pdf_resume(resume_content, os.path.join(applicant_folder, DOCUMENT_FILES["resume_pdf"]))
+    if "bank_statement" in documents:
+        with open(os.path.join(applicant_folder, DOCUMENT_FILES["bank_statement"]), 'w') as f:
             f.write(f"Bank Statement for {name}\n")
-            f.write(f"Average Monthly Income: AED {income + np.random.randint(-500, 500)}\n")
-
-        # 4. Assets/Liabilities (as Excel)
-        assets_path = os.path.join(applicant_folder, 'assets.xlsx')
-        assets_df = pd.DataFrame({
-            'Asset': ['Savings Account', 'Car'], 'Value': [np.random.randint(1000, 50000), np.random.randint(0, 80000)],
-            'Liability': ['Personal Loan', 'Credit Card Debt'], 'Amount': [np.random.randint(0, 20000), np.random.randint(0, 10000)]
-        })
-        assets_df.to_excel(assets_path, index=False)
-        
-        data.append({
-            'applicant_id': applicant_id,
-            'name': name, 'age': np.random.randint(22, 60),
-            'monthly_income': income, 'family_size': family_size,
-            'employment_years': employment_years,
-            'address_form': fake.address().replace('\n', ', '),
-            'eligibility_status': eligibility
-        })
-
-    df = pd.DataFrame(data)
-    df.to_csv('data/applications.csv', index=False)
-    print(f"Generated {num_applicants} synthetic applicant profiles in 'data/applicants' and 'data/applications.csv'")
+            f.write(f"Average Monthly Income: AED {statement_income}\n")
+    if "assets" in documents:
+        create_assets_sheet(rng, os.path.join(applicant_folder, DOCUMENT_FILES["assets"]))
+
+    return {
+        'applicant_id': applicant_id,
+        'name': name, 'age': int(rng.integers(22, 60)),
+        'monthly_income': income, 'family_size': family_size,
+        'employment_years': employment_years,
+        'address_form': fake.address().replace('\n', ', '),
+        'eligibility_status': eligibility
+    }
+
+def _is_complete(applicant_id, data_dir, documents):
+    folder = os.path.join(data_dir, 'applicants', str(applicant_id))
+    return all(os.path.exists(os.path.join(folder, DOCUMENT_FILES[doc])) for doc in documents)
+
+def _existing_rows(csv_path):
+    if not os.path.exists(csv_path):
+        return set()
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        return {int(row['applicant_id']) for row in csv.DictReader(f)}
+
+def create_applicant_data(num_applicants=10, data_dir='data', start_id=1000, workers=None, seed=42,
+                          documents=None, incremental=False):
+    """
+    Generates applicants start_id .. start_id + num_applicants - 1 and their
+    documents under `data_dir` on a process pool. Rows are appended to
+    applications.csv as they complete, in applicant_id order. With
+    `incremental`, applicants whose folder already has every selected document
+    are skipped and only missing CSV rows are added.
+    """
+    documents = list(documents or DOCUMENT_FILES)
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(os.path.join(data_dir, 'applicants'), exist_ok=True)
+    csv_path = os.path.join(data_dir, 'applications.csv')
+
+    applicant_ids = range(start_id, start_id + num_applicants)
+    existing_rows = _existing_rows(csv_path) if incremental else set()
+    if incremental:
+        pending = [i for i in applicant_ids if i not in existing_rows or not _is_complete(i, data_dir, documents)]
+    else:
+        pending = list(applicant_ids)
+
+    start = time.perf_counter()
+    write_header = not (incremental and os.path.exists(csv_path))
+    with open(csv_path, 'w' if write_header else 'a', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
+        if write_header:
+            writer.writeheader()
+        generate = functools.partial(generate_applicant, data_dir=data_dir, documents=documents, seed=seed)
+        with multiprocessing.Pool(workers) as pool:
+            for done, row in enumerate(pool.imap(generate, pending, chunksize=16), start=1):
+                if row['applicant_id'] not in existing_rows:
+                    writer.writerow(row)
+                if done % 1000 == 0:
+                    f.flush()
+                    print(f"Generated {done}/{len(pending)} applicants in {time.perf_counter() - start:.1f}s")
+
+    skipped = num_applicants - len(pending)
+    print(f"Generated {len(pending)} synthetic applicant profiles ({skipped} already present) in "
+          f"'{os.path.join(data_dir, 'applicants')}' and '{csv_path}' in {time.perf_counter() - start:.1f}s")
 
 if __name__ == "__main__":
-    create_applicant_data(50)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate synthetic applicants and their documents.")
+    parser.add_argument("-n", "--num-applicants", type=int, default=50)
+    parser.add_argument("--data-dir", default="data", help="Writes <data-dir>/applicants/<id>/ and <data-dir>/applications.csv")
+    parser.add_argument("--start-id", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None, help="Generator processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=42, help="Same seed, same applicants")
+    parser.add_argument("--documents", nargs="+", choices=list(DOCUMENT_FILES), default=list(DOCUMENT_FILES),
+                        help="Document types to create")
+    parser.add_argument("--incremental", action="store_true", help="Only create applicants that are missing")
+    args = parser.parse_args()
+    create_applicant_data(args.num_applicants, args.data_dir, args.start_id, args.workers, args.seed,
+                          args.documents, args.incremental)
@@ -1,19 +1,82 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+import orjson
 import uvicorn
 import os
 import shutil
-from typing import Annotated
-from pydantic import BaseModel
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Annotated, List, Optional
 
+from core.blobs import blob_store
+from core.checkpoints import aprepare_run, arelease_thread, arerun_decision, get_checkpointer, thread_run_lock
+from core.executors import run_blocking, shutdown_executors
 from core.graph import get_graph
-from core.schemas import ApplicationData, GraphState
+from core.jobs import JOB_POLL_SECONDS, JOB_WORKERS, JobWorkerPool, QueueFullError, job_queue, validate_webhook_url
+from core.metrics import registry, start_request_timings
+from core.results import RESULT_REUSE, application_fingerprint, result_store
+from core.resources import LazyResource, warm_up
+from core.schemas import ApplicationData, DocumentBlob, EligibilityFeatures, EligibilityScore, GraphState, state_to_dict
+from core.streaming import PartialJSONParser, sse_event
+from core.tools import predict_eligibility_batch
 
-app = FastAPI(title="Social Support AI API")
-app_graph = get_graph()
+# Load the ML model, LLM client and compiled graph at startup instead of on
+# the first request (set WARM_UP_ON_STARTUP=0 for the fastest possible boot).
+WARM_UP_ON_STARTUP = os.getenv("WARM_UP_ON_STARTUP", "1") == "1"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARM_UP_ON_STARTUP:
+        start = time.perf_counter()
+        loaded = await run_blocking(warm_up)
+        print(f"Warm-up finished in {time.perf_counter() - start:.2f}s: {loaded}")
+    app.state.job_workers = JobWorkerPool(job_queue, app_graph.get(), workers=JOB_WORKERS, poll_seconds=JOB_POLL_SECONDS)
+    await app.state.job_workers.start()
+    yield
+    # Let running jobs and in-flight OCR/parsing work finish before the worker exits
+    await app.state.job_workers.stop()
+    shutdown_executors()
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, which encodes large states several times faster."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=str)
+
+app = FastAPI(title="Social Support AI API", lifespan=lifespan, default_response_class=FastJSONResponse)
+app_graph = LazyResource("graph", lambda: get_graph(checkpointer=get_checkpointer()))
 
 UPLOAD_DIR = "temp_uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Uploads up to this size are parsed straight from memory; larger ones are
+# spilled to a uniquely named temp file so memory per request stays bounded.
+UPLOAD_SPILL_BYTES = int(os.getenv("UPLOAD_SPILL_BYTES", 20 * 1024 * 1024))
+
+def _spill_to_disk(upload: UploadFile) -> str:
+    _, extension = os.path.splitext(upload.filename or "")
+    fd, path = tempfile.mkstemp(suffix=extension, dir=UPLOAD_DIR)
+    upload.file.seek(0)
+    with os.fdopen(fd, "wb") as buffer:
+        shutil.copyfileobj(upload.file, buffer)
+    return path
+
+async def load_upload(upload: UploadFile, spilled_paths: list):
+    """
+    Puts an upload in the blob store and returns its DocumentRef, or a temp
+    file path above the spill threshold. The graph state (and every
+    checkpoint of it) then carries the reference instead of the bytes.
+    """
+    size = upload.size
+    if size is None:
+        upload.file.seek(0, os.SEEK_END)
+        size = upload.file.tell()
+        upload.file.seek(0)
+    if size <= UPLOAD_SPILL_BYTES:
+        return await run_blocking(blob_store.put, await upload.read(), upload.filename or "")
+    path = await run_blocking(_spill_to_disk, upload)
+    spilled_paths.append(path)
+    return path
 
 @app.post("/process_application/")
 async def process_application(
@@ -26,23 +89,27 @@ async def process_application(
     emirates_id: Annotated[UploadFile, File()],
     resume: Annotated[UploadFile, File()],
     bank_statement: Annotated[UploadFile, File()],
+    assets: Annotated[Optional[UploadFile], File()] = None,
+    include_timings: bool = False,
 ):
     """
     Receives application data and files, processes them through the AI workflow,
-    and returns the final decision.
+    and returns the final decision. With `?include_timings=true` the response
+    also carries a per-node/tool/LLM timing breakdown in seconds.
     """
+    request_start = time.perf_counter()
+    timings = start_request_timings()
+    spilled_paths = []
     try:
-        # Save uploaded files temporarily
-        id_path = os.path.join(UPLOAD_DIR, emirates_id.filename)
-        resume_path = os.path.join(UPLOAD_DIR, resume.filename)
-        bank_statement_path = os.path.join(UPLOAD_DIR, bank_statement.filename)
-
-        with open(id_path, "wb") as buffer:
-            shutil.copyfileobj(emirates_id.file, buffer)
-        with open(resume_path, "wb") as buffer:
-            shutil.copyfileobj(resume.file, buffer)
-        with open(bank_statement_path, "wb") as buffer:
-            shutil.copyfileobj(bank_statement.file, buffer)
+        # Uploads go to the blob store; only oversized files are spilled to temp files
+        document_paths = {
+            "emirates_id": await load_upload(emirates_id, spilled_paths),
+            "resume": await load_upload(resume, spilled_paths),
+            "bank_statement": await load_upload(bank_statement, spilled_paths),
+        }
+        # The assets/liabilities sheet is optional and joins the same fan-out
+        if assets is not None and assets.filename:
+            document_paths["assets"] = await load_upload(assets, spilled_paths)
 
         # Prepare initial state for the graph
         initial_state = GraphState(
@@ -51,37 +118,251 @@ async def process_application(
                 family_size=family_size, employment_years=employment_years,
                 address_form=address_form
             ),
-            document_paths={
-                "emirates_id": id_path, "resume": resume_path, "bank_statement": bank_statement_path
-            }
+            document_paths=document_paths
         )
 
-        # Run the graph
-        final_state_dict = app_graph.invoke(initial_state)
-        
-        # Clean up temp files
-        os.remove(id_path)
-        os.remove(resume_path)
-        os.remove(bank_statement_path)
-
-        # FINAL FIX: Manually build a serializable dictionary.
-        # This loop checks each value in the state dictionary. If a value is a
-        # Pydantic model (like ApplicationData), it calls .dict() on it.
-        # Otherwise, it uses the value as-is.
-        serializable_content = {}
-        for key, value in final_state_dict.items():
-            if isinstance(value, BaseModel):
-                serializable_content[key] = value.dict()
-            else:
-                serializable_content[key] = value
-
-        return JSONResponse(content=serializable_content)
+        # An identical earlier submission is answered from the result store;
+        # one still running here is waited for and then answered from it
+        fingerprint = await run_blocking(application_fingerprint, initial_state.application_data, document_paths)
+        async with thread_run_lock(fingerprint):
+            serializable_content = await run_blocking(result_store.get, fingerprint) if RESULT_REUSE else None
+            source = "store"
+            if serializable_content is None:
+                source = "graph"
+                # Run the graph without blocking the event loop, so other
+                # applications can progress while this one waits on the LLM.
+                # The fingerprint is the checkpoint thread: a retry after a
+                # failure resumes from the last completed node.
+                graph_input, config = await aprepare_run(app_graph.get(), initial_state, fingerprint)
+                final_state_dict = await app_graph.get().ainvoke(graph_input, config)
+
+                # Pydantic models in the state (like ApplicationData) are converted
+                # to plain dicts so the response is serializable.
+                serializable_content = state_to_dict(final_state_dict)
+                await run_blocking(result_store.put, fingerprint, serializable_content)
+                await arelease_thread(app_graph.get(), fingerprint)
+        if include_timings:
+            timings["total"] = round(time.perf_counter() - request_start, 6)
+            serializable_content["timings"] = timings
+
+        return FastJSONResponse(content=serializable_content, headers={"X-Result-Source": source})
 
     except Exception as e:
         import traceback
         print(f"An error occurred: {e}")
         traceback.print_exc() # Print full traceback for better debugging
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Clean up any uploads that were spilled to disk
+        for path in spilled_paths:
+            os.remove(path)
+
+# Node whose LLM tokens are forwarded on the streaming endpoint
+STREAMED_DECISION_NODE = "decision_recommendation"
+
+async def stream_application_events(initial_state: GraphState, spilled_paths: list, include_timings: bool):
+    """
+    Runs the graph and yields Server-Sent Events as it progresses:
+    `node` when a node finishes (with its state update), `token` for each
+    decision LLM token, `decision` whenever the partially generated decision
+    object grows, then `result` with the final state (or `error`). A stored
+    result for an identical submission is sent as the only event.
+    """
+    request_start = time.perf_counter()
+    timings = start_request_timings()
+    parser = PartialJSONParser()
+    final_state = None
+    try:
+        fingerprint = await run_blocking(application_fingerprint, initial_state.application_data, initial_state.document_paths)
+        async with thread_run_lock(fingerprint):
+            stored = await run_blocking(result_store.get, fingerprint) if RESULT_REUSE else None
+            if stored is not None:
+                yield sse_event("result", stored)
+                return
+            graph_input, config = await aprepare_run(app_graph.get(), initial_state, fingerprint)
+            async for mode, chunk in app_graph.get().astream(graph_input, config, stream_mode=["updates", "messages", "values"]):
+                if mode == "updates":
+                    for node_name, update in chunk.items():
+                        yield sse_event("node", {
+                            "node": node_name, "update": state_to_dict(update or {}),
+                            "elapsed": round(time.perf_counter() - request_start, 6),
+                        })
+                elif mode == "messages":
+                    message, metadata = chunk
+                    if metadata.get("langgraph_node") != STREAMED_DECISION_NODE or not message.content:
+                        continue
+                    yield sse_event("token", {"text": message.content})
+                    partial = parser.feed(message.content)
+                    if parser.changed:
+                        yield sse_event("decision", partial)
+                else:
+                    final_state = chunk
+            result = state_to_dict(final_state)
+            await run_blocking(result_store.put, fingerprint, result)
+            await arelease_thread(app_graph.get(), fingerprint)
+        if include_timings:
+            timings["total"] = round(time.perf_counter() - request_start, 6)
+            result["timings"] = timings
+        yield sse_event("result", result)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        yield sse_event("error", {"detail": str(e)})
+    finally:
+        for path in spilled_paths:
+            os.remove(path)
+
+@app.post("/process_application/stream")
+async def process_application_stream(
+    name: Annotated[str, Form()],
+    age: Annotated[int, Form()],
+    monthly_income: Annotated[int, Form()],
+    family_size: Annotated[int, Form()],
+    employment_years: Annotated[int, Form()],
+    address_form: Annotated[str, Form()],
+    emirates_id: Annotated[UploadFile, File()],
+    resume: Annotated[UploadFile, File()],
+    bank_statement: Annotated[UploadFile, File()],
+    assets: Annotated[Optional[UploadFile], File()] = None,
+    include_timings: bool = False,
+):
+    """
+    Same workflow as /process_application/, answered as a text/event-stream:
+    node results arrive as soon as each node finishes and the decision is
+    streamed token by token, so the client can render before the graph ends.
+    """
+    spilled_paths = []
+    # Uploads are read before streaming starts; FastAPI closes them afterwards
+    document_paths = {
+        "emirates_id": await load_upload(emirates_id, spilled_paths),
+        "resume": await load_upload(resume, spilled_paths),
+        "bank_statement": await load_upload(bank_statement, spilled_paths),
+    }
+    if assets is not None and assets.filename:
+        document_paths["assets"] = await load_upload(assets, spilled_paths)
+    initial_state = GraphState(
+        application_data=ApplicationData(
+            name=name, age=age, monthly_income=monthly_income,
+            family_size=family_size, employment_years=employment_years,
+            address_form=address_form
+        ),
+        document_paths=document_paths
+    )
+    return StreamingResponse(
+        stream_application_events(initial_state, spilled_paths, include_timings),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/applications", status_code=202)
+async def submit_application(
+    request: Request,
+    name: Annotated[str, Form()],
+    age: Annotated[int, Form()],
+    monthly_income: Annotated[int, Form()],
+    family_size: Annotated[int, Form()],
+    employment_years: Annotated[int, Form()],
+    address_form: Annotated[str, Form()],
+    emirates_id: Annotated[UploadFile, File()],
+    resume: Annotated[UploadFile, File()],
+    bank_statement: Annotated[UploadFile, File()],
+    assets: Annotated[Optional[UploadFile], File()] = None,
+    webhook_url: Annotated[Optional[str], Form()] = None,
+):
+    """
+    Queues an application for background processing and returns its job id
+    immediately. Poll GET /applications/{job_id}, or pass `webhook_url` to be
+    called with the result (public http(s) hosts only; 422 otherwise).
+    Returns 429 when the queue is full.
+    """
+    if webhook_url:
+        try:
+            await run_blocking(validate_webhook_url, webhook_url)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    application = ApplicationData(
+        name=name, age=age, monthly_income=monthly_income,
+        family_size=family_size, employment_years=employment_years,
+        address_form=address_form
+    )
+    uploads = {"emirates_id": emirates_id, "resume": resume, "bank_statement": bank_statement}
+    if assets is not None and assets.filename:
+        uploads["assets"] = assets
+    documents = {
+        doc_type: DocumentBlob(filename=upload.filename or "", content=await upload.read())
+        for doc_type, upload in uploads.items()
+    }
+    try:
+        job_id = await run_blocking(job_queue.submit, application, documents, webhook_url)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    request.app.state.job_workers.notify()
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/applications/{job_id}")
+async def get_application(job_id: str):
+    """Returns a job's status, per-node progress and, once completed, its result."""
+    job = await run_blocking(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.get("/results")
+async def list_results(
+    name: Optional[str] = None,
+    decision: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+    offset: Annotated[int, Query(ge=0)] = 0,
+):
+    """
+    Caseworker search over processed applications, newest first: by applicant
+    name prefix, final decision and/or date range (Unix timestamps).
+    """
+    return await run_blocking(result_store.query, name, decision, since, until, limit, offset)
+
+@app.get("/results/{fingerprint}")
+async def get_result(fingerprint: str):
+    """Returns the stored final state of a processed application."""
+    result = await run_blocking(result_store.get, fingerprint, False)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Result {fingerprint} not found")
+    return result
+
+@app.post("/results/{fingerprint}/rerun_decision")
+async def rerun_decision(fingerprint: str):
+    """
+    Re-runs only the final decision of a processed application from its
+    checkpoint (e.g. after changing the decision prompt or model) and stores
+    the new result. Documents, extraction, validation and the ML check are
+    not repeated.
+    """
+    graph = app_graph.get()
+    if graph.checkpointer is None:
+        raise HTTPException(status_code=409, detail="Graph checkpoints are disabled (GRAPH_CHECKPOINTS=0)")
+    final_state = await arerun_decision(graph, fingerprint)
+    if final_state is None:
+        raise HTTPException(status_code=404, detail=f"No checkpoint for {fingerprint}")
+    result = state_to_dict(final_state)
+    await run_blocking(result_store.put, fingerprint, result)
+    return result
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Exposes latency histograms and cache counters in Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/score_batch/", response_model=List[EligibilityScore])
+async def score_batch(applicants: List[EligibilityFeatures]):
+    """
+    Scores many applicants with the eligibility model in one vectorized call.
+    """
+    if not applicants:
+        return []
+    records = [applicant.dict() for applicant in applicants]
+    return await run_blocking(predict_eligibility_batch, records)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,42 @@
+import argparse
+import time
+
+import pandas as pd
+
+from core.resources import use_eligibility_backend
+from core.tools import BASE_FEATURES, eligibility_class_names, eligibility_feature_matrix, score_feature_matrix
+
+def score_csv(input_path, output_path, chunksize=100000):
+    """
+    Re-scores every applicant in a CSV (e.g. data/applications.csv) with the
+    eligibility model. Each chunk becomes one NumPy matrix and one predict_proba call.
+    """
+    class_names = eligibility_class_names()
+    start = time.perf_counter()
+    total = 0
+    for i, chunk in enumerate(pd.read_csv(input_path, chunksize=chunksize)):
+        labels, probabilities = score_feature_matrix(eligibility_feature_matrix(chunk))
+
+        keep = [c for c in ('applicant_id', 'name') if c in chunk.columns]
+        scored = chunk[keep + BASE_FEATURES].copy()
+        scored['ml_prediction'] = labels
+        scored['ml_probability'] = probabilities.max(axis=1)
+        for j, class_name in enumerate(class_names):
+            scored[f'p_{class_name}'] = probabilities[:, j]
+
+        scored.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        total += len(scored)
+
+    elapsed = time.perf_counter() - start
+    print(f"Scored {total} applicants in {elapsed:.2f}s -> {output_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch eligibility scoring over an applications CSV.")
+    parser.add_argument("input", nargs="?", default="data/applications.csv", help="CSV with age, monthly_income, family_size, employment_years")
+    parser.add_argument("-o", "--output", default="data/eligibility_scores.csv", help="Where to write the scored CSV")
+    parser.add_argument("--chunksize", type=int, default=100000, help="Rows scored per predict_proba call")
+    parser.add_argument("--backend", choices=["sklearn", "numpy"], default="sklearn",
+                        help="Model backend; sklearn is faster for large chunks, numpy for small ones")
+    args = parser.parse_args()
+    use_eligibility_backend(args.backend)
+    score_csv(args.input, args.output, args.chunksize)
@@ -0,0 +1,105 @@
+"""
+Production launcher for the API: several uvicorn worker processes under
+gunicorn, forked from a master that has already imported the app and loaded
+the eligibility model and LLM chains.
+
+    python serve.py --port 8000
+    LLM_MAX_CONCURRENCY=8 python serve.py --workers 4 --port 8000
+
+Because the app is preloaded, every worker shares the imported libraries and
+model pages with the master copy-on-write instead of loading its own. Each
+worker creates its own CPU and OCR pools and LLM slots, sized to its share of
+the host totals (see core/executors.per_worker_share). Every worker needs at least one LLM slot,
+so the worker count defaults to the smaller of the core count and
+LLM_MAX_CONCURRENCY, and larger counts are refused. On SIGTERM each worker stops accepting
+connections and finishes in-flight requests and running jobs for up to
+--graceful-timeout seconds before exiting.
+
+Without gunicorn (e.g. on Windows) it falls back to `uvicorn --workers`,
+where each worker imports and loads everything itself.
+"""
+import argparse
+import gc
+import os
+import time
+
+# Resources loaded in the master before forking. Everything holding sockets,
+# SQLite connections, threads or process pools (the graph's checkpointer,
+# caches, executors) is created by each worker's own warm-up instead.
+PRELOAD_RESOURCES = ["eligibility_model", "llm", "extraction_chain", "decision_chain"]
+
+def load_app():
+    """Imports the API and loads the fork-safe resources (runs once, in the master)."""
+    start = time.perf_counter()
+    from core.resources import warm_up
+    from main import app
+    loaded = warm_up(PRELOAD_RESOURCES)
+    # Move everything loaded so far out of the garbage collector's reach, so
+    # collections in the workers don't write to (and un-share) these pages
+    gc.freeze()
+    print(f"Preloaded the app in {time.perf_counter() - start:.2f}s: {loaded}")
+    return app
+
+def serve_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class PreloadedApplication(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{args.host}:{args.port}",
+                "workers": args.workers,
+                "worker_class": "uvicorn.workers.UvicornWorker",
+                "preload_app": True,
+                "graceful_timeout": args.graceful_timeout,
+                # Workers are only restarted when their event loop stops responding
+                "timeout": args.graceful_timeout + 30,
+                "keepalive": 5,
+                "max_requests": args.max_requests,
+                "max_requests_jitter": args.max_requests // 10,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app()
+
+    PreloadedApplication().run()
+
+def serve_uvicorn(args):
+    import uvicorn
+    print("gunicorn is not installed; starting uvicorn workers without preloading.")
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers,
+                timeout_graceful_shutdown=args.graceful_timeout)
+
+def default_workers(llm_budget: int) -> int:
+    if os.getenv("WEB_CONCURRENCY"):
+        return int(os.environ["WEB_CONCURRENCY"])
+    return max(1, min(os.cpu_count() or 1, llm_budget))
+
+def main():
+    # The host's LLM slot budget, before it is split across the workers
+    llm_budget = int(os.getenv("LLM_MAX_CONCURRENCY", 2))
+    parser = argparse.ArgumentParser(description="Serve the API with several worker processes.")
+    parser.add_argument("--workers", type=int, default=default_workers(llm_budget),
+                        help="Worker processes (default: WEB_CONCURRENCY, else min(cores, LLM_MAX_CONCURRENCY))")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", 120)),
+                        help="Seconds a stopping worker may spend finishing in-flight applications")
+    parser.add_argument("--max-requests", type=int, default=0, help="Recycle a worker after this many requests (0: never)")
+    args = parser.parse_args()
+    if args.workers > llm_budget:
+        # Each worker's gate would still allow one call, overrunning the LLM server
+        parser.error(f"--workers {args.workers} exceeds LLM_MAX_CONCURRENCY={llm_budget}; every worker needs "
+                     "at least one LLM slot. Use fewer workers or raise LLM_MAX_CONCURRENCY (and OLLAMA_NUM_PARALLEL).")
+    # Read by core.executors and core.llm at import to split per-host budgets
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        serve_uvicorn(args)
+        return
+    serve_gunicorn(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from core.forest import ForestPredictor, export_forest
+
+def random_rows(n: int, seed: int) -> np.ndarray:
+    """Feature rows shaped like the eligibility model's (age, income, family size, employment years, income per person)."""
+    rng = np.random.default_rng(seed)
+    age = rng.integers(18, 80, n)
+    income = rng.integers(0, 60000, n)
+    family_size = rng.integers(1, 12, n)
+    employment_years = rng.integers(0, 45, n)
+    return np.column_stack([age, income, family_size, employment_years, income / family_size]).astype(np.float64)
+
+@pytest.fixture(scope="module")
+def model():
+    X = random_rows(2000, seed=0)
+    y = np.where(X[:, 4] < 4000, "Approve", np.where(X[:, 3] > 10, "Soft Decline", "Decline"))
+    return RandomForestClassifier(n_estimators=25, max_depth=12, random_state=0).fit(X, y)
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_predict_proba_matches_sklearn(model, tmp_path, mmap):
+    export_forest(model, str(tmp_path))
+    predictor = ForestPredictor.load(str(tmp_path), mmap=mmap)
+    X = random_rows(5000, seed=1)
+
+    np.testing.assert_allclose(predictor.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(predictor.predict(X), model.predict(X))
+    np.testing.assert_array_equal(predictor.classes_, model.classes_)
+
+def test_reexport_leaves_loaded_forest_intact(model, tmp_path):
+    export_forest(model, str(tmp_path))
+    loaded = ForestPredictor.load(str(tmp_path))
+    X = random_rows(500, seed=2)
+    before = loaded.predict_proba(X)
+
+    other = RandomForestClassifier(n_estimators=5, random_state=1).fit(random_rows(500, seed=3), np.arange(500) % 2)
+    export_forest(other, str(tmp_path))
+
+    np.testing.assert_array_equal(loaded.predict_proba(X), before)
+    np.testing.assert_allclose(ForestPredictor.load(str(tmp_path)).predict_proba(X), other.predict_proba(X), atol=1e-12)
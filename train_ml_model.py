@@ -2,48 +2,205 @@ import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import classification_report
+from sklearn.metrics import accuracy_score, classification_report
+import argparse
+import json
 import joblib
+import numpy as np
 import os
+import time
 
-def train_model():
-    """Loads data, trains a classifier, and saves it."""
-    # Load the dataset
-    df = pd.read_csv('data/applications.csv')
+from core.forest import export_forest
+from core.resources import FOREST_EXPORT_NAME, published_model_dir, write_pointer
 
-    # Feature Engineering (simple example)
-    df['income_per_person'] = df['monthly_income'] / df['family_size']
+# --- Training Configuration ---
+DATA_PATH = 'data/applications.csv'
+MODEL_DIR = 'models'
+# Rows parsed per CSV chunk; only compact feature arrays are kept between chunks
+CHUNK_ROWS = int(os.getenv("TRAIN_CHUNK_ROWS", 250_000))
+FEATURES = ['age', 'monthly_income', 'family_size', 'employment_years', 'income_per_person']
+TARGET = 'eligibility_status'
+# Explicit compact dtypes instead of pandas' int64/object defaults
+CSV_DTYPES = {
+    'applicant_id': 'int64', 'age': 'uint8', 'monthly_income': 'uint32',
+    'family_size': 'uint8', 'employment_years': 'uint8', TARGET: 'category',
+}
+# Trees added by each incremental (warm-start) update
+INCREMENTAL_TREES = 20
 
-    # Select features and target
-    features = ['age', 'monthly_income', 'family_size', 'employment_years', 'income_per_person']
-    target = 'eligibility_status'
+def peak_memory_mb():
+    """Peak resident memory of this process in MB, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024), 1)
 
-    X = df[features]
-    y = df[target]
+def load_training_data(path=DATA_PATH, chunk_rows=CHUNK_ROWS, min_applicant_id=None):
+    """
+    Reads the training CSV in chunks with compact dtypes. Returns the feature
+    matrix (float32, the dtype the forest trains on, so it is not copied
+    again), the labels as a Categorical and the highest applicant_id read.
+    With `min_applicant_id`, only rows with a larger applicant_id are kept.
+    """
+    features, labels = [], []
+    last_applicant_id = min_applicant_id
+    for chunk in pd.read_csv(path, usecols=list(CSV_DTYPES), dtype=CSV_DTYPES, chunksize=chunk_rows):
+        if min_applicant_id is not None:
+            chunk = chunk[chunk['applicant_id'] > min_applicant_id]
+        if chunk.empty:
+            continue
+        # Feature Engineering (simple example)
+        matrix = np.empty((len(chunk), len(FEATURES)), dtype=np.float32)
+        for column, feature in enumerate(FEATURES[:-1]):
+            matrix[:, column] = chunk[feature].to_numpy()
+        matrix[:, -1] = matrix[:, FEATURES.index('monthly_income')] / matrix[:, FEATURES.index('family_size')]
+        features.append(matrix)
+        labels.append(chunk[TARGET].array)
+        chunk_max = int(chunk['applicant_id'].max())
+        last_applicant_id = chunk_max if last_applicant_id is None else max(last_applicant_id, chunk_max)
+    if not features:
+        return np.empty((0, len(FEATURES)), dtype=np.float32), pd.Categorical([]), last_applicant_id
+    X = np.concatenate(features)
+    y = pd.api.types.union_categoricals(labels)
+    return X, y, last_applicant_id
+
+def encode_labels(y, le):
+    """Maps a Categorical onto the encoder's classes without materializing strings per row."""
+    unknown = set(y.categories) - set(le.classes_)
+    if unknown:
+        raise ValueError(f"Labels {sorted(unknown)} are not known to the model; retrain without --incremental.")
+    return le.transform(y.categories)[y.codes]
+
+def load_manifest(model_dir=MODEL_DIR):
+    path = os.path.join(model_dir, 'model_manifest.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def train_model(data_path=DATA_PATH, model_dir=MODEL_DIR, n_jobs=-1, incremental=False,
+                add_trees=INCREMENTAL_TREES, chunk_rows=CHUNK_ROWS):
+    """
+    Loads data, trains a classifier, and saves it as a new model version.
+    The forest trains on all cores (`n_jobs`). With `incremental`, only rows
+    newer than the current version's last applicant_id are read, and
+    `add_trees` trees fitted on them are added to the current forest
+    (warm start) instead of retraining from scratch.
+    """
+    start = time.perf_counter()
+    current_dir = published_model_dir(model_dir)
+    parent = load_manifest(current_dir) if incremental else None
+    if incremental and parent is None:
+        raise SystemExit(f"No model manifest in '{model_dir}'; train once without --incremental first.")
+
+    X, y, last_applicant_id = load_training_data(
+        data_path, chunk_rows, min_applicant_id=parent['trained_through_applicant_id'] if parent else None
+    )
+    if len(X) == 0:
+        print("No new rows to train on.")
+        return None
+    load_seconds = time.perf_counter() - start
+    print(f"Loaded {len(X)} rows ({X.nbytes / 1e6:.1f} MB of features) in {load_seconds:.2f}s")
 
     # Encode the target variable
-    le = LabelEncoder()
-    y_encoded = le.fit_transform(y)
-    
+    if parent:
+        model = joblib.load(os.path.join(current_dir, 'eligibility_classifier.joblib'))
+        le = joblib.load(os.path.join(current_dir, 'label_encoder.joblib'))
+    else:
+        le = LabelEncoder().fit(y.categories)
+    y_encoded = encode_labels(y, le)
+    if parent and len(np.unique(y_encoded)) < len(le.classes_):
+        raise ValueError("New rows must contain every label to add trees; wait for more rows or retrain in full.")
+
     # Split the data
     X_train, X_test, y_train, y_test = train_test_split(X, y_encoded, test_size=0.2, random_state=42, stratify=y_encoded)
-    
+    del X, y, y_encoded
+
     # Initialize and train the model
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    fit_start = time.perf_counter()
+    if parent:
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + add_trees, n_jobs=n_jobs)
+    else:
+        model = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs)
     model.fit(X_train, y_train)
-    
+    train_seconds = time.perf_counter() - fit_start
+    # Saved single-threaded: the API predicts one row at a time, where a thread pool only adds overhead
+    model.set_params(warm_start=False, n_jobs=None)
+
     # Evaluate the model
     y_pred = model.predict(X_test)
     print("Classification Report:")
-    print(classification_report(y_test, y_pred, target_names=le.classes_))
-    
-    # Save the model and the label encoder
-    os.makedirs('models', exist_ok=True)
-    joblib.dump(model, 'models/eligibility_classifier.joblib')
-    joblib.dump(le, 'models/label_encoder.joblib')
-    joblib.dump(features, 'models/features.joblib') # Save feature order
-    
-    print("\nModel and encoder saved successfully to 'models/' directory.")
+    print(classification_report(y_test, y_pred, labels=range(len(le.classes_)), target_names=le.classes_))
+
+    manifest = {
+        'version': time.strftime('%Y%m%d-%H%M%S'),
+        'parent_version': parent['version'] if parent else None,
+        'features': FEATURES,
+        'classes': le.classes_.tolist(),
+        'n_estimators': model.n_estimators,
+        'train_rows': int(len(X_train)) + (parent['train_rows'] if parent else 0),
+        'new_rows': int(len(X_train) + len(X_test)),
+        'trained_through_applicant_id': last_applicant_id,
+        'accuracy': round(float(accuracy_score(y_test, y_pred)), 4),
+        'load_seconds': round(load_seconds, 3),
+        'train_seconds': round(train_seconds, 3),
+        'peak_memory_mb': peak_memory_mb(),
+    }
+    save_model_version(model, le, manifest, model_dir)
+    print(f"\nModel version {manifest['version']} saved to '{model_dir}/' "
+          f"({manifest['n_estimators']} trees, trained in {train_seconds:.2f}s, "
+          f"total {time.perf_counter() - start:.2f}s, peak memory {manifest['peak_memory_mb']} MB).")
+    return manifest
+
+def save_model_version(model, le, manifest, model_dir=MODEL_DIR):
+    """
+    Writes the model, label encoder, feature list, manifest and NumPy export
+    to a new <model_dir>/versions/<version>/ directory, then publishes that
+    version by atomically replacing <model_dir>/CURRENT. Readers see either
+    the previous version or the complete new one, never a mix, and no file a
+    running API may have mapped is rewritten.
+    """
+    version_dir = os.path.join(model_dir, 'versions', manifest['version'])
+    # Built under a temporary name so a half-written version is never visible
+    build_dir = f"{version_dir}.{os.getpid()}.tmp"
+    os.makedirs(build_dir)
+    joblib.dump(model, os.path.join(build_dir, 'eligibility_classifier.joblib'))
+    joblib.dump(le, os.path.join(build_dir, 'label_encoder.joblib'))
+    joblib.dump(FEATURES, os.path.join(build_dir, 'features.joblib')) # Save feature order
+    with open(os.path.join(build_dir, 'model_manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    export_model(model, build_dir)
+    os.rename(build_dir, version_dir)
+    write_pointer(model_dir, os.path.join('versions', manifest['version']))
+
+def export_model(model=None, model_dir=MODEL_DIR):
+    """
+    Writes the flattened NumPy copy of the forest that the API scores with
+    into the `eligibility_forest` export directory of the version published
+    in `model_dir` (or of `model_dir` itself when it is a version directory).
+    """
+    directory = published_model_dir(model_dir)
+    if model is None:
+        model = joblib.load(os.path.join(directory, 'eligibility_classifier.joblib'))
+    export_dir = os.path.join(directory, FOREST_EXPORT_NAME)
+    meta = export_forest(model, export_dir)
+    print(f"Exported {meta['n_trees']} trees ({meta['n_nodes']} nodes) to '{export_dir}'.")
 
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the eligibility classifier.")
+    parser.add_argument("--export-only", action="store_true", help="Only re-export the published model to NumPy arrays")
+    parser.add_argument("--data", default=DATA_PATH, help="Training CSV")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Cores used to fit the trees (-1: all)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Add trees fitted on rows newer than the current model instead of retraining")
+    parser.add_argument("--add-trees", type=int, default=INCREMENTAL_TREES, help="Trees added per incremental update")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="CSV rows parsed per chunk")
+    args = parser.parse_args()
+    if args.export_only:
+        export_model(model_dir=args.model_dir)
+    else:
+        train_model(args.data, args.model_dir, args.n_jobs, args.incremental, args.add_trees, args.chunk_rows)